@@ -1,3 +1,31 @@
 from django.contrib import admin
+from django.db.models import Q
+from django.utils import timezone
+from .models import EmailOutbox
 
-# Register your models here.
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'last_error')
+    readonly_fields = ('lease_token', 'leased_until', 'created_at', 'sent_at', 'last_error')
+    # O conteúdo pode conter links com tokens (ex.: redefinição de senha) e não é exibido
+    exclude = ('body', 'html_body')
+    actions = ['reenviar']
+
+    def has_add_permission(self, request):
+        # As mensagens entram na fila pelas funções enviar_email_*
+        return False
+
+    @admin.action(description='Reenviar as mensagens selecionadas')
+    def reenviar(self, request, queryset):
+        # Mensagens enviadas ou em envio por um processo com reserva ainda válida ficam de fora
+        count = queryset.exclude(
+            Q(status=EmailOutbox.Status.SENT)
+            | Q(status=EmailOutbox.Status.SENDING, leased_until__gt=timezone.now())
+        ).update(
+            status=EmailOutbox.Status.PENDING, attempts=0, next_attempt_at=timezone.now(),
+            lease_token='', leased_until=None
+        )
+        self.message_user(request, f'{count} mensagem(ns) colocada(s) novamente na fila.')
@@ -0,0 +1,128 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from Email_notificacoes.outbox import due_ids, get_config, process_batch, purge_sent
+from Email_notificacoes.pool import EmailWorkerPool, get_config as get_pool_config
+from Email_notificacoes.transport import close_transport
+
+
+class Command(BaseCommand):
+    help = 'Entrega os emails da fila EmailOutbox (processo contínuo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Esvazia a fila uma vez e encerra'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Mensagens reservadas por lote (padrão: EMAIL_OUTBOX["BATCH_SIZE"])'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Segundos entre consultas com a fila vazia (padrão: EMAIL_OUTBOX["POLL_INTERVAL"])'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Threads de envio simultâneas (padrão: EMAIL_WORKER_POOL["WORKERS"]); 1 envia na thread principal'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or get_config()['POLL_INTERVAL']
+        workers = options['workers'] or get_pool_config()['WORKERS']
+        self.last_purge = None
+
+        try:
+            if workers > 1:
+                self.process_with_pool(options, interval, workers)
+            else:
+                self.process(options, interval)
+        finally:
+            # A conexão SMTP é mantida entre os lotes e encerrada apenas na saída
+            close_transport()
+
+    def process(self, options, interval):
+        while True:
+            close_old_connections()
+            try:
+                stats = process_batch(options['batch_size'])
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"{stats['sent']} email(s) enviado(s), {stats['retried']} reagendado(s), "
+                        f"{stats['failed']} com falha definitiva"
+                    )
+                    # Ainda pode haver mensagens disponíveis: processa o próximo lote sem esperar
+                    continue
+            except Exception as e:
+                # O processo continua; as reservas vencidas são retomadas no próximo lote
+                self.stderr.write(f'Erro ao processar a fila de emails: {e}')
+
+            self.purge()
+            if options['once']:
+                break
+            try:
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                break
+
+    def process_with_pool(self, options, interval, workers):
+        # Com a política 'block', a busca por novas mensagens espera quando as threads estão ocupadas
+        pool = EmailWorkerPool(workers=workers, policy='block')
+        busy = False
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    ids = due_ids(options['batch_size'], exclude=pool.scheduled_ids())
+                except Exception as e:
+                    self.stderr.write(f'Erro ao consultar a fila de emails: {e}')
+                    ids = []
+                if ids:
+                    pool.submit(ids)
+                    busy = True
+                    continue
+
+                if pool.is_idle():
+                    if busy:
+                        self.write_metrics(pool)
+                        busy = False
+                    self.purge()
+                    if options['once']:
+                        break
+                try:
+                    # Enquanto há envios em andamento, consulta a fila com mais frequência
+                    time.sleep(interval if pool.is_idle() else min(interval, 0.5))
+                except KeyboardInterrupt:
+                    break
+        finally:
+            # Esvazia a fila das threads antes de encerrar
+            pool.shutdown()
+
+    def purge(self):
+        """Exclui as mensagens enviadas antigas, no máximo uma vez a cada PURGE_INTERVAL segundos"""
+        config = get_config()
+        if self.last_purge is not None and time.monotonic() - self.last_purge < config['PURGE_INTERVAL']:
+            return
+        self.last_purge = time.monotonic()
+        try:
+            count = purge_sent()
+        except Exception as e:
+            self.stderr.write(f'Erro ao excluir emails enviados antigos: {e}')
+            return
+        if count:
+            self.stdout.write(f'{count} email(s) enviado(s) há mais de {config["SENT_RETENTION_DAYS"]} dia(s) excluído(s)')
+
+    def write_metrics(self, pool):
+        metrics = pool.metrics()
+        self.stdout.write(
+            f"{metrics['sent']} email(s) enviado(s), {metrics['retried']} reagendado(s), "
+            f"{metrics['failed']} com falha definitiva; latência p50 {metrics['p50'] * 1000:.0f} ms, "
+            f"p95 {metrics['p95'] * 1000:.0f} ms, p99 {metrics['p99'] * 1000:.0f} ms"
+        )
@@ -1,8 +1,51 @@
 from django.db import models
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 # Importar nova função de envio assíncrono
-from .utils import enviar_email_async
+from .utils import enviar_email_async, enviar_emails_em_lote_async, montar_email
+from .rendering import render_email, render_emails
+
+class EmailOutbox(models.Model):
+    """
+    Fila persistente de emails. As funções enviar_email_* apenas gravam a mensagem
+    aqui; o comando process_email_outbox faz a entrega (ver outbox.py), com novas
+    tentativas e o resultado final registrado em cada linha.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pendente')
+        SENDING = 'sending', _('Enviando')
+        SENT = 'sent', _('Enviado')
+        FAILED = 'failed', _('Falhou')
+    
+    subject = models.CharField(_("Assunto"), max_length=255)
+    body = models.TextField(_("Texto"))
+    html_body = models.TextField(_("HTML"), blank=True)
+    from_email = models.CharField(_("Remetente"), max_length=255)
+    to = models.JSONField(_("Destinatários"), default=list)
+    # Imagens embutidas no HTML (caminhos relativos a static/, referenciadas por cid:<nome do arquivo>)
+    inline_images = models.JSONField(_("Imagens embutidas"), default=list, blank=True)
+    
+    status = models.CharField(_("Situação"), max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(_("Tentativas"), default=0)
+    next_attempt_at = models.DateTimeField(_("Próxima tentativa"), default=timezone.now)
+    # Reserva da linha por um processo de entrega; vencida, a mensagem volta a ficar disponível
+    lease_token = models.CharField(max_length=32, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(_("Último erro"), blank=True)
+    created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("Enviado em"), null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = _("Email na Fila")
+        verbose_name_plural = _("Fila de Emails")
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.get_status_display()})"
 
 def enviar_email_boas_vindas(usuario):
     """
@@ -13,29 +56,8 @@ def enviar_email_boas_vindas(usuario):
     """
     assunto = f'Bem-vindo(a) ao Sistema de Gestão do Laboratório, {usuario.first_name}!'
     
-    # Criar conteúdo do email em HTML
-    contexto = {'usuario': usuario}
-    html_mensagem = render_to_string('emails/boas_vindas.html', contexto)
-    
-    # Texto simples para clientes de email que não suportam HTML
-    mensagem = f"""
-    Olá {usuario.first_name} {usuario.last_name},
-    
-    Seja bem-vindo(a) ao nosso Sistema de Gestão do Laboratório!
-    
-    Seu cadastro foi realizado com sucesso. Agora você pode acessar todas as funcionalidades disponíveis para o seu perfil.
-    
-    Seus dados de acesso são:
-    - Matrícula: {usuario.id}
-    - Email: {usuario.email}
-    
-    Acesse o sistema através do link: http://localhost:8000/
-    
-    Em caso de dúvidas, entre em contato conosco.
-    
-    Atenciosamente,
-    Equipe do Sistema de Gestão do Laboratório
-    """
+    # HTML e texto simples (para clientes sem suporte a HTML) vêm do mesmo template
+    html_mensagem, mensagem = render_email('emails/boas_vindas.html', {'usuario': usuario})
     
     email_de = settings.DEFAULT_FROM_EMAIL
     email_para = [usuario.email]
@@ -58,26 +80,8 @@ def enviar_email_solicitacao_enviada(evento):
     usuario = evento.created_by
     assunto = f'Sua solicitação foi recebida - {evento.title}'
     
-    # Criar conteúdo do email em HTML
-    contexto = {'evento': evento}
-    html_mensagem = render_to_string('emails/evento_solicitacao_recebida.html', contexto)
-    
-    # Texto simples para clientes de email que não suportam HTML
-    mensagem = f"""
-    Olá {usuario.first_name} {usuario.last_name},
-    
-    Sua solicitação para o evento "{evento.title}" foi recebida com sucesso!
-    
-    Detalhes da solicitação:
-    - Tipo: {evento.get_event_type_display()}
-    - Data de início: {evento.start_time.strftime('%d/%m/%Y %H:%M')}
-    - Data de término: {evento.end_time.strftime('%d/%m/%Y %H:%M')}
-    
-    Nossa equipe irá analisar sua solicitação e você receberá uma confirmação quando ela for aprovada.
-    
-    Atenciosamente,
-    Equipe do Sistema de Gestão do Laboratório
-    """
+    # HTML e texto simples (para clientes sem suporte a HTML) vêm do mesmo template
+    html_mensagem, mensagem = render_email('emails/evento_solicitacao_recebida.html', {'evento': evento})
     
     email_de = settings.DEFAULT_FROM_EMAIL
     email_para = [usuario.email]
@@ -90,6 +94,20 @@ def enviar_email_solicitacao_enviada(evento):
         html_message=html_mensagem
     )
 
+TEMPLATE_SOLICITACAO_APROVADA = 'emails/evento_solicitacao_aprovada.html'
+TEMPLATE_SOLICITACAO_RECUSADA = 'emails/evento_solicitacao_recusada.html'
+
+def _email_solicitacao_aprovada(evento, renderizado):
+    """Argumentos de envio (ver enviar_email_async) do email de solicitação aprovada, a partir do (html, texto) renderizado"""
+    html_mensagem, mensagem = renderizado
+    return {
+        'assunto': f'Solicitação aprovada - {evento.title}',
+        'mensagem': mensagem,
+        'email_de': settings.DEFAULT_FROM_EMAIL,
+        'email_para': [evento.created_by.email],
+        'html_message': html_mensagem,
+    }
+
 def enviar_email_solicitacao_aprovada(evento):
     """
     Envia um email notificando que a solicitação de evento/visita foi aprovada.
@@ -97,40 +115,19 @@ def enviar_email_solicitacao_aprovada(evento):
     Args:
         evento: O objeto Event que foi aprovado
     """
-    usuario = evento.created_by
-    assunto = f'Solicitação aprovada - {evento.title}'
-    
-    # Criar conteúdo do email em HTML
-    contexto = {'evento': evento}
-    html_mensagem = render_to_string('emails/evento_solicitacao_aprovada.html', contexto)
-    
-    # Texto simples para clientes de email que não suportam HTML
-    mensagem = f"""
-    Olá {usuario.first_name} {usuario.last_name},
-    
-    Temos boas notícias! Sua solicitação para o evento "{evento.title}" foi aprovada.
-    
-    Detalhes do evento:
-    - Tipo: {evento.get_event_type_display()}
-    - Data de início: {evento.start_time.strftime('%d/%m/%Y %H:%M')}
-    - Data de término: {evento.end_time.strftime('%d/%m/%Y %H:%M')}
-    
-    Você pode visualizar todos os detalhes do evento em nosso sistema.
-    
-    Atenciosamente,
-    Equipe do Sistema de Gestão do Laboratório
-    """
-    
-    email_de = settings.DEFAULT_FROM_EMAIL
-    email_para = [usuario.email]
-    
-    return enviar_email_async(
-        assunto,
-        mensagem,
-        email_de,
-        email_para,
-        html_message=html_mensagem
-    )
+    renderizado = render_email(TEMPLATE_SOLICITACAO_APROVADA, {'evento': evento})
+    return enviar_email_async(**_email_solicitacao_aprovada(evento, renderizado))
+
+def _email_solicitacao_recusada(evento, renderizado):
+    """Argumentos de envio (ver enviar_email_async) do email de solicitação recusada, a partir do (html, texto) renderizado"""
+    html_mensagem, mensagem = renderizado
+    return {
+        'assunto': f'Solicitação recusada - {evento.title}',
+        'mensagem': mensagem,
+        'email_de': settings.DEFAULT_FROM_EMAIL,
+        'email_para': [evento.created_by.email],
+        'html_message': html_mensagem,
+    }
 
 def enviar_email_solicitacao_recusada(evento, motivo):
     """
@@ -140,43 +137,36 @@ def enviar_email_solicitacao_recusada(evento, motivo):
         evento: O objeto Event que foi recusado
         motivo: O motivo da recusa
     """
-    usuario = evento.created_by
-    assunto = f'Solicitação recusada - {evento.title}'
-    
-    # Criar conteúdo do email em HTML
-    contexto = {'evento': evento, 'motivo': motivo}
-    html_mensagem = render_to_string('emails/evento_solicitacao_recusada.html', contexto)
-    
-    # Texto simples para clientes de email que não suportam HTML
-    mensagem = f"""
-    Olá {usuario.first_name} {usuario.last_name},
-    
-    Infelizmente sua solicitação para o evento "{evento.title}" foi recusada.
-    
-    Detalhes da solicitação:
-    - Tipo: {evento.get_event_type_display()}
-    - Data: {evento.start_time.strftime('%d/%m/%Y')}
-    - Horário: {evento.start_time.strftime('%H:%M')} - {evento.end_time.strftime('%H:%M')}
-    
-    Motivo da recusa:
-    {motivo}
-    
-    Se tiver dúvidas, entre em contato conosco para mais informações.
-    
-    Atenciosamente,
-    Equipe do Sistema de Gestão do Laboratório
+    renderizado = render_email(TEMPLATE_SOLICITACAO_RECUSADA, {'evento': evento, 'motivo': motivo})
+    return enviar_email_async(**_email_solicitacao_recusada(evento, renderizado))
+
+def enviar_emails_solicitacoes_aprovadas(eventos):
     """
+    Envia de uma só vez os emails de aprovação de vários eventos (aprovação em lote).
     
-    email_de = settings.DEFAULT_FROM_EMAIL
-    email_para = [usuario.email]
+    Args:
+        eventos: Lista de objetos Event aprovados
+    """
+    renderizados = render_emails(TEMPLATE_SOLICITACAO_APROVADA, [{'evento': evento} for evento in eventos])
+    return enviar_emails_em_lote_async([
+        montar_email(**_email_solicitacao_aprovada(evento, renderizado))
+        for evento, renderizado in zip(eventos, renderizados)
+    ])
+
+def enviar_emails_solicitacoes_recusadas(eventos_e_motivos):
+    """
+    Envia de uma só vez os emails de recusa de vários eventos (recusa em lote).
     
-    return enviar_email_async(
-        assunto,
-        mensagem,
-        email_de,
-        email_para,
-        html_message=html_mensagem
-    )
+    Args:
+        eventos_e_motivos: Lista de pares (Event, motivo da recusa)
+    """
+    renderizados = render_emails(TEMPLATE_SOLICITACAO_RECUSADA, [
+        {'evento': evento, 'motivo': motivo} for evento, motivo in eventos_e_motivos
+    ])
+    return enviar_emails_em_lote_async([
+        montar_email(**_email_solicitacao_recusada(evento, renderizado))
+        for (evento, _), renderizado in zip(eventos_e_motivos, renderizados)
+    ])
 
 def enviar_email_notificacao_interesse(solicitacao):
     """
@@ -187,28 +177,12 @@ def enviar_email_notificacao_interesse(solicitacao):
     """
     assunto = f"Nova solicitação de interesse: {solicitacao.servico.nome}"
     
-    # Criar conteúdo do email em HTML
+    # HTML e texto simples (para clientes sem suporte a HTML) vêm do mesmo template
     contexto = {
         'solicitacao': solicitacao,
         'servico': solicitacao.servico,
     }
-    html_mensagem = render_to_string('emails/novo_interesse.html', contexto)
-    
-    # Texto simples para clientes de email que não suportam HTML
-    texto_mensagem = f"""
-    Nova solicitação de interesse no FabLab:
-    
-    Capacidade: {solicitacao.servico.nome}
-    Nome: {solicitacao.nome}
-    Email: {solicitacao.email}
-    Telefone: {solicitacao.telefone or "Não informado"}
-    
-    Descrição do projeto/interesse:
-    {solicitacao.descricao_projeto}
-    
-    ---
-    Este é um email automático enviado pelo sistema do FabLab IFMT.
-    """
+    html_mensagem, texto_mensagem = render_email('emails/novo_interesse.html', contexto)
     
     # Email de quem envia
     email_de = settings.DEFAULT_FROM_EMAIL
@@ -0,0 +1,150 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import Q
+from django.utils import timezone
+from .models import EmailOutbox
+from .rendering import inline_image
+from .transport import get_transport
+
+# Configuração padrão; pode ser sobrescrita por settings.EMAIL_OUTBOX
+DEFAULT_CONFIG = {
+    'BATCH_SIZE': 50,          # Mensagens reservadas por vez
+    'LEASE_SECONDS': 300,      # Tempo de reserva; vencido, outro processo pode reenviar a mensagem
+    'MAX_ATTEMPTS': 6,         # Tentativas antes de a mensagem ser marcada como falha
+    'BACKOFF_SECONDS': 60,     # Espera após a primeira falha, dobrada a cada nova tentativa
+    'MAX_BACKOFF_SECONDS': 3600,
+    'POLL_INTERVAL': 5,        # Segundos entre consultas quando a fila está vazia
+    'SENT_RETENTION_DAYS': 30,  # Mensagens enviadas são excluídas depois deste prazo
+    'PURGE_INTERVAL': 3600,    # Segundos entre as limpezas feitas pelo process_email_outbox
+}
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'EMAIL_OUTBOX', {}))
+    return config
+
+
+def _available(now):
+    """Mensagens que podem ser reservadas: pendentes e vencidas, ou com reserva expirada"""
+    return EmailOutbox.objects.filter(
+        Q(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+        | Q(status=EmailOutbox.Status.SENDING, leased_until__lt=now)
+    )
+
+
+def due_ids(size=None, exclude=()):
+    """Ids das próximas mensagens disponíveis para envio, em ordem de vencimento"""
+    return list(
+        _available(timezone.now()).exclude(id__in=exclude).order_by('next_attempt_at')
+        .values_list('id', flat=True)[:size or get_config()['BATCH_SIZE']]
+    )
+
+
+def claim_batch(size=None, ids=None):
+    """
+    Reserva até `size` mensagens (ou as mensagens `ids` que ainda estiverem
+    disponíveis) para este processo. O UPDATE só altera linhas que continuam
+    disponíveis, então dois processos nunca reservam a mesma mensagem; o token
+    identifica as linhas efetivamente obtidas.
+    """
+    config = get_config()
+    now = timezone.now()
+    if ids is None:
+        ids = due_ids(size)
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    _available(now).filter(id__in=ids).update(
+        status=EmailOutbox.Status.SENDING,
+        lease_token=token,
+        leased_until=now + timedelta(seconds=config['LEASE_SECONDS'])
+    )
+    return list(EmailOutbox.objects.filter(lease_token=token, status=EmailOutbox.Status.SENDING))
+
+
+def build_message(item):
+    """EmailMultiAlternatives correspondente à mensagem da fila"""
+    message = EmailMultiAlternatives(item.subject, item.body, item.from_email, item.to)
+    if item.html_body:
+        message.attach_alternative(item.html_body, 'text/html')
+    if item.inline_images:
+        message.mixed_subtype = 'related'  # Necessário para que as imagens embutidas funcionem
+        for path in item.inline_images:
+            # Parte MIME montada uma única vez e compartilhada entre as mensagens
+            image = inline_image(path)
+            if image is not None:
+                message.attach(image)
+    return message
+
+
+def backoff(attempts):
+    """Espera antes da próxima tentativa: exponencial, limitada por MAX_BACKOFF_SECONDS"""
+    config = get_config()
+    return timedelta(seconds=min(config['BACKOFF_SECONDS'] * 2 ** (attempts - 1), config['MAX_BACKOFF_SECONDS']))
+
+
+def _record_failure(item, error, now):
+    item.attempts += 1
+    item.last_error = str(error)[:2000]
+    item.lease_token = ''
+    item.leased_until = None
+    if item.attempts >= get_config()['MAX_ATTEMPTS']:
+        item.status = EmailOutbox.Status.FAILED
+    else:
+        item.status = EmailOutbox.Status.PENDING
+        item.next_attempt_at = now + backoff(item.attempts)
+
+
+def deliver(items, transport=None):
+    """
+    Envia as mensagens reservadas pela conexão informada ou pela compartilhada
+    do processo (ver transport) e grava
+    o resultado de cada uma (enviada, nova tentativa agendada ou falha definitiva)
+    com um UPDATE em lote. O conteúdo das mensagens enviadas é descartado: ele
+    pode conter links com tokens (ex.: redefinição de senha).
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+    if not items:
+        return stats
+
+    transport = transport or get_transport()
+    results = transport.send_messages([build_message(item) for item in items])
+
+    now = timezone.now()
+    for item, error in zip(items, results):
+        if error is not None:
+            _record_failure(item, error, now)
+            stats['failed' if item.status == EmailOutbox.Status.FAILED else 'retried'] += 1
+            continue
+        item.attempts += 1
+        item.status = EmailOutbox.Status.SENT
+        item.sent_at = now
+        item.body = item.html_body = ''
+        item.last_error = ''
+        item.lease_token = ''
+        item.leased_until = None
+        stats['sent'] += 1
+
+    EmailOutbox.objects.bulk_update(items, [
+        'status', 'attempts', 'next_attempt_at', 'lease_token', 'leased_until', 'last_error', 'sent_at',
+        'body', 'html_body'
+    ])
+    return stats
+
+
+def process_batch(size=None):
+    """Reserva e entrega um lote; retorna as contagens do lote (claimed, sent, retried, failed)"""
+    items = claim_batch(size)
+    stats = deliver(items)
+    stats['claimed'] = len(items)
+    return stats
+
+
+def purge_sent(now=None):
+    """Exclui as mensagens enviadas há mais de SENT_RETENTION_DAYS dias; retorna a quantidade"""
+    cutoff = (now or timezone.now()) - timedelta(days=get_config()['SENT_RETENTION_DAYS'])
+    return EmailOutbox.objects.filter(status=EmailOutbox.Status.SENT, sent_at__lt=cutoff).delete()[0]
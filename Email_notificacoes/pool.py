@@ -0,0 +1,203 @@
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import close_old_connections, connection
+from logs.metrics import percentile
+from .outbox import claim_batch, deliver, get_config as get_outbox_config
+from .transport import PooledTransport
+
+# Configuração padrão; pode ser sobrescrita por settings.EMAIL_WORKER_POOL
+DEFAULT_CONFIG = {
+    # Entrega os emails enfileirados logo após o commit, no próprio processo. Desligado por
+    # padrão: no SQLite as threads de envio disputariam o bloqueio de escrita com as requisições
+    'IN_PROCESS': False,
+    'WORKERS': 2,              # Threads de envio (cada uma com sua conexão SMTP)
+    'QUEUE_SIZE': 200,         # Mensagens aguardando uma thread livre
+    # Fila cheia: 'defer' deixa a mensagem para o process_email_outbox, 'block' espera
+    # até BLOCK_TIMEOUT segundos por espaço e 'caller_runs' envia na thread de quem chamou
+    'FULL_POLICY': 'defer',
+    'BLOCK_TIMEOUT': 5,
+    'SHUTDOWN_TIMEOUT': 10,    # Espera máxima para esvaziar a fila ao encerrar o processo
+    'LATENCY_WINDOW': 1000,    # Envios recentes considerados nos percentis de latência
+}
+
+FULL_POLICIES = ('defer', 'block', 'caller_runs')
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'EMAIL_WORKER_POOL', {}))
+    return config
+
+
+class EmailWorkerPool:
+    """
+    Número fixo de threads de envio alimentadas por uma fila limitada de ids de
+    EmailOutbox. Cada thread reserva as mensagens (a reserva impede envio duplicado
+    com o process_email_outbox) e as entrega pela sua própria conexão. Como a
+    mensagem já está gravada, uma mensagem que não entra na fila não se perde:
+    continua pendente e é entregue pelo process_email_outbox.
+    """
+
+    def __init__(self, workers=None, queue_size=None, policy=None):
+        config = get_config()
+        self.policy = policy or config['FULL_POLICY']
+        if self.policy not in FULL_POLICIES:
+            raise ValueError(f'FULL_POLICY deve ser uma de: {", ".join(FULL_POLICIES)}.')
+        self.block_timeout = config['BLOCK_TIMEOUT']
+        self._queue = queue.Queue(maxsize=config['QUEUE_SIZE'] if queue_size is None else queue_size)
+        self._lock = threading.Lock()
+        self._scheduled = set()
+        self._latencies = deque(maxlen=config['LATENCY_WINDOW'])
+        self._counters = {'sent': 0, 'retried': 0, 'failed': 0, 'deferred': 0, 'in_flight': 0}
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f'email-worker-{index}', daemon=True)
+            for index in range(config['WORKERS'] if workers is None else workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, ids):
+        """
+        Agenda o envio das mensagens sem bloquear (exceto com a política 'block').
+        Retorna os ids aceitos; os demais continuam pendentes na EmailOutbox.
+        """
+        with self._lock:
+            ids = [id for id in ids if id not in self._scheduled]
+            if self._closed:
+                self._counters['deferred'] += len(ids)
+                return []
+            self._scheduled.update(ids)
+
+        accepted = []
+        for index, id in enumerate(ids):
+            try:
+                if self.policy == 'block':
+                    self._queue.put((id, time.monotonic()), timeout=self.block_timeout)
+                else:
+                    self._queue.put_nowait((id, time.monotonic()))
+                accepted.append(id)
+            except queue.Full:
+                rejected = ids[index:]
+                if self.policy == 'caller_runs':
+                    transport = PooledTransport()
+                    try:
+                        self._run([(id, time.monotonic()) for id in rejected], transport)
+                    finally:
+                        transport.close()
+                    accepted.extend(rejected)
+                else:
+                    with self._lock:
+                        self._scheduled.difference_update(rejected)
+                        self._counters['deferred'] += len(rejected)
+                break
+        return accepted
+
+    def _run(self, tasks, transport):
+        ids = [id for id, _ in tasks]
+        with self._lock:
+            self._counters['in_flight'] += len(ids)
+        try:
+            stats = deliver(claim_batch(ids=ids), transport)
+        except Exception as e:
+            print(f"Erro ao entregar emails da fila: {e}")
+            stats = {'sent': 0, 'retried': 0, 'failed': 0}
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._counters['in_flight'] -= len(ids)
+                self._scheduled.difference_update(ids)
+        with self._lock:
+            for name in ('sent', 'retried', 'failed'):
+                self._counters[name] += stats[name]
+            # Latência: da entrada na fila até o fim do envio
+            self._latencies.extend(finished - queued_at for _, queued_at in tasks)
+
+    def _work(self):
+        transport = PooledTransport()
+        batch_size = get_outbox_config()['BATCH_SIZE']
+        try:
+            while True:
+                task = self._queue.get()
+                if task is None:
+                    break
+                # Junta o que mais estiver na fila para reservar e enviar em lote
+                tasks = [task]
+                while len(tasks) < batch_size:
+                    try:
+                        task = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if task is None:
+                        self._queue.put(None)
+                        break
+                    tasks.append(task)
+                close_old_connections()
+                self._run(tasks, transport)
+        finally:
+            transport.close()
+            connection.close()
+
+    def metrics(self):
+        """Contadores e percentis de latência (segundos) do pool"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = dict(self._counters)
+            metrics['scheduled'] = len(self._scheduled)
+        metrics['queued'] = self._queue.qsize()
+        metrics['p50'] = percentile(latencies, 0.50)
+        metrics['p95'] = percentile(latencies, 0.95)
+        metrics['p99'] = percentile(latencies, 0.99)
+        return metrics
+
+    def scheduled_ids(self):
+        """Ids na fila ou em envio (para não agendá-los de novo)"""
+        with self._lock:
+            return set(self._scheduled)
+
+    def is_idle(self):
+        with self._lock:
+            return not self._scheduled
+
+    def shutdown(self, timeout=None):
+        """
+        Para de aceitar mensagens e espera as threads esvaziarem a fila, por até
+        `timeout` segundos. O que não for enviado continua pendente na EmailOutbox.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        deadline = time.monotonic() + (get_config()['SHUTDOWN_TIMEOUT'] if timeout is None else timeout)
+        for _ in self._threads:
+            try:
+                # Depois das mensagens já na fila, um aviso de parada para cada thread
+                self._queue.put(None, timeout=max(0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool compartilhado do processo, criado no primeiro uso e esvaziado ao encerrar"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EmailWorkerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def deliver_in_process(ids):
+    """Entrega imediata, se habilitada, das mensagens recém-gravadas na EmailOutbox"""
+    if ids and get_config()['IN_PROCESS']:
+        get_pool().submit(ids)
@@ -0,0 +1,113 @@
+import os
+import re
+import threading
+from email.mime.image import MIMEImage
+from html.parser import HTMLParser
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template.loader import get_template
+
+# Elementos que quebram linha no texto simples
+BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'hr'}
+# Elementos cujo conteúdo não aparece no texto simples
+SKIPPED_TAGS = {'head', 'style', 'script', 'title'}
+
+
+class _TextExtractor(HTMLParser):
+    """Converte o HTML do email em texto simples, mantendo parágrafos, listas e links"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+            if tag == 'li':
+                self.parts.append('- ')
+        if tag == 'a':
+            self.links.append(dict(attrs).get('href'))
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag == 'a' and self.links:
+            href = self.links.pop()
+            if href and not href.startswith(('#', 'mailto:', 'cid:')):
+                self.parts.append(f' ({href})')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+    def text(self):
+        lines = [line.strip() for line in ''.join(self.parts).splitlines()]
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip() + '\n'
+
+
+def html_to_text(html):
+    """Versão em texto simples do HTML, derivada do mesmo template"""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+def render_email(template_name, context):
+    """(html, texto) do email a partir de um único template"""
+    html = get_template(template_name).render(context)
+    return html, html_to_text(html)
+
+
+def render_emails(template_name, contexts):
+    """
+    Renderiza o mesmo template para vários destinatários: [(html, texto)] na ordem
+    dos contextos. O template compilado fica no carregador em cache do Django.
+    """
+    template = get_template(template_name)
+    rendered = []
+    for context in contexts:
+        html = template.render(context)
+        rendered.append((html, html_to_text(html)))
+    return rendered
+
+
+_images_lock = threading.Lock()
+_images = {}
+
+
+def inline_image(path):
+    """
+    Imagem embutida (Content-ID <nome do arquivo>) de um arquivo em static/, lida
+    e codificada uma única vez. A parte MIME é imutável e compartilhada entre as
+    mensagens; retorna None se o arquivo não existir (sem guardar em cache, para
+    que um arquivo publicado depois seja encontrado).
+    """
+    with _images_lock:
+        image = _images.get(path)
+        if image is None:
+            full_path = os.path.join(settings.BASE_DIR, 'static', path)
+            if not os.path.exists(full_path):
+                return None
+            with open(full_path, 'rb') as f:
+                image = MIMEImage(f.read())
+            filename = os.path.basename(path)
+            image.add_header('Content-ID', f'<{filename}>')
+            image.add_header('Content-Disposition', 'inline', filename=filename)
+            _images[path] = image
+        return image
+
+
+@receiver(setting_changed)
+def limpar_caches(setting, **kwargs):
+    """As imagens dependem de BASE_DIR (útil nos testes)"""
+    if setting == 'BASE_DIR':
+        with _images_lock:
+            _images.clear()
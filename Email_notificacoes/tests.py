@@ -1,3 +1,259 @@
-from django.test import TestCase
+import os
+import shutil
+import smtplib
+import socket
+import tempfile
+import time
+import unittest
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from django.contrib import admin
+from django.core import mail
+from django.core.management import call_command
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import get_template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from .admin import EmailOutboxAdmin
+from .models import EmailOutbox
+from .outbox import build_message, claim_batch, process_batch, purge_sent
+from .pool import EmailWorkerPool
+from .rendering import html_to_text, inline_image, render_emails
+from .transport import PooledTransport, close_transport
+from .utils import enviar_email_async
 
-# Create your tests here.
+
+@override_settings(EMAIL_OUTBOX={'MAX_ATTEMPTS': 2, 'BACKOFF_SECONDS': 60})
+class EmailOutboxTests(TestCase):
+    def tearDown(self):
+        close_transport()
+
+    def enqueue(self, assunto='Teste'):
+        enviar_email_async(assunto, 'Texto', 'lab@example.com', ['ana@example.com'], html_message='<p>Texto</p>')
+
+    def test_enqueue_is_a_single_insert(self):
+        with self.assertNumQueries(1):
+            self.enqueue()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.Status.PENDING)
+
+    def test_no_in_process_delivery_by_default(self):
+        # No SQLite, threads de envio nos processos web disputariam o bloqueio de escrita
+        with mock.patch('Email_notificacoes.pool.get_pool') as get_pool:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.enqueue()
+        get_pool.assert_not_called()
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.Status.PENDING)
+
+    def test_delivery_and_leasing(self):
+        self.enqueue('Primeiro')
+        self.enqueue('Segundo')
+        claimed = claim_batch(1)
+        self.assertEqual([item.subject for item in claimed], ['Primeiro'])
+        # A mensagem reservada não é entregue por outro processo
+        stats = process_batch()
+        self.assertEqual((stats['claimed'], stats['sent']), (1, 1))
+        self.assertEqual([message.subject for message in mail.outbox], ['Segundo'])
+        self.assertEqual(mail.outbox[0].alternatives[0].mimetype, 'text/html')
+
+        # Reserva vencida (processo interrompido): a mensagem volta a ser entregue
+        EmailOutbox.objects.filter(subject='Primeiro').update(leased_until=timezone.now() - timedelta(seconds=1))
+        process_batch()
+        item = EmailOutbox.objects.get(subject='Primeiro')
+        self.assertEqual((item.status, item.attempts, item.lease_token), (EmailOutbox.Status.SENT, 1, ''))
+
+    def test_retry_with_backoff_then_failure(self):
+        self.enqueue()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('recusado')):
+            stats = process_batch()
+            self.assertEqual(stats['retried'], 1)
+            item = EmailOutbox.objects.get()
+            self.assertEqual((item.status, item.attempts, item.last_error), (EmailOutbox.Status.PENDING, 1, 'recusado'))
+            self.assertGreater(item.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+            # Antes do prazo nada é reservado; depois dele, a segunda falha é definitiva
+            self.assertEqual(process_batch()['claimed'], 0)
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(process_batch()['failed'], 1)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.Status.FAILED)
+
+    def test_sent_content_discarded_and_purged(self):
+        self.enqueue('Redefinição de senha')
+        process_batch()
+        item = EmailOutbox.objects.get()
+        self.assertEqual((item.status, item.body, item.html_body), (EmailOutbox.Status.SENT, '', ''))
+        self.assertIn('Texto', mail.outbox[0].body)
+
+        self.assertEqual(purge_sent(), 0)
+        EmailOutbox.objects.update(sent_at=timezone.now() - timedelta(days=31))
+        self.enqueue('Pendente')
+        out = StringIO()
+        call_command('process_email_outbox', once=True, workers=1, stdout=out)
+        self.assertIn('1 email(s) enviado(s) há mais de 30 dia(s) excluído(s)', out.getvalue())
+        self.assertEqual(list(EmailOutbox.objects.values_list('subject', flat=True)), ['Pendente'])
+
+    def test_resend_skips_active_leases(self):
+        for assunto in ('Enviado', 'Falhou', 'Em envio', 'Reserva vencida'):
+            self.enqueue(assunto)
+        now = timezone.now()
+        EmailOutbox.objects.filter(subject='Enviado').update(status=EmailOutbox.Status.SENT)
+        EmailOutbox.objects.filter(subject='Falhou').update(status=EmailOutbox.Status.FAILED, attempts=2)
+        EmailOutbox.objects.filter(subject='Em envio').update(
+            status=EmailOutbox.Status.SENDING, lease_token='a', leased_until=now + timedelta(minutes=5))
+        EmailOutbox.objects.filter(subject='Reserva vencida').update(
+            status=EmailOutbox.Status.SENDING, lease_token='b', leased_until=now - timedelta(minutes=1))
+
+        model_admin = EmailOutboxAdmin(EmailOutbox, admin.site)
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.reenviar(None, EmailOutbox.objects.all())
+        self.assertEqual(dict(EmailOutbox.objects.values_list('subject', 'status')), {
+            'Enviado': EmailOutbox.Status.SENT,
+            'Falhou': EmailOutbox.Status.PENDING,
+            'Em envio': EmailOutbox.Status.SENDING,
+            'Reserva vencida': EmailOutbox.Status.PENDING,
+        })
+
+
+@override_settings(EMAIL_WORKER_POOL={'IN_PROCESS': False})
+class EmailWorkerPoolTests(TransactionTestCase):
+    def enqueue(self, count):
+        for index in range(count):
+            enviar_email_async(f'Teste {index}', 'Texto', 'lab@example.com', [f'u{index}@example.com'])
+        return list(EmailOutbox.objects.values_list('id', flat=True))
+
+    def test_workers_drain_queue_on_shutdown(self):
+        ids = self.enqueue(5)
+        # Uma thread: no SQLite em memória dos testes, escritas simultâneas falham com "table is locked"
+        pool = EmailWorkerPool(workers=1, queue_size=10)
+        self.assertEqual(pool.submit(ids), ids)
+        pool.shutdown(timeout=10)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.Status.SENT).exists())
+        metrics = pool.metrics()
+        self.assertEqual((metrics['sent'], metrics['in_flight'], metrics['queued']), (5, 0, 0))
+        self.assertGreater(metrics['p99'], 0)
+
+    def test_full_queue_defers_to_outbox(self):
+        ids = self.enqueue(3)
+        # Sem threads, nada sai da fila: a terceira mensagem não cabe
+        pool = EmailWorkerPool(workers=0, queue_size=2, policy='defer')
+        self.assertEqual(pool.submit(ids), ids[:2])
+        self.assertEqual(pool.submit(ids[:2]), [])  # Já agendadas não entram de novo
+        self.assertEqual(pool.metrics()['deferred'], 1)
+        pool.shutdown(timeout=0)
+        # A mensagem recusada continua pendente e é entregue pelo process_email_outbox
+        self.assertEqual(process_batch()['sent'], 3)
+
+
+
+class EmailRenderingTests(TestCase):
+    def test_text_part_derived_from_html(self):
+        html = (
+            '<html><head><title>Título</title><style>p { color: red; }</style></head>'
+            '<body><h1>Olá&nbsp;Ana</h1><p>Sua   solicitação\n foi <b>aprovada</b>.</p>'
+            '<ul><li>Tipo: Visita</li><li>Data: 01/03</li></ul>'
+            '<a href="http://localhost:8000/logs/agenda/">Ver evento</a><img src="cid:logo.png"></body></html>'
+        )
+        self.assertEqual(html_to_text(html), (
+            'Olá Ana\n\nSua solicitação foi aprovada.\n\n- Tipo: Visita\n\n- Data: 01/03\n\n'
+            'Ver evento (http://localhost:8000/logs/agenda/)\n'
+        ))
+
+    def test_batch_loads_template_once(self):
+        users = [{'first_name': 'Ana', 'last_name': 'Lima', 'id': '1', 'email': 'ana@example.com'},
+                 {'first_name': 'Rui', 'last_name': 'Melo', 'id': '2', 'email': 'rui@example.com'}]
+        with mock.patch('Email_notificacoes.rendering.get_template', wraps=get_template) as loader:
+            rendered = render_emails('emails/boas_vindas.html', [{'usuario': user} for user in users])
+        self.assertEqual(loader.call_count, 1)
+        self.assertIn('Ana', rendered[0][1])
+        self.assertIn('Rui', rendered[1][1])
+        self.assertNotIn('<', rendered[1][1])
+
+    def test_inline_image_built_once_and_shared(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            os.makedirs(os.path.join(base_dir, 'static', 'images'))
+            # PNG mínimo (1x1)
+            with open(os.path.join(base_dir, 'static', 'images', 'logo.png'), 'wb') as f:
+                f.write(bytes.fromhex(
+                    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+                ))
+            with self.settings(BASE_DIR=base_dir):
+                self.assertIs(inline_image('images/logo.png'), inline_image('images/logo.png'))
+                items = [EmailOutbox(subject=f'Teste {i}', body='Texto', from_email='lab@example.com',
+                                     to=[f'u{i}@example.com'], html_body='<img src="cid:logo.png">',
+                                     inline_images=['images/logo.png']) for i in range(2)]
+                messages = [build_message(item).message() for item in items]
+                self.assertIsNone(inline_image('images/inexistente.png'))
+                # Um arquivo ausente não fica em cache: publicado depois, passa a ser usado
+                images_dir = os.path.join(base_dir, 'static', 'images')
+                shutil.copy(os.path.join(images_dir, 'logo.png'), os.path.join(images_dir, 'inexistente.png'))
+                self.assertIsNotNone(inline_image('images/inexistente.png'))
+        for message in messages:
+            image = message.get_payload()[-1]
+            self.assertEqual(image['Content-ID'], '<logo.png>')
+        self.assertIs(messages[0].get_payload()[-1], messages[1].get_payload()[-1])
+
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class CountingHandler:
+    """Servidor SMTP de teste: conta as mensagens recebidas"""
+    def __init__(self):
+        self.messages = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return '250 OK'
+
+
+class PooledTransportTests(TestCase):
+    def messages(self, count):
+        return [EmailMessage(f'Teste {i}', 'Texto', 'lab@example.com', [f'u{i}@example.com']) for i in range(count)]
+
+    def test_reconnects_when_session_is_lost(self):
+        transport = PooledTransport()
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=[smtplib.SMTPServerDisconnected('encerrada'), 1, 1]
+        ):
+            results = transport.send_messages(self.messages(2))
+        self.assertEqual(results, [None, None])
+        self.assertEqual((transport.stats['connections'], transport.stats['reconnects']), (2, 1))
+
+    @unittest.skipIf(Controller is None, 'aiosmtpd não está instalado')
+    def test_throughput_against_local_smtp_server(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        handler = CountingHandler()
+        controller = Controller(handler, hostname='127.0.0.1', port=port)
+        controller.start()
+        self.addCleanup(controller.stop)
+        count = 200
+
+        with self.settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+                           EMAIL_PORT=port, EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD=''):
+            # Uma conexão por mensagem, como o send_mail fazia
+            started = time.perf_counter()
+            for message in self.messages(count):
+                get_connection().send_messages([message])
+            individual = time.perf_counter() - started
+
+            transport = PooledTransport()
+            started = time.perf_counter()
+            results = transport.send_messages(self.messages(count))
+            pooled = time.perf_counter() - started
+            transport.close()
+
+        self.assertEqual(results, [None] * count)
+        self.assertEqual(handler.messages, 2 * count)
+        self.assertEqual(transport.stats['connections'], 1)
+        self.assertLess(pooled, individual, f'{count / pooled:.0f} msg/s com conexão compartilhada, '
+                                            f'{count / individual:.0f} msg/s com uma conexão por mensagem')
@@ -0,0 +1,139 @@
+import smtplib
+import threading
+import time
+from django.conf import settings
+from django.core.mail import get_connection
+
+# Configuração padrão; pode ser sobrescrita por settings.EMAIL_TRANSPORT
+DEFAULT_CONFIG = {
+    'BATCH_SIZE': 50,                  # Mensagens enviadas por vez com a conexão reservada
+    'IDLE_TIMEOUT': 60,                # Segundos sem uso após os quais a conexão é reaberta
+    'MAX_MESSAGES_PER_CONNECTION': 500,  # Renova a sessão periodicamente (limite comum nos servidores)
+}
+
+# Falhas da sessão (e não da mensagem): a conexão é reaberta e a mensagem reenviada uma vez
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+# Erros SMTP de uma mensagem específica (destinatário recusado etc.); a sessão continua válida
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'EMAIL_TRANSPORT', {}))
+    return config
+
+
+class PooledTransport:
+    """
+    Conexão de email de longa duração compartilhada pelo processo. A sessão SMTP
+    (conexão, TLS e autenticação) é aberta uma vez e reaproveitada entre os lotes,
+    sendo reaberta quando o servidor a encerra, quando fica ociosa ou após
+    MAX_MESSAGES_PER_CONNECTION mensagens.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._connection = None
+        self._last_used = 0
+        self._sent_on_connection = 0
+        self._lock = threading.Lock()
+        self.stats = {'connections': 0, 'reconnects': 0, 'sent': 0, 'failed': 0}
+
+    def _open(self):
+        connection = get_connection(self.backend, fail_silently=False)
+        connection.open()
+        self._connection = connection
+        self._sent_on_connection = 0
+        self.stats['connections'] += 1
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception as e:
+                print(f"Erro ao fechar a conexão de email: {e}")
+        self._connection = None
+
+    def _ensure_connection(self):
+        config = get_config()
+        if self._connection is not None and (
+            time.monotonic() - self._last_used > config['IDLE_TIMEOUT']
+            or self._sent_on_connection >= config['MAX_MESSAGES_PER_CONNECTION']
+        ):
+            self._close()
+        if self._connection is None:
+            self._open()
+
+    def _send_one(self, message):
+        self._ensure_connection()
+        try:
+            self._connection.send_messages([message])
+        except CONNECTION_ERRORS:
+            # Sessão perdida: reabre e tenta a mesma mensagem mais uma vez
+            self._close()
+            self.stats['reconnects'] += 1
+            self._open()
+            self._connection.send_messages([message])
+        self._sent_on_connection += 1
+        self._last_used = time.monotonic()
+
+    def send_messages(self, messages):
+        """
+        Envia as mensagens em lotes de BATCH_SIZE pela conexão compartilhada.
+        Retorna, na mesma ordem, None para cada mensagem enviada ou a exceção que
+        impediu o envio. Cada mensagem é entregue individualmente dentro da sessão
+        aberta, pois o send_messages do Django não informa qual mensagem de um lote falhou.
+        """
+        results = []
+        batch_size = get_config()['BATCH_SIZE']
+        for index in range(0, len(messages), batch_size):
+            # Outras threads podem usar a conexão entre um lote e outro
+            with self._lock:
+                connection_error = None
+                for message in messages[index:index + batch_size]:
+                    if connection_error is not None:
+                        # Servidor indisponível mesmo após reconectar: o restante do lote falha sem novas tentativas
+                        self.stats['failed'] += 1
+                        results.append(connection_error)
+                        continue
+                    try:
+                        self._send_one(message)
+                    except Exception as e:
+                        # Demais erros de rede (ex.: conexão recusada) também indicam servidor indisponível
+                        if isinstance(e, OSError) and not isinstance(e, MESSAGE_ERRORS):
+                            self._close()
+                            connection_error = e
+                        self.stats['failed'] += 1
+                        results.append(e)
+                        continue
+                    self.stats['sent'] += 1
+                    results.append(None)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Transporte compartilhado do processo (criado no primeiro uso)"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = PooledTransport()
+        return _transport
+
+
+def close_transport():
+    """Encerra a conexão compartilhada (ex.: ao finalizar o processo de entrega)"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+            _transport = None
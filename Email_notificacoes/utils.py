@@ -1,33 +1,68 @@
-import threading
-from django.core.mail import send_mail
+from django.db import transaction
 
-def enviar_email_async(assunto, mensagem, email_de, email_para, html_message=None):
+
+def _entregar_apos_commit(emails):
+    """Após o commit, passa as mensagens gravadas ao pool de envio do processo (ver pool.py)"""
+    # Importação tardia: pool depende de models, que importa este módulo
+    from .pool import deliver_in_process
+
+    ids = [email.id for email in emails]
+    transaction.on_commit(lambda: deliver_in_process(ids))
+
+def montar_email(assunto, mensagem, email_de, email_para, html_message=None, imagens=None):
     """
-    Função para enviar email de forma assíncrona usando threads.
-    
+    Monta a mensagem da fila de envio (EmailOutbox) sem gravá-la.
+
     Args:
         assunto: Assunto do email
         mensagem: Corpo do email em texto simples
         email_de: Email do remetente
         email_para: Lista de emails dos destinatários
         html_message: Versão HTML do email (opcional)
+        imagens: Imagens embutidas no HTML, caminhos relativos a static/ (opcional)
+    """
+    # Importação tardia: models importa este módulo
+    from .models import EmailOutbox
+
+    return EmailOutbox(
+        subject=assunto,
+        body=mensagem,
+        html_body=html_message or '',
+        from_email=email_de,
+        to=list(email_para),
+        inline_images=list(imagens or [])
+    )
+
+def enviar_email_async(assunto, mensagem, email_de, email_para, html_message=None, imagens=None):
     """
-    def envio_em_background():
-        try:
-            send_mail(
-                assunto,
-                mensagem,
-                email_de,
-                email_para,
-                fail_silently=False,
-                html_message=html_message
-            )
-        except Exception as e:
-            print(f"Erro ao enviar email: {e}")
-    
-    # Criando e iniciando a thread
-    thread_email = threading.Thread(target=envio_em_background)
-    thread_email.daemon = True  # A thread será encerrada quando o programa principal terminar
-    thread_email.start()
-    
+    Coloca o email na fila de envio (um único INSERT) e retorna sem esperar o envio.
+    Após o commit a mensagem é entregue pelo pool de envio do processo; o que não
+    couber no pool, ou falhar, é entregue pelo comando process_email_outbox.
+
+    Args:
+        assunto: Assunto do email
+        mensagem: Corpo do email em texto simples
+        email_de: Email do remetente
+        email_para: Lista de emails dos destinatários
+        html_message: Versão HTML do email (opcional)
+        imagens: Imagens embutidas no HTML, caminhos relativos a static/ (opcional)
+    """
+    email = montar_email(assunto, mensagem, email_de, email_para, html_message, imagens)
+    email.save()
+    _entregar_apos_commit([email])
+    return True
+
+def enviar_emails_em_lote_async(emails):
+    """
+    Coloca várias mensagens (ver montar_email) na fila de envio com um único INSERT.
+
+    Args:
+        emails: Lista de mensagens EmailOutbox não gravadas
+    """
+    if not emails:
+        return False
+
+    from .models import EmailOutbox
+
+    _entregar_apos_commit(EmailOutbox.objects.bulk_create(emails))
     return True
@@ -1,16 +1,27 @@
 from django.contrib import admin
 from django.contrib.admin.models import LogEntry
-from .models import Action, Event, LabSchedule
+from .models import Action, Event, ExternalEvent, LabSchedule
 from .utils import log_user_action
+from .search import filter_queryset
 
 @admin.register(Action)
 class ActionAdmin(admin.ModelAdmin):
     list_display = ('date', 'time', 'type', 'author', 'severity', 'url')
-    list_filter = ('date', 'type', 'severity')
-    search_fields = ('author', 'description', 'type', 'url')
+    list_select_related = ('type_ref', 'url_ref')
+    # O filtro por tipo lista apenas a tabela de dimensão ActionType
+    list_filter = ('date', 'type_ref', 'severity')
+    search_fields = ('author', 'description', 'type_ref__name', 'url_ref__path')
     date_hierarchy = 'date'
+    # Tipo, URL e user agent são exibidos como texto pelas propriedades de Action
+    exclude = ('type_ref', 'url_ref', 'user_agent_ref')
     readonly_fields = ('date', 'time', 'author', 'type', 'description', 'url', 'ip_address', 'user_agent')
     
+    def get_search_results(self, request, queryset, search_term):
+        # Busca pelo índice de texto completo (FTS5) em vez de LIKE '%...%' em cada coluna
+        if not search_term:
+            return queryset, False
+        return filter_queryset(queryset, search_term), False
+    
     def has_add_permission(self, request):
         # Impedir adição manual de logs
         return False
@@ -21,7 +32,7 @@ class ActionAdmin(admin.ModelAdmin):
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ('title', 'event_type', 'start_time', 'end_time', 'approved', 'created_by')
+    list_display = ('title', 'event_type', 'start_time', 'end_time', 'recurrence_rule', 'approved', 'created_by')
     list_filter = ('event_type', 'approved', 'start_time')
     search_fields = ('title', 'description')
     filter_horizontal = ('participants',)
@@ -82,4 +93,18 @@ class LabScheduleAdmin(admin.ModelAdmin):
             description=action_desc,
             severity='info',
             request=request
-        )
\ No newline at end of file
+        )
+
+
+@admin.register(ExternalEvent)
+class ExternalEventAdmin(admin.ModelAdmin):
+    list_display = ('title', 'start_time', 'end_time', 'all_day', 'updated', 'synced_at')
+    list_filter = ('all_day', 'start_time')
+    search_fields = ('title', 'description')
+
+    def has_add_permission(self, request):
+        # Os eventos externos são mantidos apenas pela sincronização
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
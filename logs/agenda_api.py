@@ -0,0 +1,163 @@
+import datetime
+import hashlib
+import json
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .google_calendar import get_config as get_google_calendar_config
+from .models import Event, ExternalEvent
+from .recurrence import occurrences, recurring_in_window
+
+# Maior intervalo aceito por requisição (um mês com folga para as semanas da grade)
+MAX_RANGE_DAYS = 62
+
+# Campos disponíveis em ?fields= e a coluna correspondente em cada tabela
+LOCAL_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'start': 'start_time',
+    'end': 'end_time',
+    'event_type': 'event_type',
+    'event_type_display': 'event_type',
+    'url': 'id',
+}
+EXTERNAL_COLUMNS = {
+    'id': 'google_id',
+    'title': 'title',
+    'description': 'description',
+    'start': 'start_time',
+    'end': 'end_time',
+}
+API_FIELDS = ['id', 'title', 'description', 'start', 'end', 'event_type', 'event_type_display', 'is_google', 'url']
+DEFAULT_FIELDS = ['id', 'title', 'start', 'end', 'event_type', 'is_google']
+
+EVENT_TYPE_DISPLAY = dict(Event.EventType.choices)
+
+
+def _parse_bound(value, name):
+    if not value:
+        raise ValueError(f'O parâmetro "{name}" é obrigatório.')
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Data inválida em "{name}": use AAAA-MM-DD ou AAAA-MM-DDTHH:MM.')
+        parsed = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_range(start, end):
+    """Converte os parâmetros start/end no intervalo [start, end). Levanta ValueError."""
+    start = _parse_bound(start, 'start')
+    end = _parse_bound(end, 'end')
+    if end <= start:
+        raise ValueError('"end" deve ser posterior a "start".')
+    if end - start > datetime.timedelta(days=MAX_RANGE_DAYS):
+        raise ValueError(f'O intervalo máximo é de {MAX_RANGE_DAYS} dias.')
+    return start, end
+
+
+def parse_fields(value):
+    """Lista de campos pedida em ?fields=id,title,...; levanta ValueError se houver campo desconhecido"""
+    if not value:
+        return DEFAULT_FIELDS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        raise ValueError(f'Campos desconhecidos: {", ".join(unknown)}.')
+    return fields
+
+
+def _serialize(row, fields, columns, is_google, url_template):
+    item = {}
+    for field in fields:
+        if field == 'is_google':
+            item[field] = is_google
+        elif field == 'event_type':
+            item[field] = 'google' if is_google else row['event_type']
+        elif field == 'event_type_display':
+            item[field] = 'Google Calendar' if is_google else str(EVENT_TYPE_DISPLAY.get(row['event_type'], ''))
+        elif field == 'url':
+            item[field] = None if is_google else url_template.replace('/0/', f"/{row['id']}/")
+        elif field in ('start', 'end'):
+            item[field] = timezone.localtime(row[columns[field]]).isoformat()
+        else:
+            item[field] = row[columns[field]]
+    return item
+
+
+def range_events(start, end, fields, include_google=False):
+    """
+    Eventos aprovados (e, para superusuários, os do Google espelhados localmente)
+    que se sobrepõem a [start, end), ordenados pelo início, com as séries
+    recorrentes expandidas no período. Apenas as colunas necessárias aos campos
+    pedidos são lidas do banco.
+    """
+    local_columns = {LOCAL_COLUMNS[field] for field in fields if field in LOCAL_COLUMNS} | {'start_time'}
+    rows = Event.objects.filter(
+        approved=True, recurrence_rule='', start_time__lt=end, end_time__gt=start
+    ).order_by('start_time').values(*local_columns)
+
+    url_template = reverse('logs:agenda_event_detail', args=[0])
+    events = [(row['start_time'], _serialize(row, fields, LOCAL_COLUMNS, False, url_template)) for row in rows]
+
+    # Séries recorrentes: expandidas apenas dentro do período pedido
+    series = recurring_in_window(Event.objects.filter(approved=True), start, end).values(
+        *local_columns, 'id', 'end_time', 'updated_at', 'recurrence_rule', 'recurrence_exceptions'
+    )
+    for row in series:
+        for occurrence_start, occurrence_end in occurrences(
+            row['id'], row['updated_at'], row['start_time'], row['end_time'],
+            row['recurrence_rule'], row['recurrence_exceptions'], start, end
+        ):
+            occurrence = dict(row, start_time=occurrence_start, end_time=occurrence_end)
+            events.append((occurrence_start, _serialize(occurrence, fields, LOCAL_COLUMNS, False, url_template)))
+
+    if include_google:
+        external_columns = {EXTERNAL_COLUMNS[field] for field in fields if field in EXTERNAL_COLUMNS} | {'start_time'}
+        external_rows = ExternalEvent.objects.filter(
+            calendar_id=get_google_calendar_config()['CALENDAR_ID'],
+            start_time__lt=end,
+            end_time__gt=start
+        ).values(*external_columns)
+        events.extend(
+            (row['start_time'], _serialize(row, fields, EXTERNAL_COLUMNS, True, url_template))
+            for row in external_rows
+        )
+
+    events.sort(key=lambda pair: pair[0])
+
+    return [item for _, item in events]
+
+
+def range_etag(start, end, fields, include_google=False):
+    """
+    Versão da resposta da API de intervalo, obtida com consultas agregadas (sem
+    montar o corpo): quantidade e última alteração dos eventos locais e das séries
+    recorrentes do período e, para superusuários, dos eventos do Google. A
+    quantidade faz parte da versão para que exclusões também a alterem.
+    """
+    local = Event.objects.filter(approved=True, recurrence_rule='', start_time__lt=end, end_time__gt=start)
+    stats = (local | recurring_in_window(Event.objects.filter(approved=True), start, end)).aggregate(
+        count=Count('id'), last_modified=Max('updated_at')
+    )
+    parts = [start.isoformat(), end.isoformat(), ','.join(fields), str(stats['count']), str(stats['last_modified'])]
+    if include_google:
+        external = ExternalEvent.objects.filter(
+            calendar_id=get_google_calendar_config()['CALENDAR_ID'], start_time__lt=end, end_time__gt=start
+        ).aggregate(count=Count('id'), last_modified=Max('synced_at'))
+        parts += ['google', str(external['count']), str(external['last_modified'])]
+    return hashlib.sha1(':'.join(parts).encode()).hexdigest()
+
+
+def render_range(start, end, fields, include_google=False):
+    """Corpo JSON (compacto) da resposta da API de intervalo"""
+    return json.dumps({
+        'start': timezone.localtime(start).isoformat(),
+        'end': timezone.localtime(end).isoformat(),
+        'events': range_events(start, end, fields, include_google),
+    }, ensure_ascii=False, separators=(',', ':'))
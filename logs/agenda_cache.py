@@ -0,0 +1,103 @@
+import datetime
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_AGENDA_CACHE
+DEFAULT_CONFIG = {
+    'TIMEOUT': 3600,   # Segundos em que cada fragmento da agenda fica em cache
+}
+
+# Versões dos fragmentos da agenda. Cada versão é um token aleatório, trocado a cada
+# alteração: os fragmentos gravados com o token anterior simplesmente deixam de ser
+# usados. Se a versão sair do cache, um token novo é gerado e nada antigo é reaproveitado.
+MONTH_VERSION_KEY = 'logs:agenda:version:month:{year}-{month}'
+SCHEDULE_VERSION_KEY = 'logs:agenda:version:schedule'
+# Séries recorrentes podem não ter fim: alterá-las invalida todos os meses
+RECURRING_VERSION_KEY = 'logs:agenda:version:recurring'
+EXTERNAL_VERSION_KEY = 'logs:agenda:version:external'
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_AGENDA_CACHE', {}))
+    return config
+
+
+def user_role(user):
+    """Papel do usuário na chave dos fragmentos (o conteúdo visível muda por papel)"""
+    if user.is_superuser:
+        return 'superuser'
+    if user.is_staff:
+        return 'staff'
+    return 'member'
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def fragment_versions(year, month, include_google=False):
+    """
+    Versões atuais dos fragmentos de agenda_home em (year, month), lidas com uma
+    única consulta ao cache: 'events' (grade e próximos eventos) e 'schedule'.
+    """
+    month_key = MONTH_VERSION_KEY.format(year=year, month=month)
+    keys = [month_key, RECURRING_VERSION_KEY, SCHEDULE_VERSION_KEY]
+    if include_google:
+        keys.append(EXTERNAL_VERSION_KEY)
+    versions = _versions(keys)
+    events_version = versions[month_key] + versions[RECURRING_VERSION_KEY]
+    if include_google:
+        events_version += versions[EXTERNAL_VERSION_KEY]
+    return {'events': events_version, 'schedule': versions[SCHEDULE_VERSION_KEY]}
+
+
+def months_between(start_time, end_time):
+    """Meses (ano, mês) cobertos pelo intervalo [start_time, end_time), no fuso local"""
+    start = timezone.localtime(start_time).date().replace(day=1)
+    end_time = max(end_time - datetime.timedelta(microseconds=1), start_time)
+    end = timezone.localtime(end_time).date()
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def invalidate_months(months):
+    """Descarta os fragmentos de eventos dos meses informados"""
+    cache.set_many({
+        MONTH_VERSION_KEY.format(year=year, month=month): uuid.uuid4().hex
+        for year, month in months
+    }, None)
+
+
+def invalidate_events(periods):
+    """
+    Descarta os fragmentos afetados por eventos nos períodos informados, uma lista de
+    (início, término, recorrente). Uma série recorrente invalida todos os meses.
+    """
+    if any(recurring for _, _, recurring in periods):
+        cache.set(RECURRING_VERSION_KEY, uuid.uuid4().hex, None)
+    invalidate_months({
+        month for start_time, end_time, recurring in periods if not recurring
+        for month in months_between(start_time, end_time)
+    })
+
+
+def invalidate_schedule():
+    """Descarta os fragmentos da tabela de horários de funcionamento"""
+    cache.set(SCHEDULE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_external():
+    """Descarta os fragmentos de eventos dos superusuários (que incluem o Google Calendar)"""
+    cache.set(EXTERNAL_VERSION_KEY, uuid.uuid4().hex, None)
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def garantir_busca_textual(sender, using, **kwargs):
+    """Recria os triggers da busca textual caso uma migração tenha recriado logs_action"""
+    from django.db import connections
+    from .search import ensure_index
+
+    if 'logs_action' in connections[using].introspection.table_names():
+        ensure_index(connections[using])
 
 
 class LogsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'logs'
+
+    def ready(self):
+        import logs.signals  # Importa os sinais quando o app for carregado
+        post_migrate.connect(garantir_busca_textual, sender=self)
@@ -0,0 +1,196 @@
+import datetime
+import gzip
+import json
+import os
+import shutil
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection, transaction
+from .export import filter_actions, iter_ndjson
+from .models import Action, DailyActionSummary
+
+# Quantidade de registros excluídos por comando DELETE
+ARCHIVE_DELETE_CHUNK_SIZE = 1000
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'LOGS_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'logs_archive')))
+
+
+def archive_path(year, month):
+    """Caminho do arquivo compactado (NDJSON + gzip) de um mês"""
+    return os.path.join(get_archive_dir(), f'actions-{year:04d}-{month:02d}.ndjson.gz')
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+class ArchivedAction:
+    """
+    Ação lida de um arquivo de arquivamento. Expõe os mesmos atributos de Action
+    usados por FormattedAction, sem tocar no banco de dados.
+    """
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.author = data.get('author')
+        self.type = data.get('type')
+        self.description = data.get('description', '')
+        self.date = datetime.date.fromisoformat(data['date'])
+        self.time = datetime.time.fromisoformat(data['time'])
+        self.url = data.get('url')
+        self.severity = data.get('severity', 'info')
+        self.ip_address = data.get('ip_address')
+        self.user_agent = data.get('user_agent')
+        self.occurrences = data.get('occurrences') or 1
+        self.last_seen = datetime.datetime.fromisoformat(data['last_seen']) if data.get('last_seen') else None
+
+
+def _delete_actions(queryset, max_id, chunk_size):
+    """
+    Exclui as ações em lotes com DELETE direto, sem carregar os objetos.
+    Os signals de Action não são disparados: os resumos diários são preservados.
+    """
+    table = connection.ops.quote_name(Action._meta.db_table)
+    deleted = 0
+    while True:
+        ids = list(queryset.filter(id__lte=max_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with transaction.atomic(), connection.cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+        deleted += len(ids)
+
+
+def _archived_ids(path):
+    """IDs das ações já gravadas no arquivo do mês"""
+    if not os.path.exists(path):
+        return set()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return {json.loads(line)['id'] for line in f if line.strip()}
+
+
+def _write_archive(path, queryset):
+    """
+    Acrescenta as ações ao arquivo do mês de forma idempotente: ações já arquivadas
+    (ex.: execução anterior interrompida antes da exclusão) não são gravadas de novo.
+    O arquivo é montado em um temporário e só então substitui o original, de modo
+    que uma falha durante a escrita não deixa o arquivo do mês corrompido.
+    """
+    existing = _archived_ids(path)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as out:
+        if existing:
+            with open(path, 'rb') as original:
+                shutil.copyfileobj(original, out)
+        # As novas ações formam um novo membro gzip, lido em sequência pelo gzip
+        with gzip.open(out, 'wt', encoding='utf-8') as f:
+            for line in iter_ndjson(queryset):
+                if json.loads(line)['id'] not in existing:
+                    f.write(line)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(temporary, path)
+
+
+def archive_actions(cutoff_date, chunk_size=ARCHIVE_DELETE_CHUNK_SIZE, log=print):
+    """
+    Move as ações anteriores a `cutoff_date` para arquivos mensais compactados
+    e as exclui do banco em lotes. Retorna o número de ações arquivadas.
+    """
+    os.makedirs(get_archive_dir(), exist_ok=True)
+    total = 0
+
+    first = Action.objects.filter(date__lt=cutoff_date).order_by('date').values_list('date', flat=True).first()
+    if first is None:
+        return 0
+
+    month = _month_start(first)
+    while month < cutoff_date:
+        end = min(_next_month(month), cutoff_date)
+        queryset = filter_actions(start_date=month, end_date=end - datetime.timedelta(days=1))
+        max_id = queryset.order_by('-id').values_list('id', flat=True).first()
+
+        if max_id is not None:
+            path = archive_path(month.year, month.month)
+            _write_archive(path, queryset.filter(id__lte=max_id))
+
+            DailyActionSummary.objects.filter(date__gte=month, date__lt=end).update(archived=True)
+            archived = _delete_actions(queryset, max_id, chunk_size)
+            total += archived
+            log(f'{month:%m/%Y}: {archived} ação(ões) arquivada(s) em {path}')
+
+        month = _next_month(month)
+
+    return total
+
+
+@lru_cache(maxsize=8)
+def _load_day(path, mtime, day_iso):
+    rows = []
+    marker = f'"date": "{day_iso}"'
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            # Filtro prévio por texto evita decodificar o JSON da maioria das linhas de
+            # outros dias; a data é confirmada no campo decodificado
+            if marker not in line:
+                continue
+            data = json.loads(line)
+            if data['date'] == day_iso:
+                rows.append(ArchivedAction(data))
+    rows.sort(key=lambda action: (action.time, action.id))
+    return tuple(rows)
+
+
+def load_archived_day(day):
+    """
+    Lê (sob demanda) as ações de um dia arquivado. O resultado fica em cache
+    enquanto o arquivo do mês não for modificado.
+    """
+    path = archive_path(day.year, day.month)
+    if not os.path.exists(path):
+        return []
+    return list(_load_day(path, os.path.getmtime(path), day.isoformat()))
+
+
+def load_day_actions(day, severity=None):
+    """
+    Ações de um dia arquivado, em ordem (time, id): as do arquivo mais as gravadas
+    no banco depois do arquivamento (recuperação do arquivo de spill, gravações
+    atrasadas do buffer), que ficam no banco até a próxima execução do archive_actions.
+    """
+    actions = load_archived_day(day)
+    archived_ids = {action.id for action in actions}
+    # Uma execução interrompida antes da exclusão deixa a ação nos dois lugares
+    live = [
+        action for action in Action.objects.filter(date=day).select_related('type_ref', 'url_ref', 'user_agent_ref')
+        if action.id not in archived_ids
+    ]
+    if live:
+        actions = sorted(actions + live, key=lambda action: (action.time, action.id))
+    if severity:
+        actions = [action for action in actions if action.severity == severity]
+    return actions
+
+
+def paginate_archived(actions, after=None, before=None, page_size=100):
+    """
+    Aplica a mesma paginação por cursor (time, id) de logs_datepage a uma lista
+    ordenada de ações arquivadas. Retorna (página, has_previous, has_next).
+    """
+    if before:
+        earlier = [action for action in actions if (action.time, action.id) < before]
+        page = earlier[-page_size:]
+        return page, len(earlier) > page_size, True
+
+    if after:
+        later = [action for action in actions if (action.time, action.id) > after]
+    else:
+        later = actions
+    return later[:page_size], after is not None, len(later) > page_size
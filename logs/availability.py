@@ -0,0 +1,166 @@
+import datetime
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import Event, LabSchedule
+from .recurrence import occurrences, recurring_in_window
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_AVAILABILITY
+DEFAULT_CONFIG = {
+    'MAX_RANGE_DAYS': 180,          # Maior período aceito por consulta
+    'SLOT_STEP_MINUTES': 30,        # Os inícios sugeridos são arredondados para este passo
+    'DEFAULT_DURATION_MINUTES': 120,
+    'SUGGESTION_DAYS': 30,          # Dias à frente considerados nas sugestões do formulário de visita
+    'MAX_SUGGESTIONS': 6,
+}
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_AVAILABILITY', {}))
+    return config
+
+
+def parse_request(start, end, duration):
+    """
+    Converte os parâmetros start/end (AAAA-MM-DD, inclusivos) e duration (minutos)
+    em (data inicial, data final, timedelta). Levanta ValueError.
+    """
+    config = get_config()
+    start_date = parse_date(start or '')
+    end_date = parse_date(end or '')
+    if start_date is None or end_date is None:
+        raise ValueError('Os parâmetros "start" e "end" são obrigatórios, no formato AAAA-MM-DD.')
+    if end_date < start_date:
+        raise ValueError('"end" deve ser igual ou posterior a "start".')
+    if (end_date - start_date).days >= config['MAX_RANGE_DAYS']:
+        raise ValueError(f'O intervalo máximo é de {config["MAX_RANGE_DAYS"]} dias.')
+    try:
+        minutes = int(duration) if duration else config['DEFAULT_DURATION_MINUTES']
+    except ValueError:
+        raise ValueError('"duration" deve ser um número inteiro de minutos.')
+    if minutes < 1 or minutes > 24 * 60:
+        raise ValueError('"duration" deve estar entre 1 e 1440 minutos.')
+    return start_date, end_date, datetime.timedelta(minutes=minutes)
+
+
+def opening_intervals(start_date, end_date, schedules):
+    """
+    Horários de funcionamento [(abertura, fechamento)] de cada dia entre as datas
+    (inclusivas). Dias fechados ou sem horário cadastrado não entram: só sugerimos
+    horários que a equipe definiu como de atendimento.
+    """
+    intervals = []
+    day = start_date
+    while day <= end_date:
+        schedule = schedules.get(day.weekday())
+        if schedule is not None and not schedule.is_closed and schedule.closing_time > schedule.opening_time:
+            intervals.append((
+                timezone.make_aware(datetime.datetime.combine(day, schedule.opening_time)),
+                timezone.make_aware(datetime.datetime.combine(day, schedule.closing_time)),
+            ))
+        day += datetime.timedelta(days=1)
+    return intervals
+
+
+def busy_intervals(start, end):
+    """
+    Intervalos ocupados por eventos aprovados em [start, end): uma consulta para os
+    eventos únicos e outra para as séries recorrentes, expandidas apenas no período.
+    """
+    intervals = list(Event.objects.filter(
+        approved=True, recurrence_rule='', start_time__lt=end, end_time__gt=start
+    ).values_list('start_time', 'end_time'))
+
+    series = recurring_in_window(Event.objects.filter(approved=True), start, end).values_list(
+        'id', 'updated_at', 'start_time', 'end_time', 'recurrence_rule', 'recurrence_exceptions'
+    )
+    for row in series:
+        intervals.extend(occurrences(*row, start, end))
+    return intervals
+
+
+def free_intervals(opening, busy):
+    """
+    Varredura (sweep line) sobre as bordas ordenadas dos intervalos: um instante está
+    livre quando há algum horário de funcionamento aberto e nenhum evento em andamento.
+    Retorna os intervalos livres [(início, fim)] em ordem, em O(n log n).
+    """
+    points = [(start, 1, 0) for start, _ in opening] + [(end, -1, 0) for _, end in opening]
+    points += [(start, 0, 1) for start, _ in busy] + [(end, 0, -1) for _, end in busy]
+    points.sort(key=lambda point: point[0])
+
+    result = []
+    open_count = busy_count = 0
+    free_since = None
+    for index, (moment, open_delta, busy_delta) in enumerate(points):
+        open_count += open_delta
+        busy_count += busy_delta
+        # Todas as bordas do mesmo instante são aplicadas antes de avaliar o estado
+        if index + 1 < len(points) and points[index + 1][0] == moment:
+            continue
+        is_free = open_count > 0 and busy_count == 0
+        if is_free and free_since is None:
+            free_since = moment
+        elif not is_free and free_since is not None:
+            if moment > free_since:
+                result.append((free_since, moment))
+            free_since = None
+    return result
+
+
+def _round_up(moment, step):
+    """Arredonda `moment` para cima até o próximo múltiplo de `step` no horário local"""
+    local = timezone.localtime(moment)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    steps = -(-(local - midnight) // step)
+    return midnight + steps * step
+
+
+def free_slots(start_date, end_date, duration, step=None):
+    """
+    Intervalos livres entre as datas (inclusivas) em que cabe uma reserva de
+    `duration`: horários de funcionamento menos os eventos aprovados, a partir de
+    agora. O início de cada intervalo é arredondado para o passo configurado.
+    Usa três consultas ao todo, qualquer que seja o tamanho do período.
+    """
+    if step is None:
+        step = datetime.timedelta(minutes=get_config()['SLOT_STEP_MINUTES'])
+    schedules = {schedule.day_of_week: schedule for schedule in LabSchedule.objects.all()}
+    opening = opening_intervals(start_date, end_date, schedules)
+    if not opening:
+        return []
+
+    now = timezone.now()
+    opening = [(max(start, now), end) for start, end in opening if end > now]
+    if not opening:
+        return []
+    busy = busy_intervals(opening[0][0], opening[-1][1])
+
+    slots = []
+    for start, end in free_intervals(opening, busy):
+        start = _round_up(start, step)
+        if start + duration <= end:
+            slots.append((start, end))
+    return slots
+
+
+def suggested_slots(duration=None):
+    """Primeiros horários livres dos próximos dias, exibidos no formulário de visita"""
+    config = get_config()
+    if duration is None:
+        duration = datetime.timedelta(minutes=config['DEFAULT_DURATION_MINUTES'])
+    today = timezone.localdate()
+    slots = free_slots(today, today + datetime.timedelta(days=config['SUGGESTION_DAYS']), duration)
+    return [(start, start + duration) for start, _ in slots[:config['MAX_SUGGESTIONS']]]
+
+
+def render_slots(slots, duration):
+    """Dados da resposta JSON da API de horários livres"""
+    return {
+        'duration': int(duration.total_seconds() // 60),
+        'slots': [
+            {'start': timezone.localtime(start).isoformat(), 'end': timezone.localtime(end).isoformat()}
+            for start, end in slots
+        ],
+    }
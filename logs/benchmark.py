@@ -0,0 +1,339 @@
+import datetime
+import platform
+import random
+import sqlite3
+import statistics
+import time
+import tracemalloc
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from . import search
+from .metrics import QueryCounter, percentile
+from .models import Action, ActionType, ActionUrl, UserAgent, DailyActionSummary, Event, LabSchedule
+
+# Tamanho padrão da massa de dados gerada para o benchmark
+DEFAULT_DATASET = {
+    'actions': 2000000,
+    'events': 20000,
+    'users': 2000,
+    'days': 365,
+}
+
+# Quantidade de linhas inseridas por executemany durante a geração
+INSERT_CHUNK_SIZE = 10000
+
+# Matrícula do usuário administrador usado nas requisições
+BENCHMARK_USER_ID = '900000000000'
+
+ACTION_TYPES = [
+    ('Login', 'info'), ('Logout', 'info'), ('Acesso', 'info'), ('Cadastro', 'info'),
+    ('Edição', 'info'), ('Exclusão', 'warning'), ('Acesso Negado', 'security'),
+    ('Erro do Servidor', 'error'), ('Exceção', 'critical'), ('Requisição Lenta', 'warning'),
+]
+ACTION_URLS = [
+    '/', '/logs/', '/logs/agenda/', '/logs/agenda/pendentes/', '/users/perfil/',
+    '/users/cadastro/', '/admin/', '/ar_condicionado/', '/logs/busca/',
+]
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+]
+WORDS = (
+    'usuário acessou página laboratório evento visita cadastro sensor temperatura '
+    'relatório aprovado pendente cartão ponto inventário projeto erro tempo'
+).split()
+
+
+def _insert_many(table, columns, rows):
+    """Insere as linhas com executemany em lotes, sem passar pelo ORM"""
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns))
+    )
+    total = 0
+    chunk = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= INSERT_CHUNK_SIZE:
+                cursor.executemany(sql, chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(sql, chunk)
+            total += len(chunk)
+    return total
+
+
+def _generate_users(rng, amount):
+    User = get_user_model()
+    # O hash é calculado uma única vez: gerar milhares de hashes levaria minutos
+    password = make_password('benchmark')
+    users = [
+        User(
+            id=str(100000000000 + i),
+            first_name=f'Usuário{i}',
+            last_name=rng.choice(['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima']),
+            email=f'usuario{i}@benchmark.local',
+            password=password,
+        )
+        for i in range(amount)
+    ]
+    users.append(User(
+        id=BENCHMARK_USER_ID, first_name='Benchmark', last_name='Admin',
+        email='admin@benchmark.local', password=password, is_staff=True,
+    ))
+    User.objects.bulk_create(users, batch_size=1000)
+    return [user.id for user in users]
+
+
+def _generate_actions(rng, amount, days, user_ids):
+    type_ids = [(ActionType.intern(name), severity) for name, severity in ACTION_TYPES]
+    url_ids = [ActionUrl.intern(path) for path in ACTION_URLS]
+    agent_ids = [UserAgent.intern(agent) for agent in USER_AGENTS]
+    first_day = timezone.now().date() - datetime.timedelta(days=days - 1)
+    # Os tipos informativos são muito mais frequentes que os erros
+    weights = [30, 10, 30, 5, 10, 3, 3, 2, 1, 1]
+
+    def rows():
+        # As ações são geradas em ordem cronológica, como no uso real
+        for i in range(amount):
+            day = first_day + datetime.timedelta(days=i * days // amount)
+            seconds = rng.randrange(86400)
+            type_id, severity = rng.choices(type_ids, weights)[0]
+            yield (
+                rng.choice(user_ids),
+                type_id,
+                ' '.join(rng.choices(WORDS, k=6)),
+                day.isoformat(),
+                f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}',
+                rng.choice(url_ids),
+                severity,
+                f'10.0.{rng.randrange(256)}.{rng.randrange(256)}',
+                rng.choice(agent_ids),
+                1,
+            )
+
+    columns = [
+        'author', 'type_ref_id', 'description', 'date', 'time',
+        'url_ref_id', 'severity', 'ip_address', 'user_agent_ref_id', 'occurrences',
+    ]
+    return _insert_many(Action._meta.db_table, columns, rows())
+
+
+def _generate_events(rng, amount, user_ids):
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    event_types = [choice for choice, _ in Event.EventType.choices]
+    events = []
+    for i in range(amount):
+        # Eventos espalhados em dois anos ao redor de hoje; alguns duram vários dias
+        start = now + datetime.timedelta(hours=rng.randrange(-365 * 24, 365 * 24))
+        if rng.random() < 0.05:
+            end = start + datetime.timedelta(days=rng.randint(1, 5))
+        else:
+            end = start + datetime.timedelta(hours=rng.randint(1, 4))
+        events.append(Event(
+            title=f'Evento {i}',
+            description=' '.join(rng.choices(WORDS, k=12)),
+            start_time=start,
+            end_time=end,
+            event_type=rng.choice(event_types),
+            created_by_id=rng.choice(user_ids),
+            approved=rng.random() < 0.9,
+        ))
+    Event.objects.bulk_create(events, batch_size=1000)
+    return amount
+
+
+def _generate_schedule():
+    LabSchedule.objects.bulk_create([
+        LabSchedule(
+            day_of_week=day,
+            opening_time=datetime.time(8),
+            closing_time=datetime.time(22),
+            is_closed=day >= 5,
+        )
+        for day in range(7)
+    ])
+
+
+def dataset_exists():
+    return get_user_model().objects.filter(id=BENCHMARK_USER_ID).exists()
+
+
+def generate_dataset(actions, events, users, days, seed=0, log=print):
+    """
+    Gera a massa de dados do benchmark no banco atual. Os índices de busca
+    textual são desativados durante a carga e reconstruídos no final.
+    """
+    rng = random.Random(seed)
+    with_fts = search.is_available()
+    if with_fts:
+        search.drop_index()
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous = OFF')
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        user_ids = _generate_users(rng, users)
+        log(f'{len(user_ids)} usuários gerados ({time.perf_counter() - started:.1f}s)')
+
+        started = time.perf_counter()
+        total = _generate_actions(rng, actions, days, user_ids)
+        log(f'{total} ações geradas ({time.perf_counter() - started:.1f}s)')
+
+        started = time.perf_counter()
+        _generate_events(rng, events, user_ids)
+        _generate_schedule()
+        log(f'{events} eventos gerados ({time.perf_counter() - started:.1f}s)')
+
+    started = time.perf_counter()
+    DailyActionSummary.rebuild()
+    if with_fts:
+        search.create_index()
+        search.rebuild_index()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    log(f'Resumos diários e índices reconstruídos ({time.perf_counter() - started:.1f}s)')
+
+
+def dataset_info():
+    return {
+        'actions': Action.objects.count(),
+        'events': Event.objects.count(),
+        'pending_events': Event.objects.filter(approved=False).count(),
+        'users': get_user_model().objects.count(),
+        'days': DailyActionSummary.objects.count(),
+    }
+
+
+def default_cases():
+    """Rotas medidas pelo benchmark: (nome, url)"""
+    busiest = DailyActionSummary.objects.order_by('-total').values_list('date', flat=True).first()
+    busiest = busiest or timezone.now().date()
+    return [
+        ('logs_list', reverse('logs:index')),
+        ('logs_datepage', reverse('logs:datepage', kwargs={
+            'day': busiest.day, 'month': busiest.month, 'year': busiest.year,
+        })),
+        ('agenda_home', reverse('logs:agenda_home')),
+        ('pending_events', reverse('logs:pending_events')),
+    ]
+
+
+def _timing_summary(durations):
+    ordered = sorted(durations)
+    return {
+        'min': ordered[0] * 1000,
+        'median': statistics.median(ordered) * 1000,
+        'mean': statistics.fmean(ordered) * 1000,
+        'p95': percentile(ordered, 0.95) * 1000,
+        'max': ordered[-1] * 1000,
+    }
+
+
+def _failure(response):
+    """Descrição da falha de uma resposta (None se a rota respondeu com sucesso)"""
+    if response.exc_info:
+        _, exception, _ = response.exc_info
+        return f'{type(exception).__name__}: {exception}'
+    if response.status_code >= 400:
+        return f'HTTP {response.status_code}'
+    return None
+
+
+def run_case(client, name, url, repeat=5, warmup=1):
+    """
+    Mede uma rota: tempos de resposta (ms), número de consultas SQL e pico de
+    memória alocada (tracemalloc, medido em uma execução separada para não
+    distorcer os tempos). Se a rota falhar, o resultado traz apenas o status e
+    o erro, e as demais rotas continuam sendo medidas.
+    """
+    result = {'name': name, 'url': url, 'repeat': repeat}
+    try:
+        for _ in range(warmup):
+            response = client.get(url)
+            error = _failure(response)
+            if error:
+                return dict(result, status=response.status_code, error=error)
+
+        durations = []
+        for _ in range(repeat):
+            queries = QueryCounter()
+            with queries.install():
+                started = time.perf_counter()
+                response = client.get(url)
+                durations.append(time.perf_counter() - started)
+            error = _failure(response)
+            if error:
+                return dict(result, status=response.status_code, error=error)
+
+        tracemalloc.start()
+        try:
+            client.get(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        return dict(result, status=None, error=f'{type(e).__name__}: {e}')
+
+    return dict(
+        result,
+        status=response.status_code,
+        error=None,
+        time_ms=_timing_summary(durations),
+        queries=queries.count,
+        db_time_ms=queries.duration * 1000,
+        peak_memory_kb=peak / 1024,
+        response_bytes=len(response.content),
+    )
+
+
+def run_benchmark(cases=None, repeat=5, warmup=1):
+    # Exceções das views viram respostas 500: uma rota quebrada não interrompe as demais
+    client = Client(raise_request_exception=False)
+    client.force_login(get_user_model().objects.get(id=BENCHMARK_USER_ID))
+    cases = cases or default_cases()
+    return {
+        'meta': {
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'dataset': dataset_info(),
+        },
+        'results': [run_case(client, name, url, repeat, warmup) for name, url in cases],
+    }
+
+
+def compare_results(previous, current):
+    """
+    Compara duas execuções pelo nome da rota. Retorna uma lista de dicionários
+    com a mediana anterior e atual e a variação percentual.
+    """
+    previous_by_name = {result['name']: result for result in previous.get('results', [])}
+    rows = []
+    for result in current['results']:
+        before = previous_by_name.get(result['name'])
+        # Rotas que falharam em uma das execuções não têm tempos a comparar
+        if before is None or before.get('error') or result.get('error'):
+            continue
+        old, new = before['time_ms']['median'], result['time_ms']['median']
+        rows.append({
+            'name': result['name'],
+            'before_ms': old,
+            'after_ms': new,
+            'change_pct': (new - old) / old * 100 if old else 0.0,
+            'queries_before': before['queries'],
+            'queries_after': result['queries'],
+        })
+    return rows
@@ -0,0 +1,306 @@
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Subquery
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_ACTION_BUFFER
+DEFAULT_CONFIG = {
+    'MAX_SIZE': 10000,           # Número máximo de registros aguardando gravação
+    'BATCH_SIZE': 500,           # Quantidade de registros gravados por bulk_create
+    'FLUSH_INTERVAL': 2.0,       # Segundos máximos entre gravações
+    'OVERFLOW_POLICY': 'drop_info',  # 'block', 'drop_info' ou 'spill'
+    'BLOCK_TIMEOUT': 5.0,        # Tempo máximo de espera da política 'block'
+    'SPILL_FILE': None,          # Arquivo NDJSON usado pela política 'spill'
+    'SYNC': False,               # Grava imediatamente, sem thread (útil em testes)
+}
+
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP_INFO = 'drop_info'
+OVERFLOW_SPILL = 'spill'
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_ACTION_BUFFER', {}))
+    return config
+
+
+class ActionBuffer:
+    """
+    Buffer de gravação tardia (write-behind) para registros de Action.
+
+    As requisições apenas enfileiram os dados da ação; uma thread em segundo plano
+    grava os registros em lotes com bulk_create, quando o lote enche ou quando
+    o intervalo de gravação expira. A fila é limitada e o comportamento quando
+    está cheia é definido por OVERFLOW_POLICY.
+    """
+
+    def __init__(self):
+        self._queue = deque()
+        # Ocorrências repetidas de erros já registrados: fingerprint -> [quantidade, último horário]
+        self._occurrences = {}
+        self._condition = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.stats = Counter()
+
+    # ------------------------------------------------------------------
+    # Enfileiramento
+    # ------------------------------------------------------------------
+    def add(self, **fields):
+        """
+        Enfileira uma ação para gravação. Os argumentos são os campos de Action.
+        """
+        config = get_config()
+
+        if config['SYNC']:
+            self._persist([fields])
+            return True
+
+        with self._condition:
+            if len(self._queue) >= config['MAX_SIZE'] and not self._handle_overflow(fields, config):
+                return False
+
+            self._queue.append(fields)
+            self.stats['queued'] += 1
+            if len(self._queue) >= config['BATCH_SIZE']:
+                self._condition.notify_all()
+
+        self._ensure_worker()
+        return True
+
+    def add_occurrence(self, fingerprint, last_seen):
+        """
+        Registra mais uma ocorrência de um erro já gravado (ver logs/coalescing.py).
+        As ocorrências são acumuladas em memória e aplicadas com um único UPDATE por
+        fingerprint a cada gravação.
+        """
+        if get_config()['SYNC']:
+            self._apply_occurrences({fingerprint: [1, last_seen]})
+            return
+
+        with self._condition:
+            entry = self._occurrences.setdefault(fingerprint, [0, last_seen])
+            entry[0] += 1
+            entry[1] = last_seen
+
+        self._ensure_worker()
+
+    def _handle_overflow(self, fields, config):
+        """
+        Aplica a política de estouro. Deve ser chamado com o lock adquirido.
+        Retorna True se houver espaço para enfileirar o registro.
+        """
+        policy = config['OVERFLOW_POLICY']
+
+        if policy == OVERFLOW_BLOCK:
+            self._condition.notify_all()
+            deadline = time.monotonic() + config['BLOCK_TIMEOUT']
+            while len(self._queue) >= config['MAX_SIZE']:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['dropped'] += 1
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+        if policy == OVERFLOW_SPILL and config['SPILL_FILE']:
+            self._spill([fields], config)
+            return False
+
+        # drop_info: descarta primeiro os registros informativos
+        if fields.get('severity', 'info') == 'info':
+            self.stats['dropped'] += 1
+            return False
+
+        for index, queued in enumerate(self._queue):
+            if queued.get('severity', 'info') == 'info':
+                del self._queue[index]
+                self.stats['dropped'] += 1
+                return True
+
+        self.stats['dropped'] += 1
+        return False
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+    def flush(self):
+        """Grava imediatamente todos os registros pendentes."""
+        # As ocorrências são capturadas antes de esvaziar a fila: assim o primeiro
+        # registro de cada erro já estará gravado quando o contador for atualizado
+        with self._condition:
+            occurrences, self._occurrences = self._occurrences, {}
+
+        while True:
+            batch = self._take_batch(get_config()['BATCH_SIZE'])
+            if not batch:
+                break
+            self._persist(batch)
+        self._recover_spill()
+
+        if occurrences:
+            self._apply_occurrences(occurrences)
+
+    def _apply_occurrences(self, occurrences):
+        from .models import Action
+
+        try:
+            for fingerprint, (count, last_seen) in occurrences.items():
+                latest = Action.objects.filter(fingerprint=fingerprint).order_by('-id').values('id')[:1]
+                Action.objects.filter(id=Subquery(latest)).update(
+                    occurrences=F('occurrences') + count,
+                    last_seen=last_seen
+                )
+        except Exception as e:
+            print(f"Erro ao atualizar ocorrências de logs: {e}")
+
+    def _take_batch(self, size):
+        with self._condition:
+            batch = []
+            while self._queue and len(batch) < size:
+                batch.append(self._queue.popleft())
+            if batch:
+                # Libera produtores bloqueados pela política 'block'
+                self._condition.notify_all()
+            return batch
+
+    def _persist(self, batch):
+        from .models import Action, DailyActionSummary
+
+        try:
+            # Os textos internados são resolvidos antes da transação, para que fiquem no cache
+            actions = [Action(**fields) for fields in batch]
+
+            # Ações e resumos na mesma transação: se o resumo falhar, o lote inteiro é
+            # desfeito e pode ir para o arquivo de transbordo sem duplicar registros
+            with transaction.atomic():
+                Action.objects.bulk_create(actions)
+
+                # bulk_create não dispara post_save; atualiza os resumos diários por grupo
+                groups = Counter((fields['date'], fields.get('severity', 'info')) for fields in batch)
+                for (day, severity), amount in groups.items():
+                    DailyActionSummary.register(day, severity, amount=amount)
+
+            self.stats['written'] += len(batch)
+        except Exception as e:
+            print(f"Erro ao gravar lote de logs: {e}")
+            config = get_config()
+            if config['SPILL_FILE']:
+                self._spill(batch, config)
+            else:
+                self.stats['dropped'] += len(batch)
+
+    # ------------------------------------------------------------------
+    # Arquivo de transbordo (spill)
+    # ------------------------------------------------------------------
+    def _spill(self, batch, config):
+        with self._spill_lock:
+            try:
+                with open(config['SPILL_FILE'], 'a', encoding='utf-8') as f:
+                    for fields in batch:
+                        f.write(json.dumps(fields, default=str) + '\n')
+                self.stats['spilled'] += len(batch)
+            except OSError as e:
+                print(f"Erro ao gravar arquivo de transbordo de logs: {e}")
+                self.stats['dropped'] += len(batch)
+
+    def _recover_spill(self):
+        """Regrava no banco os registros que foram enviados ao arquivo de transbordo."""
+        config = get_config()
+        spill_file = config['SPILL_FILE']
+        if not spill_file or not os.path.exists(spill_file):
+            return
+
+        with self._spill_lock:
+            recovering = f"{spill_file}.recovering"
+            try:
+                if os.path.exists(recovering):
+                    # Recuperação anterior interrompida: acrescenta em vez de sobrescrever
+                    with open(spill_file, encoding='utf-8') as source, open(recovering, 'a', encoding='utf-8') as target:
+                        target.write(source.read())
+                    os.remove(spill_file)
+                else:
+                    os.replace(spill_file, recovering)
+            except OSError:
+                return
+
+        batch = []
+        with open(recovering, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    fields = json.loads(line)
+                    fields['date'] = datetime.date.fromisoformat(fields['date'])
+                    fields['time'] = datetime.time.fromisoformat(fields['time'])
+                    if fields.get('last_seen'):
+                        fields['last_seen'] = datetime.datetime.fromisoformat(fields['last_seen'])
+                except (ValueError, KeyError, TypeError) as e:
+                    # Linha corrompida ou truncada (ex.: processo encerrado durante a escrita)
+                    print(f"Linha inválida no arquivo de transbordo de logs ignorada: {e}")
+                    self.stats['corrupt'] += 1
+                    continue
+                batch.append(fields)
+                if len(batch) >= config['BATCH_SIZE']:
+                    self._persist(batch)
+                    batch = []
+        if batch:
+            self._persist(batch)
+        os.remove(recovering)
+
+    # ------------------------------------------------------------------
+    # Thread de gravação
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='action-buffer-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            config = get_config()
+            with self._condition:
+                if not self._stopping and len(self._queue) < config['BATCH_SIZE']:
+                    self._condition.wait(config['FLUSH_INTERVAL'])
+                stopping = self._stopping
+
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+            if stopping:
+                break
+
+    def shutdown(self, timeout=10):
+        """Encerra a thread de gravação gravando tudo o que estiver pendente."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        if self._queue or self._occurrences:
+            self.flush()
+
+
+action_buffer = ActionBuffer()
+atexit.register(action_buffer.shutdown)
+
+
+def enqueue_action(**fields):
+    """Enfileira os campos de uma Action no buffer de gravação do processo."""
+    return action_buffer.add(**fields)
@@ -0,0 +1,145 @@
+import datetime
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .models import Event
+from .recurrence import RecurrenceRule, parse_exceptions
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_ICS_FEED
+DEFAULT_CONFIG = {
+    'PAST_DAYS': 90,          # Eventos que terminaram há mais tempo não entram no feed
+    'CACHE_TIMEOUT': 3600,    # Segundos em que o conteúdo gerado fica em cache
+    'CALENDAR_NAME': 'Agenda FabLab',
+}
+
+PRODID = '-//FabLab//Agenda//PT-BR'
+UID_DOMAIN = 'agenda.fablab'
+
+# Quantidade de eventos lidos do banco por vez durante a geração
+ICS_CHUNK_SIZE = 500
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_ICS_FEED', {}))
+    return config
+
+
+def feed_events(event_type=None):
+    """Eventos aprovados publicados no feed, opcionalmente de um único tipo"""
+    cutoff = timezone.now() - datetime.timedelta(days=get_config()['PAST_DAYS'])
+    # Séries recorrentes entram enquanto tiverem ocorrências depois do corte
+    events = Event.objects.filter(approved=True).filter(
+        Q(end_time__gte=cutoff)
+        | (~Q(recurrence_rule='') & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=cutoff)))
+    )
+    if event_type:
+        events = events.filter(event_type=event_type)
+    return events
+
+
+class FeedState:
+    """
+    Versão atual do feed: obtida com uma única consulta agregada e usada para
+    ETag, Last-Modified e chave de cache. A quantidade de eventos faz parte do
+    ETag para que exclusões também alterem a versão.
+    """
+
+    def __init__(self, event_type=None):
+        stats = feed_events(event_type).aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        self.event_type = event_type or ''
+        self.count = stats['count']
+        self.last_modified = stats['last_modified']
+        version = f"{self.event_type}:{self.count}:{self.last_modified.isoformat() if self.last_modified else ''}"
+        self.etag = hashlib.sha1(version.encode()).hexdigest()
+
+    @property
+    def cache_key(self):
+        return f'logs:ics_feed:{self.etag}'
+
+
+def _escape(text):
+    """Escapa um valor de texto conforme a RFC 5545"""
+    return (
+        (text or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Quebra linhas com mais de 75 octetos (continuação iniciada por espaço)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    size = 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > (75 if not parts else 74):
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _format_datetime(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def iter_vevent(event):
+    yield 'BEGIN:VEVENT'
+    yield f'UID:event-{event.id}@{UID_DOMAIN}'
+    yield f'DTSTAMP:{_format_datetime(event.updated_at)}'
+    yield f'LAST-MODIFIED:{_format_datetime(event.updated_at)}'
+    yield f'DTSTART:{_format_datetime(event.start_time)}'
+    yield f'DTEND:{_format_datetime(event.end_time)}'
+    if event.recurrence_rule:
+        # A série é publicada como uma única VEVENT; o aplicativo calcula as ocorrências
+        yield f'RRULE:{RecurrenceRule.parse(event.recurrence_rule).to_ical()}'
+        start = timezone.localtime(event.start_time)
+        for day in sorted(parse_exceptions(event.recurrence_exceptions)):
+            excluded = timezone.make_aware(datetime.datetime.combine(day, start.time().replace(tzinfo=None)))
+            yield f'EXDATE:{_format_datetime(excluded)}'
+    yield f'SUMMARY:{_escape(event.title)}'
+    if event.description:
+        yield f'DESCRIPTION:{_escape(event.description)}'
+    yield f'CATEGORIES:{_escape(str(event.get_event_type_display()))}'
+    yield 'END:VEVENT'
+
+
+def iter_ics(events):
+    """Gera o calendário em blocos de texto, um por evento, sem montar tudo em memória"""
+    config = get_config()
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(config["CALENDAR_NAME"])}',
+    ]
+    yield ''.join(_fold(line) for line in header)
+    for event in events.order_by('start_time').iterator(chunk_size=ICS_CHUNK_SIZE):
+        yield ''.join(_fold(line) for line in iter_vevent(event))
+    yield _fold('END:VCALENDAR')
+
+
+def render_feed(state):
+    """
+    Retorna o conteúdo do feed na versão `state`. O resultado fica em cache pela
+    ETag: enquanto nenhum evento mudar, o calendário não é gerado novamente.
+    """
+    content = cache.get(state.cache_key)
+    if content is None:
+        content = ''.join(iter_ics(feed_events(state.event_type)))
+        cache.set(state.cache_key, content, get_config()['CACHE_TIMEOUT'])
+    return content
@@ -0,0 +1,56 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_ERROR_COALESCING
+DEFAULT_CONFIG = {
+    'WINDOW': 300,              # Segundos sem repetição até um erro gerar um novo registro
+    'MAX_FINGERPRINTS': 1000,   # Quantidade máxima de erros distintos acompanhados em memória
+}
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_ERROR_COALESCING', {}))
+    return config
+
+
+def make_fingerprint(kind, path, message=''):
+    """Identifica um erro pelo tipo (exceção ou status HTTP), caminho e mensagem"""
+    return hashlib.sha1(f'{kind}\x00{path}\x00{message}'.encode('utf-8', 'replace')).hexdigest()
+
+
+class ErrorCoalescer:
+    """
+    Estado em memória usado para agrupar erros repetidos.
+
+    Um erro cujo fingerprint foi visto há menos de WINDOW segundos (janela deslizante,
+    renovada a cada repetição) e no mesmo dia é considerado repetição: em vez de um
+    novo registro, apenas o contador de ocorrências do registro existente é incrementado.
+    """
+
+    def __init__(self):
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_repeat(self, fingerprint, day):
+        config = get_config()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(fingerprint)
+            self._seen[fingerprint] = (now, day)
+            self._seen.move_to_end(fingerprint)
+            if entry is not None and entry[1] == day and now - entry[0] <= config['WINDOW']:
+                return True
+            while len(self._seen) > config['MAX_FINGERPRINTS']:
+                self._seen.popitem(last=False)
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+
+
+error_coalescer = ErrorCoalescer()
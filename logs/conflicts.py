@@ -0,0 +1,133 @@
+from django.db.models import DateTimeField, Exists, ExpressionWrapper, F, Max, OuterRef, Subquery, Value
+from django.utils import timezone
+from .models import Event, LabSchedule
+from .recurrence import recurring_in_window
+
+# Motivos de recusa (EventRejectForm.MOTIVOS_COMUNS) correspondentes a cada conflito
+REASON_UNAVAILABLE = 'data_indisponivel'
+REASON_OUTSIDE_HOURS = 'fora_horario'
+
+
+def overlapping_events(start_time, end_time, exclude_id=None):
+    """
+    Eventos aprovados não recorrentes que se sobrepõem ao intervalo [start_time, end_time).
+    Uma única consulta por intervalo, atendida pelo índice (approved, start_time, end_time).
+    """
+    events = Event.objects.filter(
+        approved=True, recurrence_rule='', start_time__lt=end_time, end_time__gt=start_time
+    )
+    if exclude_id is not None:
+        events = events.exclude(id=exclude_id)
+    return events
+
+
+def overlapping_occurrence(start_time, end_time, exclude_id=None, series=None):
+    """
+    Primeira série recorrente aprovada com uma ocorrência em [start_time, end_time),
+    ou None. `series` permite reaproveitar as séries já carregadas.
+    """
+    if series is None:
+        series = recurring_in_window(Event.objects.filter(approved=True), start_time, end_time)
+        if exclude_id is not None:
+            series = series.exclude(id=exclude_id)
+    for event in series:
+        if event.id != exclude_id and event.occurrences(start_time, end_time):
+            return event
+    return None
+
+
+def find_conflict(start_time, end_time, exclude_id=None):
+    """Evento aprovado (único ou ocorrência de uma série) que conflita com o intervalo, ou None"""
+    return (
+        overlapping_events(start_time, end_time, exclude_id).first()
+        or overlapping_occurrence(start_time, end_time, exclude_id)
+    )
+
+
+def lab_hours_error(start_time, end_time, schedules=None):
+    """
+    Verifica se o intervalo está dentro do horário de funcionamento do laboratório.
+    Retorna a mensagem de erro ou None. `schedules` permite reaproveitar os horários
+    já carregados ({dia da semana: LabSchedule}) ao verificar vários eventos.
+    """
+    start = timezone.localtime(start_time)
+    end = timezone.localtime(end_time)
+
+    if schedules is None:
+        schedule = LabSchedule.objects.filter(day_of_week=start.weekday()).first()
+    else:
+        schedule = schedules.get(start.weekday())
+
+    # Sem horário cadastrado para o dia, não há restrição
+    if schedule is None:
+        return None
+    if schedule.is_closed:
+        return f'O laboratório não funciona às {schedule.get_day_of_week_display().lower()}s.'
+    if end.date() != start.date() or start.time() < schedule.opening_time or end.time() > schedule.closing_time:
+        return (
+            f'O horário deve estar entre {schedule.opening_time.strftime("%H:%M")} e '
+            f'{schedule.closing_time.strftime("%H:%M")} ({schedule.get_day_of_week_display()}).'
+        )
+    return None
+
+
+def annotate_conflicts(events):
+    """
+    Anota um queryset de eventos com `has_conflict` e `conflict_title` (primeiro
+    evento aprovado sobreposto). Tudo é resolvido na mesma consulta do queryset,
+    com uma busca por intervalo no índice para cada linha.
+    """
+    overlapping = Event.objects.filter(
+        approved=True,
+        recurrence_rule='',
+        start_time__lt=OuterRef('end_time'),
+        end_time__gt=OuterRef('start_time')
+    ).exclude(id=OuterRef('id')).order_by('start_time')
+
+    # Limita o intervalo pelo início: nenhum evento aprovado dura mais que o mais longo
+    # deles, então só começam até `longest` antes do evento avaliado os que podem sobrepô-lo
+    longest = Event.objects.filter(approved=True, recurrence_rule='').aggregate(
+        longest=Max(F('end_time') - F('start_time'))
+    )['longest']
+    if longest is not None:
+        overlapping = overlapping.filter(start_time__gt=ExpressionWrapper(
+            OuterRef('start_time') - Value(longest), output_field=DateTimeField()
+        ))
+
+    return events.annotate(
+        has_conflict=Exists(overlapping),
+        conflict_title=Subquery(overlapping.values('title')[:1])
+    )
+
+
+def flag_conflicts(events):
+    """
+    Avalia os eventos pendentes (já anotados por annotate_conflicts) e define em cada
+    um `conflict_reasons`: lista de (motivo de recusa, mensagem). Os horários de
+    funcionamento são carregados uma única vez.
+    """
+    schedules = {schedule.day_of_week: schedule for schedule in LabSchedule.objects.all()}
+    events = list(events)
+    # Séries recorrentes aprovadas que alcançam o período dos eventos avaliados (uma consulta)
+    series = []
+    if events:
+        series = list(recurring_in_window(
+            Event.objects.filter(approved=True),
+            min(event.start_time for event in events),
+            max(event.end_time for event in events)
+        ))
+    for event in events:
+        event.conflict_reasons = []
+        conflict_title = event.conflict_title if event.has_conflict else None
+        if conflict_title is None and series:
+            occurrence = overlapping_occurrence(event.start_time, event.end_time, event.id, series)
+            conflict_title = occurrence.title if occurrence else None
+        if conflict_title is not None:
+            event.conflict_reasons.append(
+                (REASON_UNAVAILABLE, f'Conflita com o evento aprovado "{conflict_title}".')
+            )
+        if event.event_type == Event.EventType.VISIT:
+            error = lab_hours_error(event.start_time, event.end_time, schedules)
+            if error:
+                event.conflict_reasons.append((REASON_OUTSIDE_HOURS, error))
+    return events
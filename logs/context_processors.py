@@ -1,16 +1,18 @@
 from django.db.models import Count
 from django.utils import timezone
 from .models import Action, Event
+from .counters import get_counts
 
 def pending_events_count(request):
     """
     Adiciona o número de eventos pendentes ao contexto para usuários administradores.
+    O valor vem do cache (ver counters), sem consultas ao banco na maioria das páginas.
     """
     context = {'global_pending_count': 0}
     
     # Verificar se o usuário está autenticado e é staff
     if request.user.is_authenticated and request.user.is_staff:
         # Contar eventos pendentes de aprovação
-        context['global_pending_count'] = Event.objects.filter(approved=False).count()
+        context['global_pending_count'] = get_counts('pending_events')['pending_events']
     
     return context
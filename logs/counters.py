@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Event
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_COUNTERS
+DEFAULT_CONFIG = {
+    # Limite de segurança: mesmo sem sinal (ex.: QuerySet.update), o valor é recontado após este tempo
+    'TIMEOUT': 300,
+}
+
+COUNTER_KEY = 'logs:counter:{name}'
+
+# Contadores registrados: nome -> função que faz a contagem no banco
+_counters = {}
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_COUNTERS', {}))
+    return config
+
+
+def register(name, count):
+    """Registra um contador; `count` é chamado apenas quando o valor não está em cache"""
+    _counters[name] = count
+
+
+def get_counts(*names):
+    """
+    Valores dos contadores pedidos, lidos com uma única consulta ao cache. Somente
+    os ausentes são recontados no banco (uma consulta cada) e voltam para o cache.
+    """
+    keys = {COUNTER_KEY.format(name=name): name for name in names}
+    counts = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = {}
+    for key, name in keys.items():
+        if name not in counts:
+            counts[name] = missing[key] = _counters[name]()
+    if missing:
+        cache.set_many(missing, get_config()['TIMEOUT'])
+    return counts
+
+
+def invalidate(*names):
+    """
+    Descarta os contadores informados; a próxima leitura reconta. Feito após o commit,
+    para que uma leitura concorrente não grave em cache o valor anterior à alteração.
+    """
+    keys = [COUNTER_KEY.format(name=name) for name in names]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _pending_events():
+    return Event.objects.filter(approved=False).count()
+
+
+register('pending_events', _pending_events)
@@ -0,0 +1,101 @@
+import csv
+import json
+import zlib
+from .models import Action
+
+# Colunas exportadas, na ordem em que aparecem no CSV
+EXPORT_FIELDS = ['id', 'date', 'time', 'severity', 'type', 'author', 'url', 'ip_address', 'user_agent', 'description', 'occurrences', 'last_seen']
+
+# Colunas armazenadas em tabelas de dimensão são lidas pela chave estrangeira
+EXPORT_LOOKUPS = {
+    'type': 'type_ref__name',
+    'url': 'url_ref__path',
+    'user_agent': 'user_agent_ref__value',
+}
+
+# Quantidade de linhas lidas do banco por vez (mantém o uso de memória constante)
+EXPORT_CHUNK_SIZE = 2000
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+
+CONTENT_TYPES = {
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+    FORMAT_NDJSON: 'application/x-ndjson; charset=utf-8',
+}
+
+
+def filter_actions(start_date=None, end_date=None, severity=None, action_type=None, author=None):
+    """
+    Retorna as ações do intervalo [start_date, end_date] com os filtros informados,
+    ordenadas pelo índice (date, time, id).
+    """
+    queryset = Action.objects.all()
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    if severity:
+        queryset = queryset.filter(severity=severity)
+    if action_type:
+        queryset = queryset.filter(type_ref__name=action_type)
+    if author:
+        queryset = queryset.filter(author=author)
+    return queryset.order_by('date', 'time', 'id')
+
+
+def _iter_rows(queryset):
+    lookups = [EXPORT_LOOKUPS.get(field, field) for field in EXPORT_FIELDS]
+    return queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """Pseudo-arquivo que apenas devolve o que é escrito (usado com csv.writer)"""
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _iter_rows(queryset):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(queryset):
+    for row in _iter_rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str, ensure_ascii=False) + '\n'
+
+
+def iter_export(queryset, export_format=FORMAT_CSV):
+    if export_format == FORMAT_NDJSON:
+        return iter_ndjson(queryset)
+    return iter_csv(queryset)
+
+
+def iter_encoded(chunks, compress=False, buffer_size=64 * 1024):
+    """
+    Codifica os pedaços em UTF-8, agrupando-os em blocos de até `buffer_size` bytes.
+    Se `compress` for verdadeiro, o resultado é comprimido em gzip durante o envio.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = []
+    pending_size = 0
+
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= buffer_size:
+            block = b''.join(pending)
+            pending, pending_size = [], 0
+            if compressor:
+                block = compressor.compress(block)
+            if block:
+                yield block
+
+    block = b''.join(pending)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
@@ -1,6 +1,7 @@
 from django import forms
 from django.utils import timezone
-from .models import Event
+from .models import Action, Event
+from .conflicts import find_conflict, lab_hours_error
 import datetime
 from django.utils.translation import gettext_lazy as _
 
@@ -16,20 +17,24 @@ class DateTimeInput(forms.DateTimeInput):
 class EventForm(forms.ModelForm):
     class Meta:
         model = Event
-        fields = ['title', 'description', 'start_time', 'end_time', 'event_type']
+        fields = ['title', 'description', 'start_time', 'end_time', 'event_type', 'recurrence_rule', 'recurrence_exceptions']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'start_time': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'end_time': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
-            'event_type': forms.Select(attrs={'class': 'form-control'})
+            'event_type': forms.Select(attrs={'class': 'form-control'}),
+            'recurrence_rule': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20250630'}),
+            'recurrence_exceptions': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '2025-04-21, 2025-05-01'})
         }
         labels = {
             'title': 'Título do Evento',
             'description': 'Descrição',
             'start_time': 'Data e Hora de Início',
             'end_time': 'Data e Hora de Término',
-            'event_type': 'Tipo de Evento'
+            'event_type': 'Tipo de Evento',
+            'recurrence_rule': 'Repetição',
+            'recurrence_exceptions': 'Datas sem ocorrência'
         }
 
     def __init__(self, *args, **kwargs):
@@ -53,6 +58,12 @@ class EventForm(forms.ModelForm):
         # Validar se a data não é passada
         if start_time and start_time < timezone.now():
             self.add_error('start_time', 'Não é possível agendar eventos em datas passadas.')
+        
+        # Validar se não há outro evento aprovado no mesmo horário
+        if start_time and end_time and end_time > start_time:
+            conflict = find_conflict(start_time, end_time, exclude_id=self.instance.pk)
+            if conflict:
+                self.add_error(None, f'O horário conflita com o evento aprovado "{conflict.title}".')
             
         return cleaned_data
 
@@ -124,6 +135,16 @@ class VisitRequestForm(forms.ModelForm):
             # Verificar se a data não é passada
             if start_datetime < timezone.now():
                 self.add_error('visit_date', 'Não é possível agendar visitas para datas/horários passados')
+            
+            if end_hour > start_hour:
+                # Verificar o horário de funcionamento do laboratório
+                error = lab_hours_error(start_datetime, end_datetime)
+                if error:
+                    self.add_error('start_hour', error)
+                
+                # Verificar se não há evento aprovado no mesmo horário
+                if find_conflict(start_datetime, end_datetime):
+                    self.add_error('visit_date', 'A data/horário solicitado já está reservado para outro evento.')
                 
             # Armazenar os valores datetime para uso em save_event
             self.start_datetime = start_datetime
@@ -168,3 +189,82 @@ class EventRejectForm(forms.Form):
             self.add_error('motivo', 'Por favor, forneça um motivo para a recusa da solicitação.')
             
         return cleaned_data
+
+class PendingEventsBulkForm(forms.Form):
+    """
+    Aprovação ou recusa em lote das solicitações pendentes. Na recusa, cada evento usa
+    o motivo específico enviado em `motivo_<id>` ou, se vazio, o motivo comum.
+    """
+    ACOES = [
+        ('aprovar', 'Aprovar selecionadas'),
+        ('recusar', 'Recusar selecionadas'),
+    ]
+    
+    eventos = forms.ModelMultipleChoiceField(
+        queryset=Event.objects.filter(approved=False).select_related('created_by').order_by('start_time'),
+        error_messages={
+            'required': 'Selecione ao menos uma solicitação.',
+            'invalid_choice': 'Uma das solicitações selecionadas não está mais pendente.',
+        }
+    )
+    acao = forms.ChoiceField(choices=ACOES)
+    motivo = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
+        label='Motivo comum da recusa',
+        help_text='Enviado por email aos solicitantes que não tiverem um motivo específico.'
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        eventos = cleaned_data.get('eventos')
+        
+        if cleaned_data.get('acao') == 'recusar' and eventos is not None:
+            motivo_comum = (cleaned_data.get('motivo') or '').strip()
+            motivos = {}
+            sem_motivo = []
+            for evento in eventos:
+                motivo = (self.data.get(f'motivo_{evento.id}') or '').strip() or motivo_comum
+                if not motivo:
+                    sem_motivo.append(evento.title)
+                motivos[evento.id] = motivo
+            if sem_motivo:
+                self.add_error('motivo', f'Informe um motivo comum ou específico para: {", ".join(sem_motivo)}.')
+            cleaned_data['motivos'] = motivos
+            
+        return cleaned_data
+
+class ActionExportForm(forms.Form):
+    """
+    Filtros para exportação dos logs de auditoria.
+    """
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+
+    start_date = forms.DateField(label='Data Inicial', required=False, widget=DateInput(attrs={'class': 'form-control'}))
+    end_date = forms.DateField(label='Data Final', required=False, widget=DateInput(attrs={'class': 'form-control'}))
+    severity = forms.ChoiceField(
+        label='Severidade',
+        required=False,
+        choices=[('', 'Todas')] + list(Action.SeverityLevel.choices),
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    type = forms.CharField(label='Tipo', max_length=255, required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    author = forms.CharField(label='Usuário', max_length=255, required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    format = forms.ChoiceField(label='Formato', choices=FORMAT_CHOICES, initial='csv', required=False, widget=forms.Select(attrs={'class': 'form-control'}))
+    gzip = forms.BooleanField(label='Comprimir (gzip)', required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+
+        if start_date and end_date and end_date < start_date:
+            self.add_error('end_date', 'A data final deve ser igual ou posterior à data inicial.')
+
+        if not cleaned_data.get('format'):
+            cleaned_data['format'] = 'csv'
+
+        return cleaned_data
@@ -1,71 +1,240 @@
 import os
 import datetime
+import threading
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from django.conf import settings
 import json
 from django.utils import timezone
 
-def get_google_calendar_events(start_date, end_date):
+# Configuração padrão; pode ser sobrescrita por settings.GOOGLE_CALENDAR
+DEFAULT_CONFIG = {
+    'CREDENTIALS_FILE': None,   # Padrão: env/google_credentials.json ao lado do projeto
+    # ID do calendário que você compartilhou com a Conta de Serviço
+    'CALENDAR_ID': '406319dcdb0cef978956cae2b9f7c8796b9860b9a359262d96219c536a4a7064@group.calendar.google.com',
+    'API_ENDPOINT': None,       # Endereço alternativo da API (usado nos testes)
+    # Espelho local (ExternalEvent) mantido pelo comando sync_external_events
+    'MIRROR_PAST_DAYS': 365,    # Período espelhado antes de hoje
+    'MIRROR_FUTURE_DAYS': 365,  # Período espelhado depois de hoje
+    'SYNC_INTERVAL': 60,        # Segundos entre sincronizações incrementais
+    'FULL_SYNC_INTERVAL': 86400,  # Segundos entre sincronizações completas (desloca o período)
+}
+
+# Escopo de permissão para ler eventos
+SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'GOOGLE_CALENDAR', {}))
+    if not config['CREDENTIALS_FILE']:
+        # Caminho para o arquivo de credenciais na pasta env/
+        config['CREDENTIALS_FILE'] = os.path.join(settings.BASE_DIR.parent, 'env', 'google_credentials.json')
+    return config
+
+
+def _load_credentials(credentials_path):
+    if not os.path.exists(credentials_path):
+        print("Aviso: Arquivo google_credentials.json não encontrado.")
+        return None
+
+    # Validação para garantir que são credenciais de Conta de Serviço
+    with open(credentials_path, 'r') as f:
+        try:
+            credentials_info = json.load(f)
+        except json.JSONDecodeError:
+            print("Erro: O arquivo google_credentials.json não é um JSON válido.")
+            return None
+
+    if 'client_email' not in credentials_info or 'private_key' not in credentials_info:
+        print("Erro: O arquivo google_credentials.json parece ser de um 'Aplicativo Web'. É necessário usar credenciais de uma 'Conta de Serviço'.")
+        return None
+
+    return service_account.Credentials.from_service_account_info(credentials_info, scopes=SCOPES)
+
+
+def _build_service(config):
+    credentials = _load_credentials(config['CREDENTIALS_FILE'])
+    if credentials is None:
+        return None
+
+    client_options = {'api_endpoint': config['API_ENDPOINT']} if config['API_ENDPOINT'] else None
+    # Usa o documento de descoberta embutido na biblioteca: nenhuma requisição extra
+    return build(
+        'calendar', 'v3',
+        credentials=credentials,
+        client_options=client_options,
+        static_discovery=True,
+        cache_discovery=False
+    )
+
+
+class GoogleCalendarClient:
     """
-    Obtém eventos do Google Calendar para o período especificado.
-    Retorna uma lista vazia se as credenciais não estiverem disponíveis ou se ocorrer um erro.
+    Acesso ao Google Calendar com credenciais e serviço criados uma única vez por
+    processo. Os eventos são lidos pelo espelho local (ver sync_external_events).
     """
-    try:
-        # Caminho para o arquivo de credenciais na pasta env/
-        credentials_path = os.path.join(settings.BASE_DIR.parent, 'env', 'google_credentials.json')
-        
-        if not os.path.exists(credentials_path):
-            print("Aviso: Arquivo google_credentials.json não encontrado.")
-            return []
-        
-        # Validação para garantir que são credenciais de Conta de Serviço
-        with open(credentials_path, 'r') as f:
-            try:
-                credentials_info = json.load(f)
-                if 'client_email' not in credentials_info or 'private_key' not in credentials_info:
-                    print("Erro: O arquivo google_credentials.json parece ser de um 'Aplicativo Web'. É necessário usar credenciais de uma 'Conta de Serviço'.")
-                    return []
-            except json.JSONDecodeError:
-                print("Erro: O arquivo google_credentials.json não é um JSON válido.")
-                return []
-
-        # Escopo de permissão para ler eventos
-        SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
-        
-        # Autenticação
-        credentials = service_account.Credentials.from_service_account_file(
-            credentials_path, scopes=SCOPES)
-        
-        # Construção do serviço da API
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        # --- LÓGICA DE DATA/HORA CORRIGIDA ---
-        if timezone.is_naive(start_date):
-            start_date = timezone.make_aware(start_date)
-        if timezone.is_naive(end_date):
-            end_date = timezone.make_aware(end_date)
-            
-        start_datetime_utc = start_date.astimezone(timezone.utc)
-        end_datetime_utc = end_date.astimezone(timezone.utc)
-
-        start_datetime_formatted = start_datetime_utc.replace(microsecond=0).isoformat()
-        end_datetime_formatted = end_datetime_utc.replace(microsecond=0).isoformat()
-        
-        # ID do calendário que você compartilhou com a Conta de Serviço
-        calendar_id = '406319dcdb0cef978956cae2b9f7c8796b9860b9a359262d96219c536a4a7064@group.calendar.google.com'
-        
-        # Chamada à API para buscar eventos
-        events_result = service.events().list(
+
+    def __init__(self):
+        self._service = None
+        self._service_loaded = False
+        self._lock = threading.Lock()
+
+    def get_service(self):
+        with self._lock:
+            if not self._service_loaded:
+                self._service = _build_service(get_config())
+                self._service_loaded = True
+            return self._service
+
+    def reset(self):
+        """Descarta o serviço (por exemplo, após trocar as credenciais)."""
+        with self._lock:
+            self._service = None
+            self._service_loaded = False
+
+    def iter_pages(self, service, **params):
+        """
+        Percorre as páginas de events().list(). Gera (itens, nextSyncToken); o
+        token só é informado pela API na última página.
+        """
+        page_token = None
+        while True:
+            result = service.events().list(pageToken=page_token, **params).execute()
+            page_token = result.get('nextPageToken')
+            yield result.get('items', []), result.get('nextSyncToken')
+            if not page_token:
+                return
+
+
+def _format_datetime(value):
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(datetime.timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _parse_datetime(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _parse_event_time(value):
+    """Converte o início/término de um evento (dateTime ou date de dia inteiro)"""
+    if 'dateTime' in value:
+        return _parse_datetime(value['dateTime'])
+    return timezone.make_aware(datetime.datetime.fromisoformat(value['date']))
+
+
+def _event_bounds(event):
+    start = _parse_event_time(event.get('start', {}))
+    end = _parse_event_time(event['end']) if event.get('end') else start
+    return start, end
+
+
+google_calendar_client = GoogleCalendarClient()
+
+
+def parse_external_event(item):
+    """Converte um item da API nos campos de ExternalEvent"""
+    start, end = _event_bounds(item)
+    return {
+        'title': (item.get('summary') or 'Evento do Google')[:255],
+        'description': item.get('description', ''),
+        'start_time': start,
+        'end_time': end,
+        'all_day': 'dateTime' not in item.get('start', {}),
+        'html_link': item.get('htmlLink', '')[:500],
+        'updated': _parse_datetime(item['updated']) if item.get('updated') else None,
+    }
+
+
+def _mirror_pages(pages, calendar_id, stats):
+    """
+    Grava cada página de resultados no espelho local: eventos cancelados são
+    excluídos e os demais inseridos ou atualizados com um único comando por página.
+    Retorna o nextSyncToken da última página.
+    """
+    from .models import ExternalEvent
+
+    sync_token = None
+    for items, page_sync_token in pages:
+        sync_token = page_sync_token or sync_token
+        cancelled = [item['id'] for item in items if item.get('status') == 'cancelled']
+        events = [
+            ExternalEvent(calendar_id=calendar_id, google_id=item['id'], **parse_external_event(item))
+            for item in items if item.get('status') != 'cancelled'
+        ]
+        if cancelled:
+            stats['deleted'] += ExternalEvent.objects.filter(calendar_id=calendar_id, google_id__in=cancelled).delete()[0]
+        if events:
+            ExternalEvent.objects.bulk_create(
+                events,
+                update_conflicts=True,
+                unique_fields=['calendar_id', 'google_id'],
+                update_fields=['title', 'description', 'start_time', 'end_time', 'all_day', 'html_link', 'updated', 'synced_at']
+            )
+            stats['saved'] += len(events)
+    return sync_token
+
+
+def sync_external_events(full=False):
+    """
+    Sincroniza o calendário configurado com a tabela ExternalEvent.
+
+    A primeira sincronização (e uma a cada FULL_SYNC_INTERVAL segundos) busca todo o
+    período espelhado e remove os eventos que deixaram de existir; as demais usam o
+    syncToken salvo e recebem apenas as alterações. Retorna um dicionário com o tipo
+    de sincronização e as quantidades gravadas/excluídas, ou None sem credenciais.
+    """
+    from .agenda_cache import invalidate_external
+    from .models import CalendarSyncState, ExternalEvent
+
+    config = get_config()
+    calendar_id = config['CALENDAR_ID']
+    service = google_calendar_client.get_service()
+    if service is None:
+        return None
+
+    state, _ = CalendarSyncState.objects.get_or_create(calendar_id=calendar_id)
+    now = timezone.now()
+    stats = {'full': False, 'saved': 0, 'deleted': 0}
+
+    full = (
+        full or not state.sync_token or state.full_synced_at is None
+        or (now - state.full_synced_at).total_seconds() >= config['FULL_SYNC_INTERVAL']
+    )
+
+    if not full:
+        try:
+            state.sync_token = _mirror_pages(
+                google_calendar_client.iter_pages(
+                    service, calendarId=calendar_id, syncToken=state.sync_token, singleEvents=True
+                ),
+                calendar_id, stats
+            ) or state.sync_token
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # Token expirado (410 Gone): é necessária uma sincronização completa
+            full = True
+
+    if full:
+        stats['full'] = True
+        pages = google_calendar_client.iter_pages(
+            service,
             calendarId=calendar_id,
-            timeMin=start_datetime_formatted,
-            timeMax=end_datetime_formatted,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        return events_result.get('items', [])
-        
-    except Exception as e:
-        print(f"Erro ao acessar Google Calendar API: {e}")
-        return []
+            timeMin=_format_datetime(now - datetime.timedelta(days=config['MIRROR_PAST_DAYS'])),
+            timeMax=_format_datetime(now + datetime.timedelta(days=config['MIRROR_FUTURE_DAYS'])),
+            singleEvents=True
+        )
+        state.sync_token = _mirror_pages(pages, calendar_id, stats) or ''
+        # Eventos não recebidos na sincronização completa foram excluídos ou saíram do período
+        stats['deleted'] += ExternalEvent.objects.filter(calendar_id=calendar_id, synced_at__lt=now).delete()[0]
+        state.full_synced_at = now
+
+    state.synced_at = timezone.now()
+    state.save()
+    # bulk_create/delete não passam pelos sinais; descarta a agenda em cache dos superusuários
+    if stats['saved'] or stats['deleted']:
+        invalidate_external()
+    return stats
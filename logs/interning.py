@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+
+
+class InternCache:
+    """
+    Cache LRU em memória que mapeia valores de texto para IDs das tabelas de
+    dimensão (e vice-versa), evitando uma consulta ao banco a cada gravação/leitura.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._by_value = OrderedDict()
+        self._by_id = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, mapping, key):
+        with self._lock:
+            try:
+                mapping.move_to_end(key)
+                return mapping[key]
+            except KeyError:
+                return None
+
+    def get_id(self, value):
+        return self._get(self._by_value, value)
+
+    def get_value(self, pk):
+        return self._get(self._by_id, pk)
+
+    def put(self, value, pk):
+        with self._lock:
+            self._by_value[value] = pk
+            self._by_value.move_to_end(value)
+            self._by_id[pk] = value
+            self._by_id.move_to_end(pk)
+            while len(self._by_value) > self.maxsize:
+                self._by_value.popitem(last=False)
+            while len(self._by_id) > self.maxsize:
+                self._by_id.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._by_value.clear()
+            self._by_id.clear()
@@ -0,0 +1,30 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from logs.archive import archive_actions, get_archive_dir, ARCHIVE_DELETE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Move ações antigas para arquivos mensais compactados (NDJSON + gzip) e as exclui do banco'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'LOGS_ARCHIVE_AFTER_DAYS', 365),
+            help='Arquiva as ações com mais de N dias (padrão: LOGS_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ARCHIVE_DELETE_CHUNK_SIZE,
+            help='Quantidade de registros excluídos por lote'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now().date() - datetime.timedelta(days=options['days'])
+        self.stdout.write(f'Arquivando ações anteriores a {cutoff:%d/%m/%Y} em {get_archive_dir()}')
+
+        total = archive_actions(cutoff, chunk_size=options['chunk_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'{total} ação(ões) arquivada(s).'))
@@ -0,0 +1,102 @@
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment
+from logs import benchmark
+from logs.metrics import get_config as get_metrics_config
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o desempenho de logs_list, logs_datepage, agenda_home e pending_events '
+        'em um banco SQLite separado com uma massa de dados gerada'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=os.path.join(settings.BASE_DIR, 'benchmark.sqlite3'),
+            help='Arquivo SQLite usado pelo benchmark (nunca o banco principal)'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Reaproveita o banco e a massa de dados de uma execução anterior'
+        )
+        parser.add_argument('--actions', type=int, default=benchmark.DEFAULT_DATASET['actions'])
+        parser.add_argument('--events', type=int, default=benchmark.DEFAULT_DATASET['events'])
+        parser.add_argument('--users', type=int, default=benchmark.DEFAULT_DATASET['users'])
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=benchmark.DEFAULT_DATASET['days'],
+            help='Quantidade de dias de ações geradas'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Semente da geração de dados')
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções medidas por rota')
+        parser.add_argument('--output', help='Grava os resultados em JSON neste arquivo')
+        parser.add_argument('--compare', help='Compara com os resultados JSON de uma execução anterior')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('O benchmark deve ser executado com o banco SQLite.')
+
+        database = os.path.abspath(options['database'])
+        if database == os.path.abspath(str(connection.settings_dict['NAME'])):
+            raise CommandError('O benchmark não pode usar o banco principal.')
+
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                previous = json.load(f)
+
+        # Cria (ou reaproveita) o banco do benchmark aplicando as migrações
+        connection.settings_dict['TEST']['NAME'] = database
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb']
+        )
+        setup_test_environment()
+
+        if not benchmark.dataset_exists():
+            self.stdout.write(
+                f"Gerando massa de dados: {options['actions']} ações, "
+                f"{options['events']} eventos, {options['users']} usuários"
+            )
+            benchmark.generate_dataset(
+                options['actions'], options['events'], options['users'], options['days'],
+                seed=options['seed'], log=self.stdout.write
+            )
+
+        # Requisições lentas não devem gerar novas ações durante a medição
+        metrics_config = dict(get_metrics_config(), SLOW_THRESHOLD_MS=float('inf'))
+        with override_settings(LOGS_REQUEST_METRICS=metrics_config):
+            results = benchmark.run_benchmark(repeat=options['repeat'])
+
+        for result in results['results']:
+            if result['error']:
+                self.stdout.write(self.style.ERROR(
+                    f"{result['name']:<16} falhou (HTTP {result['status']}): {result['error']}"
+                ))
+                continue
+            timing = result['time_ms']
+            self.stdout.write(
+                f"{result['name']:<16} mediana {timing['median']:9.1f} ms  "
+                f"p95 {timing['p95']:9.1f} ms  {result['queries']:4d} consultas  "
+                f"pico {result['peak_memory_kb']:10.0f} KiB  (HTTP {result['status']})"
+            )
+
+        if previous:
+            self.stdout.write('')
+            for row in benchmark.compare_results(previous, results):
+                style = self.style.ERROR if row['change_pct'] > 10 else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{row['name']:<16} {row['before_ms']:9.1f} -> {row['after_ms']:9.1f} ms "
+                    f"({row['change_pct']:+.1f}%), consultas {row['queries_before']} -> {row['queries_after']}"
+                ))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['output']}"))
@@ -0,0 +1,53 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from logs.export import filter_actions, iter_export, iter_encoded
+from logs.forms import ActionExportForm
+
+
+class Command(BaseCommand):
+    help = 'Exporta os logs de auditoria (Action) em CSV ou NDJSON, opcionalmente comprimidos em gzip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--end', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--severity', help='Filtra por severidade')
+        parser.add_argument('--type', help='Filtra pelo tipo da ação')
+        parser.add_argument('--author', help='Filtra pelo usuário')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída em gzip')
+        parser.add_argument('-o', '--output', help='Arquivo de saída (padrão: saída padrão)')
+
+    def handle(self, *args, **options):
+        form = ActionExportForm(data={
+            'start_date': options['start'],
+            'end_date': options['end'],
+            'severity': options['severity'],
+            'type': options['type'],
+            'author': options['author'],
+            'format': options['format'],
+            'gzip': options['gzip'],
+        })
+        if not form.is_valid():
+            raise CommandError(
+                '; '.join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items())
+            )
+
+        data = form.cleaned_data
+        queryset = filter_actions(
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            severity=data['severity'],
+            action_type=data['type'],
+            author=data['author'],
+        )
+        chunks = iter_encoded(iter_export(queryset, data['format']), compress=data['gzip'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exportação salva em {options['output']}"))
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from logs.search import create_index, fts5_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recria o índice de busca textual (SQLite FTS5) das ações'
+
+    def handle(self, *args, **options):
+        if not fts5_supported():
+            raise CommandError('O banco de dados atual não é SQLite com suporte a FTS5.')
+
+        create_index()
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Índice de busca reconstruído com {total} ação(ões).'))
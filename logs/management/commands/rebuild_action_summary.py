@@ -0,0 +1,26 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from logs.models import DailyActionSummary
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela de resumos diários (DailyActionSummary) a partir dos registros de Action'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            action='append',
+            dest='dates',
+            help='Recalcula apenas o dia informado (AAAA-MM-DD). Pode ser repetido.'
+        )
+
+    def handle(self, *args, **options):
+        dates = None
+        if options['dates']:
+            try:
+                dates = [datetime.date.fromisoformat(value) for value in options['dates']]
+            except ValueError as e:
+                raise CommandError(f'Data inválida: {e}')
+
+        total_days = DailyActionSummary.rebuild(dates=dates)
+        self.stdout.write(self.style.SUCCESS(f'Resumos recalculados para {total_days} dia(s).'))
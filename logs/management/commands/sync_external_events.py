@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from logs.google_calendar import get_config, sync_external_events
+
+
+class Command(BaseCommand):
+    help = 'Espelha o Google Calendar configurado na tabela ExternalEvent (processo contínuo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Executa uma única sincronização e encerra'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Força uma sincronização completa na primeira execução'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Segundos entre sincronizações (padrão: GOOGLE_CALENDAR["SYNC_INTERVAL"])'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or get_config()['SYNC_INTERVAL']
+        full = options['full']
+
+        while True:
+            close_old_connections()
+            try:
+                stats = sync_external_events(full=full)
+                full = False
+                if stats is None:
+                    self.stderr.write('Credenciais do Google Calendar indisponíveis.')
+                else:
+                    kind = 'completa' if stats['full'] else 'incremental'
+                    self.stdout.write(
+                        f"Sincronização {kind}: {stats['saved']} evento(s) gravado(s), "
+                        f"{stats['deleted']} excluído(s)"
+                    )
+            except Exception as e:
+                # O processo continua; a próxima sincronização tenta novamente
+                self.stderr.write(f'Erro ao sincronizar o Google Calendar: {e}')
+
+            if options['once']:
+                break
+            try:
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_REQUEST_METRICS
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    'SLOW_THRESHOLD_MS': 1000,  # Requisições acima deste tempo geram uma Action 'warning'
+    'WINDOW_SIZE': 1000,        # Quantidade de requisições recentes mantidas por rota
+}
+
+UNRESOLVED_ROUTE = '<não resolvida>'
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_REQUEST_METRICS', {}))
+    return config
+
+
+def percentile(sorted_values, fraction):
+    """Percentil pelo método do posto mais próximo sobre uma lista já ordenada"""
+    if not sorted_values:
+        return 0
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """
+    Wrapper de execução de SQL (connection.execute_wrapper) que conta as
+    consultas e soma o tempo gasto no banco durante uma requisição.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def install(self):
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(self))
+        return stack
+
+
+class RouteStats:
+    """
+    Janela deslizante das últimas requisições de uma rota. Registrar é O(1)
+    (append em deques de tamanho fixo); os percentis são calculados apenas
+    quando o painel é exibido, sobre uma cópia feita sob o lock da rota.
+    """
+
+    def __init__(self, window_size):
+        self._lock = threading.Lock()
+        self.durations = deque(maxlen=window_size)
+        self.query_counts = deque(maxlen=window_size)
+        self.db_durations = deque(maxlen=window_size)
+        self.total = 0
+        self.slow = 0
+        self.errors = 0
+        self.max_duration = 0.0
+
+    def record(self, duration, query_count, db_duration, slow, failed=False):
+        with self._lock:
+            self.durations.append(duration)
+            self.query_counts.append(query_count)
+            self.db_durations.append(db_duration)
+            self.total += 1
+            if slow:
+                self.slow += 1
+            if failed:
+                self.errors += 1
+            if duration > self.max_duration:
+                self.max_duration = duration
+
+    def summary(self, route):
+        # Iterar sobre um deque alterado por outra thread levanta RuntimeError
+        with self._lock:
+            durations = list(self.durations)
+            query_counts = list(self.query_counts)
+            db_durations = list(self.db_durations)
+            counters = {'total': self.total, 'slow': self.slow, 'errors': self.errors}
+            max_duration = self.max_duration
+        durations.sort()
+        samples = len(durations) or 1
+        return {
+            'route': route,
+            **counters,
+            'p50': percentile(durations, 0.50) * 1000,
+            'p95': percentile(durations, 0.95) * 1000,
+            'p99': percentile(durations, 0.99) * 1000,
+            'max': max_duration * 1000,
+            'avg_queries': sum(query_counts) / samples,
+            'avg_db_ms': sum(db_durations) / samples * 1000,
+        }
+
+
+class RequestMetrics:
+    """Registro, por processo, das métricas de cada rota (nome resolvido da URL)"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, duration, query_count, db_duration, slow=False, failed=False):
+        stats = self._routes.get(route)
+        if stats is None:
+            with self._lock:
+                stats = self._routes.setdefault(route, RouteStats(get_config()['WINDOW_SIZE']))
+        stats.record(duration, query_count, db_duration, slow, failed)
+
+    def summaries(self, order_by='p95'):
+        with self._lock:
+            routes = list(self._routes.items())
+        rows = [stats.summary(route) for route, stats in routes]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+request_metrics = RequestMetrics()
@@ -1,12 +1,15 @@
 import datetime
 import json
+import time
 from django.urls import resolve
 from django.http import Http404
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.dispatch import receiver
-from .models import Action
+from .buffer import action_buffer, enqueue_action
+from .coalescing import error_coalescer, make_fingerprint
+from .metrics import QueryCounter, UNRESOLVED_ROUTE, request_metrics, get_config as get_metrics_config
 from .utils import log_user_action
 
 class LogMiddleware:
@@ -14,25 +17,90 @@ class LogMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        # Processar a requisição normalmente, sem registrar ações regulares
+        # Medir tempo total, número de consultas e tempo de banco de cada requisição
+        metrics_enabled = get_metrics_config()['ENABLED']
+        if metrics_enabled:
+            start = time.perf_counter()
+            query_counter = QueryCounter()
+        
+        # Processar a requisição normalmente, sem registrar ações regulares.
+        # Exceções das views já chegam aqui convertidas em resposta (ver process_exception)
+        failed = True
         try:
-            response = self.get_response(request)
+            if metrics_enabled:
+                with query_counter.install():
+                    response = self.get_response(request)
+            else:
+                response = self.get_response(request)
+            failed = response.status_code >= 500
             
-            # Registrar apenas erros do servidor (500, etc.)
-            if response.status_code >= 500:
+            # Registrar apenas erros do servidor (500, etc.); exceções já registradas não geram um segundo registro
+            if response.status_code >= 500 and not getattr(request, '_logs_exception_logged', False):
                 self._log_server_error(request, response)
                 
             return response
-            
-        except PermissionDenied:
+        
+        finally:
+            if metrics_enabled:
+                self._record_metrics(request, time.perf_counter() - start, query_counter, failed)
+    
+    def process_exception(self, request, exception):
+        """
+        Chamado pelo Django com a exceção da view, antes de convertê-la na resposta
+        de erro (o __call__ só recebe essa resposta). Retorna None para manter o
+        tratamento padrão.
+        """
+        if isinstance(exception, Http404):
+            return None
+        if isinstance(exception, PermissionDenied):
             # Registrar acessos negados (403)
             self._log_access_denied(request)
-            raise
-        
+            return None
+        # Registrar exceções não tratadas
+        self._log_exception(request, exception)
+        request._logs_exception_logged = True
+        return None
+    
+    def _record_metrics(self, request, duration, query_counter, failed=False):
+        """Registra as métricas da rota (inclusive requisições com erro) e sinaliza requisições lentas"""
+        try:
+            resolver_match = getattr(request, 'resolver_match', None)
+            route = resolver_match.view_name if resolver_match else UNRESOLVED_ROUTE
+            slow = duration * 1000 >= get_metrics_config()['SLOW_THRESHOLD_MS']
+            
+            request_metrics.record(route, duration, query_counter.count, query_counter.duration, slow, failed)
+            
+            if slow:
+                self._log_slow_request(request, route, duration, query_counter)
         except Exception as e:
-            # Registrar exceções não tratadas
-            self._log_exception(request, e)
-            raise
+            print(f"Erro ao registrar métricas: {e}")
+    
+    def _log_slow_request(self, request, route, duration, query_counter):
+        """Registra requisições lentas (repetições na mesma rota são agrupadas)"""
+        now = timezone.now()
+        fingerprint = make_fingerprint('Requisição Lenta', route)
+        if error_coalescer.is_repeat(fingerprint, now.date()):
+            action_buffer.add_occurrence(fingerprint, now)
+            return
+        
+        username = request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'Anônimo'
+        
+        enqueue_action(
+            author=username,
+            type='Requisição Lenta',
+            description=(
+                f"A rota {route} levou {duration * 1000:.0f} ms "
+                f"({query_counter.count} consultas, {query_counter.duration * 1000:.0f} ms no banco)"
+            ),
+            date=now.date(),
+            time=now.time(),
+            url=request.path,
+            severity='warning',
+            ip_address=self._get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            fingerprint=fingerprint,
+            last_seen=now
+        )
     
     def _log_access_denied(self, request):
         """Registra tentativas de acesso não autorizado"""
@@ -40,7 +108,7 @@ class LogMiddleware:
             now = timezone.now()
             username = request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'Anônimo'
             
-            Action.objects.create(
+            enqueue_action(
                 author=username,
                 type='Acesso Negado',
                 description=f"Tentativa de acesso à área restrita: {request.path}",
@@ -56,12 +124,17 @@ class LogMiddleware:
             print(f"Erro ao registrar log: {e}")
     
     def _log_server_error(self, request, response):
-        """Registra erros de servidor"""
+        """Registra erros de servidor (repetições do mesmo erro são agrupadas em um único registro)"""
         try:
             now = timezone.now()
+            fingerprint = make_fingerprint(f'HTTP {response.status_code}', request.path)
+            if error_coalescer.is_repeat(fingerprint, now.date()):
+                action_buffer.add_occurrence(fingerprint, now)
+                return
+            
             username = request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'Anônimo'
             
-            Action.objects.create(
+            enqueue_action(
                 author=username,
                 type=f'Erro do Servidor (HTTP {response.status_code})',
                 description=f"Erro de servidor ao acessar: {request.path}",
@@ -70,19 +143,26 @@ class LogMiddleware:
                 url=request.path,
                 severity='critical',
                 ip_address=self._get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                fingerprint=fingerprint,
+                last_seen=now
             )
         except Exception as e:
             # Se falhar ao registrar o erro, simplesmente prosseguir
             print(f"Erro ao registrar log: {e}")
     
     def _log_exception(self, request, exception):
-        """Registra exceções não tratadas"""
+        """Registra exceções não tratadas (repetições da mesma exceção são agrupadas em um único registro)"""
         try:
             now = timezone.now()
+            fingerprint = make_fingerprint(type(exception).__name__, request.path, str(exception))
+            if error_coalescer.is_repeat(fingerprint, now.date()):
+                action_buffer.add_occurrence(fingerprint, now)
+                return
+            
             username = request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'Anônimo'
             
-            Action.objects.create(
+            enqueue_action(
                 author=username,
                 type='Erro do Sistema',
                 description=f"Exceção: {type(exception).__name__} - {str(exception)}",
@@ -91,7 +171,9 @@ class LogMiddleware:
                 url=request.path,
                 severity='error',
                 ip_address=self._get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                fingerprint=fingerprint,
+                last_seen=now
             )
         except Exception as e:
             # Se falhar ao registrar o erro, simplesmente prosseguir
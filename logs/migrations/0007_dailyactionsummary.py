@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+SEVERITY_ORDER = ['info', 'warning', 'security', 'error', 'critical']
+
+
+def preencher_resumos(apps, schema_editor):
+    """Calcula os resumos diários das ações já existentes"""
+    Action = apps.get_model('logs', 'Action')
+    DailyActionSummary = apps.get_model('logs', 'DailyActionSummary')
+
+    aggregates = {'total': models.Count('id')}
+    for severity in SEVERITY_ORDER:
+        aggregates[f'{severity}_count'] = models.Count('id', filter=models.Q(severity=severity))
+
+    summaries = []
+    for row in Action.objects.order_by().values('date').annotate(**aggregates):
+        max_severity = 'info'
+        for severity in reversed(SEVERITY_ORDER):
+            if row[f'{severity}_count']:
+                max_severity = severity
+                break
+        summaries.append(DailyActionSummary(max_severity=max_severity, **row))
+
+    DailyActionSummary.objects.bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0006_alter_action_author'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('info_count', models.PositiveIntegerField(default=0)),
+                ('warning_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('critical_count', models.PositiveIntegerField(default=0)),
+                ('security_count', models.PositiveIntegerField(default=0)),
+                ('max_severity', models.CharField(choices=[('info', 'Informação'), ('warning', 'Atenção'), ('error', 'Erro'), ('critical', 'Crítico'), ('security', 'Segurança')], default='info', max_length=20)),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Ações',
+                'verbose_name_plural': 'Resumos Diários de Ações',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0007_dailyactionsummary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='action',
+            name='logs_action_date_7e67d2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='action',
+            index=models.Index(fields=['date', 'time', 'id'], name='logs_action_date_time_id_idx'),
+        ),
+    ]
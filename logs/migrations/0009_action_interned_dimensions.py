@@ -0,0 +1,140 @@
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def converter_para_dimensoes(apps, schema_editor):
+    """
+    Move tipo, URL e user agent das ações existentes para as tabelas de dimensão.
+    Cria os valores distintos e preenche cada chave estrangeira com um único UPDATE
+    (subconsulta pela coluna única da dimensão), em vez de um UPDATE por valor.
+    """
+    Action = apps.get_model('logs', 'Action')
+    ActionType = apps.get_model('logs', 'ActionType')
+    ActionUrl = apps.get_model('logs', 'ActionUrl')
+    UserAgent = apps.get_model('logs', 'UserAgent')
+
+    types = Action.objects.order_by().values_list('type', flat=True).distinct()
+    ActionType.objects.bulk_create([ActionType(name=name) for name in types], batch_size=500)
+    Action.objects.update(type_ref=Subquery(ActionType.objects.filter(name=OuterRef('type')).values('id')[:1]))
+
+    with_url = Action.objects.exclude(url__isnull=True).exclude(url='')
+    paths = with_url.order_by().values_list('url', flat=True).distinct()
+    ActionUrl.objects.bulk_create([ActionUrl(path=path) for path in paths], batch_size=500)
+    with_url.update(url_ref=Subquery(ActionUrl.objects.filter(path=OuterRef('url')).values('id')[:1]))
+
+    with_user_agent = Action.objects.exclude(user_agent__isnull=True).exclude(user_agent='')
+    values = with_user_agent.order_by().values_list('user_agent', flat=True).distinct()
+    UserAgent.objects.bulk_create([
+        UserAgent(value=value, digest=hashlib.sha1(value.encode('utf-8')).hexdigest()) for value in values
+    ], batch_size=500)
+    # A unicidade é pelo hash; um índice temporário no texto atende à subconsulta
+    quote = schema_editor.quote_name
+    index = quote('logs_useragent_value_tmp')
+    schema_editor.execute(f'CREATE INDEX {index} ON {quote(UserAgent._meta.db_table)} ({quote("value")})')
+    with_user_agent.update(
+        user_agent_ref=Subquery(UserAgent.objects.filter(value=OuterRef('user_agent')).values('id')[:1])
+    )
+    schema_editor.execute(f'DROP INDEX {index}')
+
+
+def converter_para_texto(apps, schema_editor):
+    """Restaura os campos de texto a partir das tabelas de dimensão (um UPDATE por coluna)"""
+    Action = apps.get_model('logs', 'Action')
+    ActionType = apps.get_model('logs', 'ActionType')
+    ActionUrl = apps.get_model('logs', 'ActionUrl')
+    UserAgent = apps.get_model('logs', 'UserAgent')
+
+    Action.objects.update(type=Subquery(ActionType.objects.filter(id=OuterRef('type_ref')).values('name')[:1]))
+    Action.objects.filter(url_ref__isnull=False).update(
+        url=Subquery(ActionUrl.objects.filter(id=OuterRef('url_ref')).values('path')[:1])
+    )
+    Action.objects.filter(user_agent_ref__isnull=False).update(
+        user_agent=Subquery(UserAgent.objects.filter(id=OuterRef('user_agent_ref')).values('value')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0008_action_date_time_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActionType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Tipo de Ação',
+                'verbose_name_plural': 'Tipos de Ação',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActionUrl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name': 'URL',
+                'verbose_name_plural': 'URLs',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('digest', models.CharField(max_length=40, unique=True)),
+            ],
+            options={
+                'verbose_name': 'User Agent',
+                'verbose_name_plural': 'User Agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='type_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='actions', to='logs.actiontype', verbose_name='type'),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='url_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='actions', to='logs.actionurl', verbose_name='url'),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='actions', to='logs.useragent', verbose_name='user agent'),
+        ),
+        # Os campos de texto antigos ficam opcionais para permitir a migração reversa
+        migrations.AlterField(
+            model_name='action',
+            name='type',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(converter_para_dimensoes, converter_para_texto),
+        migrations.RemoveField(
+            model_name='action',
+            name='type',
+        ),
+        migrations.RemoveField(
+            model_name='action',
+            name='url',
+        ),
+        migrations.RemoveField(
+            model_name='action',
+            name='user_agent',
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='type_ref',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='actions', to='logs.actiontype', verbose_name='type'),
+        ),
+    ]
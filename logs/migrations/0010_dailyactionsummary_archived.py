@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0009_action_interned_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyactionsummary',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+
+_CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS logs_action_fts USING fts5(
+        author, type, description, url,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS logs_action_fts_ai AFTER INSERT ON logs_action BEGIN
+        INSERT INTO logs_action_fts (rowid, author, type, description, url) VALUES (
+            new.id,
+            new.author,
+            (SELECT name FROM logs_actiontype WHERE id = new.type_ref_id),
+            new.description,
+            (SELECT path FROM logs_actionurl WHERE id = new.url_ref_id)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS logs_action_fts_ad AFTER DELETE ON logs_action BEGIN
+        DELETE FROM logs_action_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS logs_action_fts_au AFTER UPDATE OF author, type_ref_id, description, url_ref_id ON logs_action BEGIN
+        DELETE FROM logs_action_fts WHERE rowid = old.id;
+        INSERT INTO logs_action_fts (rowid, author, type, description, url) VALUES (
+            new.id,
+            new.author,
+            (SELECT name FROM logs_actiontype WHERE id = new.type_ref_id),
+            new.description,
+            (SELECT path FROM logs_actionurl WHERE id = new.url_ref_id)
+        );
+    END
+    """,
+]
+
+_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS logs_action_fts_ai",
+    "DROP TRIGGER IF EXISTS logs_action_fts_ad",
+    "DROP TRIGGER IF EXISTS logs_action_fts_au",
+    "DROP TABLE IF EXISTS logs_action_fts",
+]
+
+_POPULATE_SQL = """
+    INSERT INTO logs_action_fts (rowid, author, type, description, url)
+    SELECT a.id, a.author, t.name, a.description, u.path
+    FROM logs_action a
+    LEFT JOIN logs_actiontype t ON t.id = a.type_ref_id
+    LEFT JOIN logs_actionurl u ON u.id = a.url_ref_id
+"""
+
+
+def criar_busca_textual(apps, schema_editor):
+    """Cria a tabela FTS5 de busca nas ações (apenas em SQLite com FTS5)"""
+    conn = schema_editor.connection
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if not any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall()):
+            return
+        for sql in _CREATE_SQL:
+            cursor.execute(sql)
+        cursor.execute(_POPULATE_SQL)
+
+
+def remover_busca_textual(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for sql in _DROP_SQL:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0010_dailyactionsummary_archived'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_busca_textual, remover_busca_textual),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0011_action_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='action',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0012_action_error_coalescing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255, unique=True)),
+                ('sync_token', models.TextField(blank=True)),
+                ('full_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de Sincronização',
+                'verbose_name_plural': 'Estados de Sincronização',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExternalEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255, verbose_name='Calendário')),
+                ('google_id', models.CharField(max_length=255, verbose_name='ID no Google')),
+                ('title', models.CharField(max_length=255, verbose_name='Título')),
+                ('description', models.TextField(blank=True, verbose_name='Descrição')),
+                ('start_time', models.DateTimeField(verbose_name='Hora de Início')),
+                ('end_time', models.DateTimeField(verbose_name='Hora de Término')),
+                ('all_day', models.BooleanField(default=False, verbose_name='Dia Inteiro')),
+                ('html_link', models.URLField(blank=True, max_length=500, verbose_name='Link')),
+                ('updated', models.DateTimeField(blank=True, null=True, verbose_name='Atualizado no Google')),
+                ('synced_at', models.DateTimeField(auto_now=True, verbose_name='Sincronizado em')),
+            ],
+            options={
+                'verbose_name': 'Evento Externo',
+                'verbose_name_plural': 'Eventos Externos',
+                'ordering': ['start_time'],
+                'indexes': [models.Index(fields=['start_time', 'end_time'], name='logs_externalevent_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('calendar_id', 'google_id'), name='logs_externalevent_unique_google_id')],
+            },
+        ),
+    ]
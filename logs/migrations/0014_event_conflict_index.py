@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0013_external_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['start_time', 'end_time'], name='logs_event_approved_time_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0015_event_updated_at_feed_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fim da recorrência'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_exceptions',
+            field=models.TextField(blank=True, help_text='Datas no formato AAAA-MM-DD, separadas por vírgula (ex.: feriados).', verbose_name='Datas sem ocorrência'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_rule',
+            field=models.CharField(blank=True, help_text='Regra RRULE, ex.: FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20250630. Deixe vazio para evento único.', max_length=255, verbose_name='Recorrência'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('approved', True), models.Q(('recurrence_rule', ''), _negated=True)), fields=['start_time', 'recurrence_end'], name='logs_event_recurring_idx'),
+        ),
+    ]
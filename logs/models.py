@@ -1,6 +1,137 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction, IntegrityError
 from django.utils.translation import gettext_lazy as _
 from users.models import CustomUser
+from .interning import InternCache
+from .recurrence import RecurrenceRule, occurrences, parse_exceptions, series_end
+import hashlib
+import secrets
+
+class InternedValue(models.Model):
+    """
+    Base das tabelas de dimensão usadas por Action para armazenar textos repetidos
+    (tipo, URL e user agent) apenas uma vez. Os mapeamentos texto <-> ID ficam em
+    um cache LRU por processo, de modo que gravar ou ler uma ação normalmente
+    não exige consultas extras.
+    """
+    value_field = 'name'
+    cache_size = 1024
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return getattr(self, self.value_field)
+
+    @classmethod
+    def cache(cls):
+        if '_intern_cache' not in cls.__dict__:
+            cls._intern_cache = InternCache(cls.cache_size)
+        return cls._intern_cache
+
+    @classmethod
+    def clear_cache(cls):
+        """Limpa o cache (ex.: após restaurar o banco ou reverter uma transação em testes)"""
+        cls.cache().clear()
+
+    @classmethod
+    def lookup_kwargs(cls, value):
+        """Retorna (filtros, valores padrão) usados no get_or_create do valor"""
+        return {cls.value_field: value}, {}
+
+    @classmethod
+    def remember(cls, value, pk):
+        """
+        Guarda o mapeamento no cache apenas após o commit: um registro criado em uma
+        transação desfeita deixaria no cache um ID inexistente.
+        """
+        transaction.on_commit(lambda: cls.cache().put(value, pk))
+
+    @classmethod
+    def intern(cls, value):
+        """Retorna o ID do valor, criando o registro na tabela de dimensão se necessário"""
+        if value is None:
+            return None
+        pk = cls.cache().get_id(value)
+        if pk is None:
+            lookup, defaults = cls.lookup_kwargs(value)
+            pk = cls.objects.get_or_create(defaults=defaults, **lookup)[0].pk
+            cls.remember(value, pk)
+        return pk
+
+    @classmethod
+    def resolve(cls, pk):
+        """Retorna o texto correspondente ao ID"""
+        if pk is None:
+            return None
+        value = cls.cache().get_value(pk)
+        if value is None:
+            value = cls.objects.values_list(cls.value_field, flat=True).get(pk=pk)
+            cls.remember(value, pk)
+        return value
+
+
+class ActionType(InternedValue):
+    name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _("Tipo de Ação")
+        verbose_name_plural = _("Tipos de Ação")
+
+
+class ActionUrl(InternedValue):
+    value_field = 'path'
+
+    path = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        verbose_name = _("URL")
+        verbose_name_plural = _("URLs")
+
+
+class UserAgent(InternedValue):
+    value_field = 'value'
+
+    value = models.TextField()
+    # Hash do texto completo; permite unicidade sem indexar o TextField
+    digest = models.CharField(max_length=40, unique=True)
+
+    class Meta:
+        verbose_name = _("User Agent")
+        verbose_name_plural = _("User Agents")
+
+    @staticmethod
+    def make_digest(value):
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def lookup_kwargs(cls, value):
+        return {'digest': cls.make_digest(value)}, {'value': value}
+
+
+def _interned_property(field_name, model):
+    """
+    Propriedade que expõe uma chave estrangeira para tabela de dimensão como texto,
+    mantendo `action.type`, `action.url` e `action.user_agent` transparentes para
+    FormattedAction, templates e admin (inclusive em Action(type='...')).
+    """
+    field_id = f'{field_name}_id'
+
+    def getter(self):
+        field = self._meta.get_field(field_name)
+        if field.is_cached(self):
+            related = field.get_cached_value(self)
+            return str(related) if related is not None else None
+        return model.resolve(getattr(self, field_id))
+
+    def setter(self, value):
+        if value == '' and self._meta.get_field(field_name).null:
+            value = None
+        setattr(self, field_id, model.intern(value))
+
+    return property(getter, setter)
+
 
 class Action(models.Model):
     class SeverityLevel(models.TextChoices):
@@ -12,18 +143,27 @@ class Action(models.Model):
     
     # Tornar todos os campos não-essenciais opcionais
     author = models.CharField(max_length=255, null=True, blank=True)
-    type = models.CharField(max_length=255)
+    # Tipo, URL e user agent são armazenados em tabelas de dimensão (ver InternedValue)
+    type_ref = models.ForeignKey(ActionType, on_delete=models.PROTECT, related_name='actions', verbose_name='type')
     description = models.TextField()
     date = models.DateField()
     time = models.TimeField()
-    url = models.CharField(max_length=255, blank=True, null=True)
+    url_ref = models.ForeignKey(ActionUrl, on_delete=models.PROTECT, null=True, blank=True, related_name='actions', verbose_name='url')
     severity = models.CharField(
         max_length=20,
         choices=SeverityLevel.choices,
         default=SeverityLevel.INFO
     )
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True, null=True)
+    user_agent_ref = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True, related_name='actions', verbose_name='user agent')
+    # Agrupamento de erros repetidos (ver logs/coalescing.py)
+    fingerprint = models.CharField(max_length=40, null=True, blank=True, db_index=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    
+    type = _interned_property('type_ref', ActionType)
+    url = _interned_property('url_ref', ActionUrl)
+    user_agent = _interned_property('user_agent_ref', UserAgent)
     
     def __str__(self):
         return f"{self.type} - {self.date} {self.time}"
@@ -31,7 +171,9 @@ class Action(models.Model):
     class Meta:
         ordering = ['date', 'time']
         indexes = [
-            models.Index(fields=['date']),
+            # Índice composto usado pela paginação por cursor de logs_datepage
+            # (também atende às consultas que filtram apenas por data)
+            models.Index(fields=['date', 'time', 'id'], name='logs_action_date_time_id_idx'),
             models.Index(fields=['severity']),
         ]
 
@@ -60,6 +202,23 @@ class Event(models.Model):
         related_name="created_events"
     )
     approved = models.BooleanField(_("Aprovado"), default=False)
+    # Usado no Last-Modified/ETag do feed ICS (ver logs/calendar_feed.py)
+    updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
+    # Eventos recorrentes: uma única linha cuja primeira ocorrência é start_time/end_time.
+    # As demais são calculadas apenas no período consultado (ver logs/recurrence.py)
+    recurrence_rule = models.CharField(
+        _("Recorrência"),
+        max_length=255,
+        blank=True,
+        help_text=_("Regra RRULE, ex.: FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20250630. Deixe vazio para evento único.")
+    )
+    recurrence_exceptions = models.TextField(
+        _("Datas sem ocorrência"),
+        blank=True,
+        help_text=_("Datas no formato AAAA-MM-DD, separadas por vírgula (ex.: feriados).")
+    )
+    # Término da última ocorrência (vazio se a série não tem fim); calculado ao salvar
+    recurrence_end = models.DateTimeField(_("Fim da recorrência"), null=True, blank=True, editable=False)
     participants = models.ManyToManyField(
         CustomUser, 
         related_name="events", 
@@ -70,10 +229,138 @@ class Event(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_event_type_display()}) - {self.start_time.strftime('%d/%m/%Y %H:%M')}"
     
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence_rule)
+    
+    def get_recurrence_display(self):
+        return RecurrenceRule.parse(self.recurrence_rule).describe() if self.recurrence_rule else ''
+    
+    def clean(self):
+        super().clean()
+        errors = {}
+        if self.recurrence_rule:
+            try:
+                if self.start_time and self.end_time:
+                    # Também rejeita séries sem ocorrências ou longas demais (ver series_end)
+                    series_end(self.start_time, self.end_time, self.recurrence_rule)
+                else:
+                    RecurrenceRule.parse(self.recurrence_rule)
+            except ValueError as e:
+                errors['recurrence_rule'] = str(e)
+        try:
+            parse_exceptions(self.recurrence_exceptions)
+        except ValueError as e:
+            errors['recurrence_exceptions'] = str(e)
+        if errors:
+            raise ValidationError(errors)
+    
+    def save(self, *args, **kwargs):
+        self.recurrence_rule = self.recurrence_rule.strip().upper()
+        self.recurrence_end = (
+            series_end(self.start_time, self.end_time, self.recurrence_rule) if self.recurrence_rule else None
+        )
+        super().save(*args, **kwargs)
+    
+    def occurrences(self, start, end):
+        """Ocorrências [(início, término)] do evento que se sobrepõem a [start, end)"""
+        if not self.recurrence_rule:
+            if self.start_time < end and self.end_time > start:
+                return [(self.start_time, self.end_time)]
+            return []
+        return occurrences(
+            self.id, self.updated_at, self.start_time, self.end_time,
+            self.recurrence_rule, self.recurrence_exceptions, start, end
+        )
+    
     class Meta:
         ordering = ['start_time']
         verbose_name = _("Evento")
         verbose_name_plural = _("Eventos")
+        indexes = [
+            # Detecção de conflitos: busca por intervalo entre os eventos aprovados (ver logs/conflicts.py).
+            # Índice parcial: o SQLite não usa um índice (approved, ...) para o filtro "WHERE approved"
+            models.Index(
+                fields=['start_time', 'end_time'],
+                condition=models.Q(approved=True),
+                name='logs_event_approved_time_idx'
+            ),
+            # Séries recorrentes aprovadas, consultadas à parte por período (ver recurring_in_window)
+            models.Index(
+                fields=['start_time', 'recurrence_end'],
+                condition=models.Q(approved=True) & ~models.Q(recurrence_rule=''),
+                name='logs_event_recurring_idx'
+            ),
+        ]
+
+class ExternalEvent(models.Model):
+    """
+    Cópia local de um evento do Google Calendar, mantida pelo comando
+    sync_external_events (ver logs/google_calendar.py). As datas são convertidas
+    uma única vez na sincronização; a agenda lê apenas desta tabela.
+    """
+    calendar_id = models.CharField(_("Calendário"), max_length=255)
+    google_id = models.CharField(_("ID no Google"), max_length=255)
+    title = models.CharField(_("Título"), max_length=255)
+    description = models.TextField(_("Descrição"), blank=True)
+    start_time = models.DateTimeField(_("Hora de Início"))
+    end_time = models.DateTimeField(_("Hora de Término"))
+    all_day = models.BooleanField(_("Dia Inteiro"), default=False)
+    html_link = models.URLField(_("Link"), max_length=500, blank=True)
+    updated = models.DateTimeField(_("Atualizado no Google"), null=True, blank=True)
+    synced_at = models.DateTimeField(_("Sincronizado em"), auto_now=True)
+
+    class Meta:
+        ordering = ['start_time']
+        verbose_name = _("Evento Externo")
+        verbose_name_plural = _("Eventos Externos")
+        constraints = [
+            models.UniqueConstraint(fields=['calendar_id', 'google_id'], name='logs_externalevent_unique_google_id'),
+        ]
+        indexes = [
+            models.Index(fields=['start_time', 'end_time'], name='logs_externalevent_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} (Google Calendar) - {self.start_time.strftime('%d/%m/%Y %H:%M')}"
+
+
+class CalendarSyncState(models.Model):
+    """Estado da sincronização de um calendário externo (syncToken da API)"""
+    calendar_id = models.CharField(max_length=255, unique=True)
+    sync_token = models.TextField(blank=True)
+    full_synced_at = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Estado de Sincronização")
+        verbose_name_plural = _("Estados de Sincronização")
+
+    def __str__(self):
+        return f"{self.calendar_id} ({self.synced_at})"
+
+class CalendarFeedToken(models.Model):
+    """Token secreto que identifica o feed ICS (assinatura de calendário) de um usuário"""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='calendar_feed_token')
+    token = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Token do Feed da Agenda")
+        verbose_name_plural = _("Tokens do Feed da Agenda")
+
+    def __str__(self):
+        return f"Feed da agenda de {self.user}"
+
+    @classmethod
+    def for_user(cls, user):
+        feed_token, _ = cls.objects.get_or_create(user=user, defaults={'token': secrets.token_urlsafe(32)})
+        return feed_token
+
+    def regenerate(self):
+        """Invalida o endereço anterior do feed"""
+        self.token = secrets.token_urlsafe(32)
+        self.save(update_fields=['token'])
 
 class LabSchedule(models.Model):
     DAY_CHOICES = [
@@ -100,3 +387,117 @@ class LabSchedule(models.Model):
         if self.is_closed:
             return f"{self.get_day_of_week_display()}: Fechado"
         return f"{self.get_day_of_week_display()}: {self.opening_time.strftime('%H:%M')} - {self.closing_time.strftime('%H:%M')}"
+
+
+class DailyActionSummary(models.Model):
+    """
+    Resumo materializado das ações de cada dia, usado pela listagem de logs.
+    Mantido atualizado pelos signals de Action (ver logs/signals.py).
+    """
+    # Ordem crescente de gravidade usada para determinar o nível máximo do dia
+    SEVERITY_ORDER = ['info', 'warning', 'security', 'error', 'critical']
+
+    date = models.DateField(unique=True)
+    total = models.PositiveIntegerField(default=0)
+    info_count = models.PositiveIntegerField(default=0)
+    warning_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    critical_count = models.PositiveIntegerField(default=0)
+    security_count = models.PositiveIntegerField(default=0)
+    max_severity = models.CharField(
+        max_length=20,
+        choices=Action.SeverityLevel.choices,
+        default=Action.SeverityLevel.INFO
+    )
+    # Dias cujas ações foram movidas para arquivos compactados (ver logs/archive.py)
+    archived = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = _("Resumo Diário de Ações")
+        verbose_name_plural = _("Resumos Diários de Ações")
+
+    def __str__(self):
+        return f"{self.date} - {self.total} ações ({self.max_severity})"
+
+    @classmethod
+    def _lower_severities(cls, severity):
+        """Retorna as severidades menos graves que a informada"""
+        if severity not in cls.SEVERITY_ORDER:
+            return []
+        return cls.SEVERITY_ORDER[:cls.SEVERITY_ORDER.index(severity)]
+
+    @classmethod
+    def _max_severity_from_counts(cls, counts):
+        for severity in reversed(cls.SEVERITY_ORDER):
+            if counts.get(f'{severity}_count'):
+                return severity
+        return Action.SeverityLevel.INFO
+
+    @classmethod
+    def _aggregates(cls):
+        """Expressões de agregação usadas para calcular os resumos a partir de Action"""
+        aggregates = {'total': models.Count('id')}
+        for severity in cls.SEVERITY_ORDER:
+            aggregates[f'{severity}_count'] = models.Count('id', filter=models.Q(severity=severity))
+        return aggregates
+
+    @classmethod
+    def register(cls, date, severity, amount=1):
+        """
+        Soma `amount` ações de uma severidade ao resumo do dia.
+        Usa UPDATE com expressões F para evitar condições de corrida entre requisições.
+        """
+        counter = f'{severity}_count' if severity in cls.SEVERITY_ORDER else None
+        updates = {'total': models.F('total') + amount}
+        if counter:
+            updates[counter] = models.F(counter) + amount
+
+        if not cls.objects.filter(date=date).update(**updates):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        date=date,
+                        total=amount,
+                        max_severity=severity if counter else Action.SeverityLevel.INFO,
+                        **({counter: amount} if counter else {})
+                    )
+                return
+            except IntegrityError:
+                # Outro processo criou o resumo do dia ao mesmo tempo
+                cls.objects.filter(date=date).update(**updates)
+
+        lower = cls._lower_severities(severity)
+        if lower:
+            cls.objects.filter(date=date, max_severity__in=lower).update(max_severity=severity)
+
+    @classmethod
+    def rebuild(cls, dates=None):
+        """
+        Recalcula os resumos a partir da tabela Action com uma única consulta agrupada.
+        Se `dates` for informado, apenas esses dias são recalculados.
+        Dias arquivados são preservados, pois suas ações não estão mais no banco.
+        Retorna o número de dias com ações.
+        """
+        actions = Action.objects.all()
+        summaries = cls.objects.filter(archived=False)
+        if dates is not None:
+            dates = list(dates)
+            actions = actions.filter(date__in=dates)
+            summaries = summaries.filter(date__in=dates)
+
+        archived_dates = cls.objects.filter(archived=True).values_list('date', flat=True)
+        rows = (
+            actions.exclude(date__in=archived_dates)
+            .order_by().values('date').annotate(**cls._aggregates())
+        )
+        new_summaries = [
+            cls(max_severity=cls._max_severity_from_counts(row), **row)
+            for row in rows
+        ]
+
+        with transaction.atomic():
+            summaries.delete()
+            cls.objects.bulk_create(new_summaries, batch_size=500)
+
+        return len(new_summaries)
@@ -0,0 +1,294 @@
+import calendar
+import datetime
+import re
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+# Configuração padrão; pode ser sobrescrita por settings.LOGS_RECURRENCE
+DEFAULT_CONFIG = {
+    'MAX_OCCURRENCES': 1000,     # Limite de ocorrências geradas por série em uma expansão
+    'MAX_CACHED_WINDOWS': 512,   # Quantidade de expansões (série, período) mantidas em cache
+}
+
+# Subconjunto da RRULE (RFC 5545) aceito em Event.recurrence_rule
+FREQUENCIES = {'DAILY': 'Diária', 'WEEKLY': 'Semanal', 'MONTHLY': 'Mensal'}
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+WEEKDAY_NAMES = ['seg', 'ter', 'qua', 'qui', 'sex', 'sáb', 'dom']
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'LOGS_RECURRENCE', {}))
+    return config
+
+
+def _parse_until(value):
+    """UNTIL no formato AAAAMMDD (inclui o dia todo) ou AAAAMMDDTHHMMSS[Z]; retorna datetime local ingênuo"""
+    if re.fullmatch(r'\d{8}', value):
+        return datetime.datetime.combine(datetime.datetime.strptime(value, '%Y%m%d').date(), datetime.time.max)
+    match = re.fullmatch(r'(\d{8}T\d{6})(Z?)', value)
+    if not match:
+        raise ValueError(f'UNTIL inválido: "{value}". Use AAAAMMDD.')
+    until = datetime.datetime.strptime(match.group(1), '%Y%m%dT%H%M%S')
+    if match.group(2):
+        until = timezone.make_naive(until.replace(tzinfo=datetime.timezone.utc))
+    return until
+
+
+class RecurrenceRule:
+    """
+    Regra de recorrência: FREQ=DAILY|WEEKLY|MONTHLY, com INTERVAL, BYDAY (apenas
+    semanal), COUNT ou UNTIL. As ocorrências são calculadas no horário local, de
+    modo que um evento semanal às 14h continua às 14h em todas as semanas.
+    """
+
+    def __init__(self, freq, interval=1, byday=None, count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = byday
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, text):
+        """Interpreta o texto da regra (ex.: FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20250630). Levanta ValueError."""
+        text = text.strip()
+        if text.upper().startswith('RRULE:'):
+            text = text[6:]
+        parts = {}
+        for part in filter(None, text.upper().split(';')):
+            name, sep, value = part.partition('=')
+            if not sep or not value:
+                raise ValueError(f'Parte inválida na regra de recorrência: "{part}".')
+            parts[name.strip()] = value.strip()
+
+        freq = parts.pop('FREQ', None)
+        if freq not in FREQUENCIES:
+            raise ValueError('FREQ deve ser DAILY, WEEKLY ou MONTHLY.')
+        try:
+            interval = int(parts.pop('INTERVAL', 1))
+            count = int(parts['COUNT']) if 'COUNT' in parts else None
+        except ValueError:
+            raise ValueError('INTERVAL e COUNT devem ser números inteiros.')
+        parts.pop('COUNT', None)
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError('INTERVAL e COUNT devem ser maiores que zero.')
+
+        until = _parse_until(parts.pop('UNTIL')) if 'UNTIL' in parts else None
+        if count is not None and until is not None:
+            raise ValueError('Use COUNT ou UNTIL, não os dois.')
+
+        byday = None
+        if 'BYDAY' in parts:
+            if freq != 'WEEKLY':
+                raise ValueError('BYDAY só é aceito com FREQ=WEEKLY.')
+            days = parts.pop('BYDAY').split(',')
+            if any(day not in WEEKDAYS for day in days):
+                raise ValueError('BYDAY deve conter dias como MO, TU, WE, TH, FR, SA, SU.')
+            byday = sorted({WEEKDAYS.index(day) for day in days})
+
+        if parts:
+            raise ValueError(f'Partes não suportadas na regra de recorrência: {", ".join(parts)}.')
+        if count is not None and count > get_config()['MAX_OCCURRENCES']:
+            raise ValueError(f'COUNT não pode ser maior que {get_config()["MAX_OCCURRENCES"]}.')
+        return cls(freq, interval, byday, count, until)
+
+    @property
+    def is_finite(self):
+        return self.count is not None or self.until is not None
+
+    def _skip_periods(self, dtstart, after):
+        """Quantidade de períodos inteiros que terminam antes de `after` e podem ser pulados"""
+        if after is None or after <= dtstart or self.count is not None:
+            # Com COUNT, todas as ocorrências anteriores precisam ser contadas
+            return 0
+        if self.freq == 'MONTHLY':
+            months = (after.year - dtstart.year) * 12 + after.month - dtstart.month
+            return max(0, months // self.interval - 1)
+        days = (after - dtstart).days
+        if self.freq == 'WEEKLY':
+            days //= 7
+        return max(0, days // self.interval - 1)
+
+    def _iter_periods(self, dtstart, first_period):
+        period = first_period
+        if self.freq == 'DAILY':
+            while True:
+                yield [dtstart + datetime.timedelta(days=period * self.interval)]
+                period += 1
+        elif self.freq == 'WEEKLY':
+            week_start = dtstart - datetime.timedelta(days=dtstart.weekday())
+            weekdays = self.byday or [dtstart.weekday()]
+            while True:
+                base = week_start + datetime.timedelta(weeks=period * self.interval)
+                yield [base + datetime.timedelta(days=weekday) for weekday in weekdays]
+                period += 1
+        else:
+            while True:
+                index = dtstart.year * 12 + dtstart.month - 1 + period * self.interval
+                year, month = divmod(index, 12)
+                # Meses sem o dia (ex.: 31) não têm ocorrência, como na RFC 5545
+                if dtstart.day <= calendar.monthrange(year, month + 1)[1]:
+                    yield [dtstart.replace(year=year, month=month + 1)]
+                else:
+                    yield []
+                period += 1
+
+    def iter_starts(self, dtstart, after=None):
+        """
+        Inícios das ocorrências (datetimes locais ingênuos) em ordem, a partir de
+        dtstart. `after` permite pular os períodos anteriores a ele sem gerá-los.
+        """
+        produced = 0
+        for starts in self._iter_periods(dtstart, self._skip_periods(dtstart, after)):
+            for start in starts:
+                if start < dtstart:
+                    continue
+                if self.until is not None and start > self.until:
+                    return
+                yield start
+                produced += 1
+                if self.count is not None and produced >= self.count:
+                    return
+
+    def to_ical(self):
+        """Regra no formato do iCalendar, com UNTIL em UTC como exige a RFC 5545 para DTSTART em UTC"""
+        parts = [f'FREQ={self.freq}']
+        if self.interval > 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in self.byday))
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            until = timezone.make_aware(self.until.replace(microsecond=0)).astimezone(datetime.timezone.utc)
+            parts.append(f'UNTIL={until:%Y%m%dT%H%M%SZ}')
+        return ';'.join(parts)
+
+    def describe(self):
+        """Descrição legível, ex.: 'Semanal (ter, qui) até 30/06/2025'"""
+        text = FREQUENCIES[self.freq]
+        if self.interval > 1:
+            unit = {'DAILY': 'dias', 'WEEKLY': 'semanas', 'MONTHLY': 'meses'}[self.freq]
+            text = f'A cada {self.interval} {unit}'
+        if self.byday:
+            text += f' ({", ".join(WEEKDAY_NAMES[day] for day in self.byday)})'
+        if self.count is not None:
+            text += f', {self.count} ocorrência(s)'
+        elif self.until is not None:
+            text += f' até {self.until.strftime("%d/%m/%Y")}'
+        return text
+
+
+def parse_exceptions(text):
+    """Datas sem ocorrência (AAAA-MM-DD separadas por vírgula ou espaço). Levanta ValueError."""
+    dates = set()
+    for value in re.split(r'[\s,;]+', text or ''):
+        if not value:
+            continue
+        try:
+            dates.add(datetime.date.fromisoformat(value))
+        except ValueError:
+            raise ValueError(f'Data de exceção inválida: "{value}". Use AAAA-MM-DD.')
+    return dates
+
+
+def series_end(start_time, end_time, rule):
+    """
+    Término da última ocorrência de uma série finita, ou None se ela não tiver fim.
+    Levanta ValueError se a série não tiver nenhuma ocorrência ou tiver mais de
+    MAX_OCCURRENCES (o mesmo limite de COUNT).
+    """
+    rule = RecurrenceRule.parse(rule)
+    dtstart = timezone.make_naive(start_time)
+    if rule.until is not None and rule.until < dtstart:
+        raise ValueError('UNTIL deve ser posterior ao início do evento.')
+    if not rule.is_finite:
+        return None
+    limit = get_config()['MAX_OCCURRENCES']
+    last = None
+    for index, last in enumerate(rule.iter_starts(dtstart), 1):
+        if index > limit:
+            raise ValueError(f'A regra de recorrência gera mais de {limit} ocorrências; antecipe o UNTIL.')
+    if last is None:
+        raise ValueError('A regra de recorrência não gera nenhuma ocorrência a partir do início do evento.')
+    return timezone.make_aware(last) + (end_time - start_time)
+
+
+class OccurrenceCache:
+    """
+    Expansões recentes de séries por período. A chave inclui updated_at do evento:
+    qualquer alteração na série gera uma chave nova e a expansão antiga deixa de ser usada.
+    """
+
+    def __init__(self):
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key):
+        with self._lock:
+            occurrences = self._windows.get(key)
+            if occurrences is None:
+                self.stats['misses'] += 1
+                return None
+            self._windows.move_to_end(key)
+            self.stats['hits'] += 1
+            return occurrences
+
+    def set(self, key, occurrences):
+        with self._lock:
+            self._windows[key] = occurrences
+            self._windows.move_to_end(key)
+            while len(self._windows) > get_config()['MAX_CACHED_WINDOWS']:
+                self._windows.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+            self.stats = {'hits': 0, 'misses': 0}
+
+
+occurrence_cache = OccurrenceCache()
+
+
+def occurrences(event_id, updated_at, start_time, end_time, rule, exceptions, window_start, window_end):
+    """
+    Ocorrências [(início, término)] da série que se sobrepõem a [window_start, window_end).
+    Apenas o período pedido é expandido, e o resultado fica em cache.
+    """
+    key = (event_id, updated_at, rule, window_start, window_end)
+    cached = occurrence_cache.get(key)
+    if cached is not None:
+        return cached
+
+    duration = end_time - start_time
+    excluded = parse_exceptions(exceptions)
+    local_start = timezone.make_naive(window_start)
+    local_end = timezone.make_naive(window_end)
+    limit = get_config()['MAX_OCCURRENCES']
+
+    result = []
+    for start in RecurrenceRule.parse(rule).iter_starts(timezone.make_naive(start_time), after=local_start - duration):
+        if start >= local_end or len(result) >= limit:
+            break
+        if start + duration <= local_start or start.date() in excluded:
+            continue
+        occurrence_start = timezone.make_aware(start)
+        result.append((occurrence_start, occurrence_start + duration))
+
+    occurrence_cache.set(key, result)
+    return result
+
+
+def recurring_in_window(events, start, end):
+    """
+    Séries recorrentes do queryset `events` que podem ter ocorrências em [start, end):
+    começaram antes do fim do período e não terminaram antes do início.
+    """
+    return events.exclude(recurrence_rule='').filter(start_time__lt=end).filter(
+        Q(recurrence_end__isnull=True) | Q(recurrence_end__gt=start)
+    )
@@ -14,6 +14,8 @@ class FormattedAction:
         self.severity = action.severity
         self.ip_address = action.ip_address
         self.user_agent = action.user_agent
+        self.occurrences = action.occurrences
+        self.last_seen = action.last_seen
         
         # Para facilitar no template
         self.is_error = action.severity in ['error', 'critical']
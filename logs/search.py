@@ -0,0 +1,194 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from .models import Action
+
+# Tabela virtual FTS5 mantida por triggers sobre logs_action (ver migração 0011)
+FTS_TABLE = 'logs_action_fts'
+
+# Colunas da tabela FTS, na ordem em que foram criadas
+FTS_COLUMNS = ['author', 'type', 'description', 'url']
+
+# Marcadores usados pelo SQLite no trecho destacado; substituídos após o escape do HTML
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        author, type, description, url,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON logs_action BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, author, type, description, url) VALUES (
+            new.id,
+            new.author,
+            (SELECT name FROM logs_actiontype WHERE id = new.type_ref_id),
+            new.description,
+            (SELECT path FROM logs_actionurl WHERE id = new.url_ref_id)
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON logs_action BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF author, type_ref_id, description, url_ref_id ON logs_action BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, author, type, description, url) VALUES (
+            new.id,
+            new.author,
+            (SELECT name FROM logs_actiontype WHERE id = new.type_ref_id),
+            new.description,
+            (SELECT path FROM logs_actionurl WHERE id = new.url_ref_id)
+        );
+    END
+    """,
+]
+
+_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+_POPULATE_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, author, type, description, url)
+    SELECT a.id, a.author, t.name, a.description, u.path
+    FROM logs_action a
+    LEFT JOIN logs_actiontype t ON t.id = a.type_ref_id
+    LEFT JOIN logs_actionurl u ON u.id = a.url_ref_id
+"""
+
+
+def fts5_supported(conn=connection):
+    """Verifica se o banco é SQLite compilado com FTS5"""
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def is_available(conn=connection):
+    """Verifica se a tabela de busca textual existe"""
+    if conn.vendor != 'sqlite':
+        return False
+    return FTS_TABLE in conn.introspection.table_names()
+
+
+def create_index(conn=connection):
+    with conn.cursor() as cursor:
+        for sql in _CREATE_SQL:
+            cursor.execute(sql)
+
+
+def drop_index(conn=connection):
+    with conn.cursor() as cursor:
+        for sql in _DROP_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_index(conn=connection):
+    """Recria o conteúdo da tabela FTS a partir de logs_action"""
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(_POPULATE_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def ensure_index(conn=connection):
+    """
+    Garante que a tabela FTS e seus triggers existam. Migrações que alteram
+    logs_action no SQLite recriam a tabela e descartam os triggers; nesse caso
+    eles são recriados e o índice é reconstruído. Retorna True se reconstruiu.
+    """
+    if not fts5_supported(conn):
+        return False
+    expected = {FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            sorted(expected)
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    if existing == expected:
+        return False
+    create_index(conn)
+    rebuild_index(conn)
+    return True
+
+
+def build_match_query(text):
+    """
+    Converte o texto digitado pelo usuário em uma consulta FTS5 segura:
+    cada palavra vira um termo entre aspas com busca por prefixo (todas obrigatórias).
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def filter_queryset(queryset, text):
+    """
+    Filtra um queryset de Action pelo texto informado, usando o índice FTS5
+    quando disponível (ou LIKE como alternativa em outros bancos).
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    if is_available():
+        return queryset.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+    return queryset.filter(
+        Q(description__icontains=text) | Q(author__icontains=text)
+        | Q(type_ref__name__icontains=text) | Q(url_ref__path__icontains=text)
+    )
+
+
+def _highlight(fragment):
+    return (
+        escape(fragment or '')
+        .replace(_HIGHLIGHT_START, '<mark>')
+        .replace(_HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search_actions(text, limit=50, offset=0):
+    """
+    Busca ações por relevância (bm25). Retorna uma lista de tuplas
+    (action, trecho_destacado_html), na ordem do ranking.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    if not is_available():
+        actions = filter_queryset(Action.objects.all(), text).select_related('type_ref', 'url_ref')
+        return [(action, escape(action.description[:200])) for action in actions.order_by('-date', '-time')[offset:offset + limit]]
+
+    description_column = FTS_COLUMNS.index('description')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid, snippet({FTS_TABLE}, {description_column}, %s, %s, '…', 24)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY bm25({FTS_TABLE}, 1.0, 2.0, 4.0, 1.0)
+            LIMIT %s OFFSET %s
+            """,
+            [_HIGHLIGHT_START, _HIGHLIGHT_END, match, limit, offset]
+        )
+        rows = cursor.fetchall()
+
+    actions = Action.objects.select_related('type_ref', 'url_ref', 'user_agent_ref').in_bulk([row[0] for row in rows])
+    return [(actions[pk], _highlight(snippet)) for pk, snippet in rows if pk in actions]
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .agenda_cache import invalidate_events, invalidate_schedule
+from .counters import invalidate as invalidate_counters
+from .models import Action, DailyActionSummary, Event, LabSchedule
+
+@receiver(post_save, sender=Action)
+def atualizar_resumo_apos_salvar(sender, instance, created, **kwargs):
+    """
+    Mantém o resumo diário atualizado quando uma ação é registrada.
+    """
+    if created:
+        DailyActionSummary.register(instance.date, instance.severity)
+    else:
+        # Alterações em ações existentes são raras; recalcula apenas o dia afetado
+        DailyActionSummary.rebuild(dates=[instance.date])
+
+@receiver(post_delete, sender=Action)
+def atualizar_resumo_apos_excluir(sender, instance, **kwargs):
+    """
+    Recalcula o resumo do dia quando uma ação é excluída.
+    """
+    DailyActionSummary.rebuild(dates=[instance.date])
+
+
+# Invalidação dos fragmentos de agenda_home em cache (ver agenda_cache).
+# Os sinais também cobrem as alterações feitas pelo EventAdmin e pelo LabScheduleAdmin.
+# As versões só mudam após o commit: antes dele, uma requisição concorrente ainda lê
+# os dados antigos e os gravaria em cache sob a versão nova.
+@receiver(pre_save, sender=Event)
+def guardar_periodo_anterior_do_evento(sender, instance, **kwargs):
+    """
+    Guarda o período atual do evento antes de salvá-lo: se as datas mudarem,
+    o mês de origem também precisa ser invalidado.
+    """
+    instance._agenda_previous_period = None
+    if instance.pk:
+        instance._agenda_previous_period = Event.objects.filter(pk=instance.pk).values_list(
+            'start_time', 'end_time', 'recurrence_rule'
+        ).first()
+
+@receiver(post_save, sender=Event)
+def invalidar_agenda_apos_salvar_evento(sender, instance, **kwargs):
+    periods = [(instance.start_time, instance.end_time, instance.is_recurring)]
+    previous = getattr(instance, '_agenda_previous_period', None)
+    if previous:
+        start_time, end_time, recurrence_rule = previous
+        periods.append((start_time, end_time, bool(recurrence_rule)))
+    transaction.on_commit(lambda: invalidate_events(periods))
+
+@receiver(post_delete, sender=Event)
+def invalidar_agenda_apos_excluir_evento(sender, instance, **kwargs):
+    periods = [(instance.start_time, instance.end_time, instance.is_recurring)]
+    transaction.on_commit(lambda: invalidate_events(periods))
+
+@receiver(post_save, sender=LabSchedule)
+@receiver(post_delete, sender=LabSchedule)
+def invalidar_horarios(sender, **kwargs):
+    transaction.on_commit(invalidate_schedule)
+
+
+# Contador de eventos pendentes exibido no menu (ver counters)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidar_contador_de_pendentes(sender, instance, **kwargs):
+    invalidate_counters('pending_events')
@@ -1,3 +1,1394 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import path, reverse
+from django.utils import timezone
+from . import benchmark, search
+from .google_calendar import google_calendar_client, sync_external_events
+from .agenda_cache import fragment_versions, months_between
+from .archive import archive_actions, archive_path, load_archived_day
+from .availability import free_intervals, free_slots
+from .buffer import ActionBuffer
+from .coalescing import error_coalescer
+from .metrics import UNRESOLVED_ROUTE, RequestMetrics, request_metrics
+from .counters import COUNTER_KEY, get_counts
+from .export import EXPORT_FIELDS
+from .conflicts import annotate_conflicts, find_conflict, flag_conflicts, lab_hours_error, overlapping_events
+from .forms import EventForm, PendingEventsBulkForm, VisitRequestForm
+from .models import (
+    Action, ActionType, ActionUrl, CalendarFeedToken, DailyActionSummary, Event, ExternalEvent, LabSchedule, UserAgent
+)
+from .recurrence import RecurrenceRule, occurrence_cache, series_end
+from .views import index_events_by_day, month_grid
 
-# Create your tests here.
+CALENDAR_ID = 'laboratorio@group.calendar.google.com'
+
+
+def failing_view(request):
+    raise ValueError('falha simulada')
+
+
+def denied_view(request):
+    raise PermissionDenied
+
+
+def ok_view(request):
+    return HttpResponse('ok')
+
+
+# Rotas usadas pelos testes do LogMiddleware (ROOT_URLCONF='logs.tests')
+urlpatterns = [
+    path('falha/', failing_view, name='falha'),
+    path('negado/', denied_view, name='negado'),
+    path('ok/', ok_view, name='ok'),
+]
+
+
+def clear_intern_caches():
+    """Os caches de tipo/URL/user agent sobrevivem ao rollback de cada teste"""
+    for model in (ActionType, ActionUrl, UserAgent):
+        model.clear_cache()
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    """Implementa o mínimo da API do Google Calendar (token OAuth e events.list)"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._send_json(200, {'access_token': 'token-falso', 'expires_in': 3600, 'token_type': 'Bearer'})
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        server.requests.append((url.path, query))
+
+        if 'syncToken' in query:
+            if query['syncToken'] != server.sync_token:
+                self._send_json(410, {'error': {'code': 410, 'message': 'Sync token is no longer valid'}})
+                return
+            items = server.changes
+        else:
+            items = list(server.events.values())
+
+        # Paginação: nextPageToken é o índice do próximo item
+        offset = int(query.get('pageToken', 0))
+        page = items[offset:offset + server.page_size]
+        if offset + server.page_size < len(items):
+            self._send_json(200, {'items': page, 'nextPageToken': str(offset + server.page_size)})
+            return
+
+        server.version += 1
+        server.sync_token = f'token-{server.version}'
+        self._send_json(200, {'items': page, 'nextSyncToken': server.sync_token})
+
+
+def make_event(event_id, start, end, summary='Evento', status='confirmed'):
+    return {
+        'id': event_id,
+        'status': status,
+        'summary': summary,
+        'start': {'dateTime': start},
+        'end': {'dateTime': end},
+    }
+
+
+class FakeCalendarServerMixin:
+    """Sobe o servidor falso e gera credenciais de Conta de Serviço apontando para ele"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCalendarHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        endpoint = f'http://127.0.0.1:{cls.server.server_address[1]}/'
+
+        # Credenciais de Conta de Serviço cujo token é emitido pelo servidor falso
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        cls.credentials = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump({
+            'type': 'service_account',
+            'client_email': 'agenda@teste.iam.gserviceaccount.com',
+            'private_key': key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption()
+            ).decode(),
+            'private_key_id': '1',
+            'token_uri': f'{endpoint}token',
+        }, cls.credentials)
+        cls.credentials.close()
+
+        cls.config = {
+            'CREDENTIALS_FILE': cls.credentials.name,
+            'CALENDAR_ID': CALENDAR_ID,
+            'API_ENDPOINT': endpoint,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        os.remove(cls.credentials.name)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.page_size = 250
+        self.server.version = 0
+        self.server.sync_token = None
+        self.server.changes = []
+        self.server.events = {
+            'a': make_event('a', '2026-03-10T10:00:00Z', '2026-03-10T12:00:00Z', 'Oficina'),
+            'b': make_event('b', '2026-03-02T14:00:00Z', '2026-03-02T15:00:00Z', 'Visita'),
+        }
+        google_calendar_client.reset()
+        self.addCleanup(google_calendar_client.reset)
+
+    def list_requests(self):
+        return [query for path, query in self.server.requests if path.endswith('/events')]
+
+
+class ExternalEventMirrorTests(FakeCalendarServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server.page_size = 1
+        self.server.events['c'] = {
+            'id': 'c',
+            'status': 'confirmed',
+            'summary': 'Feriado',
+            'start': {'date': '2026-03-20'},
+            'end': {'date': '2026-03-21'},
+        }
+
+    def mirrored(self):
+        return dict(ExternalEvent.objects.values_list('google_id', 'title'))
+
+    def test_full_sync_pages_through_results(self):
+        with override_settings(GOOGLE_CALENDAR=self.config):
+            stats = sync_external_events()
+
+        self.assertTrue(stats['full'])
+        self.assertEqual(len(self.list_requests()), 3)
+        self.assertEqual(self.mirrored(), {'a': 'Oficina', 'b': 'Visita', 'c': 'Feriado'})
+
+        holiday = ExternalEvent.objects.get(google_id='c')
+        self.assertTrue(holiday.all_day)
+        self.assertEqual(holiday.start_time, timezone.make_aware(datetime(2026, 3, 20)))
+
+    def test_incremental_sync_applies_changes_and_cancellations(self):
+        with override_settings(GOOGLE_CALENDAR=self.config):
+            sync_external_events()
+            self.server.changes = [
+                make_event('a', '2026-03-10T10:00:00Z', '2026-03-10T12:00:00Z', status='cancelled'),
+                make_event('b', '2026-03-03T14:00:00Z', '2026-03-03T15:00:00Z', 'Visita remarcada'),
+            ]
+            stats = sync_external_events()
+
+        self.assertFalse(stats['full'])
+        self.assertEqual(self.list_requests()[-1]['syncToken'], 'token-1')
+        self.assertEqual(self.mirrored(), {'b': 'Visita remarcada', 'c': 'Feriado'})
+        self.assertEqual(ExternalEvent.objects.get(google_id='b').start_time.day, 3)
+
+    def test_full_sync_removes_missing_events(self):
+        with override_settings(GOOGLE_CALENDAR=self.config):
+            sync_external_events()
+            del self.server.events['a']
+            stats = sync_external_events(full=True)
+
+        self.assertTrue(stats['full'])
+        self.assertEqual(set(self.mirrored()), {'b', 'c'})
+
+    def test_expired_sync_token_triggers_full_sync(self):
+        with override_settings(GOOGLE_CALENDAR=self.config):
+            sync_external_events()
+            self.server.sync_token = 'token-invalidado'
+            stats = sync_external_events()
+
+        self.assertTrue(stats['full'])
+        queries = self.list_requests()
+        self.assertIn('syncToken', queries[3])
+        self.assertIn('timeMin', queries[4])
+        self.assertEqual(set(self.mirrored()), {'a', 'b', 'c'})
+
+    def test_service_built_once(self):
+        with override_settings(GOOGLE_CALENDAR=self.config):
+            self.assertIs(google_calendar_client.get_service(), google_calendar_client.get_service())
+
+    def test_missing_credentials(self):
+        config = dict(self.config, CREDENTIALS_FILE=os.path.join(tempfile.gettempdir(), 'inexistente.json'))
+        with override_settings(GOOGLE_CALENDAR=config):
+            self.assertIsNone(sync_external_events())
+        self.assertEqual(self.list_requests(), [])
+        self.assertFalse(ExternalEvent.objects.exists())
+
+
+class ConflictDetectionTests(TestCase):
+    def setUp(self):
+        # Próxima segunda-feira, para que as datas nunca sejam passadas
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=7 - today.weekday())
+        LabSchedule.objects.create(day_of_week=0, opening_time=time(8), closing_time=time(18))
+        LabSchedule.objects.create(day_of_week=6, opening_time=time(8), closing_time=time(18), is_closed=True)
+        self.approved = Event.objects.create(
+            title='Oficina de Arduino',
+            start_time=self.at(self.monday, 10),
+            end_time=self.at(self.monday, 12),
+            approved=True
+        )
+
+    def at(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_overlapping_events(self):
+        self.assertEqual(list(overlapping_events(self.at(self.monday, 11), self.at(self.monday, 13))), [self.approved])
+        # Intervalos que apenas se tocam não conflitam
+        self.assertFalse(overlapping_events(self.at(self.monday, 12), self.at(self.monday, 14)).exists())
+        self.assertFalse(overlapping_events(self.approved.start_time, self.approved.end_time, exclude_id=self.approved.id).exists())
+
+    def test_lab_hours(self):
+        self.assertIsNone(lab_hours_error(self.at(self.monday, 9), self.at(self.monday, 11)))
+        self.assertIsNotNone(lab_hours_error(self.at(self.monday, 17), self.at(self.monday, 19)))
+        sunday = self.monday + timedelta(days=6)
+        self.assertIsNotNone(lab_hours_error(self.at(sunday, 9), self.at(sunday, 11)))
+
+    def test_visit_request_form_rejects_conflicts(self):
+        form = VisitRequestForm(data={
+            'title': 'Visita escolar',
+            'visitor_name': 'Maria',
+            'visitor_email': 'maria@example.com',
+            'visitor_phone': '11999999999',
+            'number_of_visitors': 10,
+            'visit_date': self.monday.isoformat(),
+            'start_hour': '11:00',
+            'end_hour': '19:00',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('visit_date', form.errors)
+        self.assertIn('start_hour', form.errors)
+
+    def test_pending_events_are_flagged(self):
+        conflicting = Event.objects.create(
+            title='Visita', event_type=Event.EventType.VISIT,
+            start_time=self.at(self.monday, 11), end_time=self.at(self.monday, 19)
+        )
+        free = Event.objects.create(
+            title='Reunião', start_time=self.at(self.monday, 14), end_time=self.at(self.monday, 15)
+        )
+        events = {event.id: event for event in flag_conflicts(annotate_conflicts(Event.objects.filter(approved=False)))}
+
+        self.assertEqual(
+            [reason for reason, message in events[conflicting.id].conflict_reasons],
+            ['data_indisponivel', 'fora_horario']
+        )
+        self.assertIn('Oficina de Arduino', events[conflicting.id].conflict_reasons[0][1])
+        self.assertEqual(events[free.id].conflict_reasons, [])
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            id='20231001', password='senha', first_name='Ana', last_name='Lima', email='ana@example.com'
+        )
+        self.url = reverse('logs:agenda_feed', args=[CalendarFeedToken.for_user(user).token])
+        start = timezone.now() + timedelta(days=1)
+        self.event = Event.objects.create(
+            title='Oficina; impressão 3D', start_time=start, end_time=start + timedelta(hours=2), approved=True
+        )
+        Event.objects.create(title='Pendente', start_time=start, end_time=start + timedelta(hours=1))
+
+    def test_feed_content(self):
+        response = self.client.get(self.url)
+        content = response.content.decode()
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertIn(f'UID:event-{self.event.id}@', content)
+        self.assertIn('SUMMARY:Oficina\\; impressão 3D', content)
+        self.assertNotIn('Pendente', content)
+        self.assertEqual(self.client.get(self.url + '?tipo=visit').content.decode().count('BEGIN:VEVENT'), 0)
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Exclusões também mudam a versão do feed
+        self.event.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get(reverse('logs:agenda_feed', args=['invalido'])).status_code, 404)
+
+
+class AgendaEventsApiTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            id='20231002', password='senha', first_name='Bia', last_name='Reis', email='bia@example.com'
+        )
+        self.client.force_login(user)
+        self.url = reverse('logs:agenda_events_api')
+        start = timezone.make_aware(datetime(2025, 3, 31, 22, 0))
+        # Evento que atravessa a virada do mês aparece nos dois meses
+        self.event = Event.objects.create(
+            title='Maratona', start_time=start, end_time=start + timedelta(hours=4), approved=True
+        )
+        Event.objects.create(title='Pendente', start_time=start, end_time=start + timedelta(hours=1))
+
+    def test_range_and_fields(self):
+        for month_start, month_end in (('2025-03-01', '2025-04-01'), ('2025-04-01', '2025-05-01')):
+            data = self.client.get(self.url, {'start': month_start, 'end': month_end, 'fields': 'id,title'}).json()
+            self.assertEqual(data['events'], [{'id': self.event.id, 'title': 'Maratona'}])
+
+        data = self.client.get(self.url, {'start': '2025-05-01', 'end': '2025-06-01'}).json()
+        self.assertEqual(data['events'], [])
+
+    def test_conditional_get(self):
+        params = {'start': '2025-03-01', 'end': '2025-04-01'}
+        etag = self.client.get(self.url, params)['ETag']
+        # A resposta 304 é decidida sem montar o corpo
+        with mock.patch('logs.views.render_range') as render:
+            self.assertEqual(self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        render.assert_not_called()
+        self.assertNotEqual(self.client.get(self.url, dict(params, fields='id'))['ETag'], etag)
+
+        self.event.title = 'Maratona Maker'
+        self.event.save()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Exclusões também alteram a versão
+        etag = response['ETag']
+        self.event.delete()
+        self.assertEqual(self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'start': '2025-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': '2025-01-01', 'end': '2025-06-01'}).status_code, 400)
+        response = self.client.get(self.url, {'start': '2025-03-01', 'end': '2025-04-01', 'fields': 'senha'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AgendaFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        start = timezone.make_aware(datetime(2025, 3, 10, 14, 0))
+        self.event = Event.objects.create(
+            title='Oficina de Solda', start_time=start, end_time=start + timedelta(hours=2), approved=True
+        )
+
+    def test_months_between(self):
+        start = timezone.make_aware(datetime(2025, 3, 31, 22, 0))
+        self.assertEqual(months_between(start, start + timedelta(hours=1)), [(2025, 3)])
+        self.assertEqual(months_between(start, start + timedelta(hours=4)), [(2025, 3), (2025, 4)])
+        # O término é exclusivo: terminar à meia-noite não ocupa o mês seguinte
+        self.assertEqual(months_between(start, timezone.make_aware(datetime(2025, 4, 1))), [(2025, 3)])
+
+    def test_event_changes_invalidate_affected_months(self):
+        march, april, may = (fragment_versions(2025, month) for month in (3, 4, 5))
+        self.assertEqual(fragment_versions(2025, 3), march)
+
+        # Mover o evento para abril invalida os dois meses, mas não os demais, após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.start_time += timedelta(days=30)
+            self.event.end_time += timedelta(days=30)
+            self.event.save()
+            self.assertEqual(fragment_versions(2025, 3), march)
+        self.assertNotEqual(fragment_versions(2025, 3)['events'], march['events'])
+        self.assertNotEqual(fragment_versions(2025, 4)['events'], april['events'])
+        self.assertEqual(fragment_versions(2025, 5), may)
+
+        april = fragment_versions(2025, 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.delete()
+        self.assertNotEqual(fragment_versions(2025, 4)['events'], april['events'])
+        self.assertEqual(fragment_versions(2025, 4)['schedule'], april['schedule'])
+
+    def test_schedule_changes_invalidate_schedule(self):
+        versions = fragment_versions(2025, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            LabSchedule.objects.create(day_of_week=0, opening_time=time(8, 0), closing_time=time(17, 0))
+        self.assertNotEqual(fragment_versions(2025, 3)['schedule'], versions['schedule'])
+        self.assertEqual(fragment_versions(2025, 3)['events'], versions['events'])
+
+    def test_fragment_is_reused_until_invalidated(self):
+        template = Template(
+            '{% load cache %}{% cache 60 agenda_grid 2025 3 role version %}{{ title }}{% endcache %}'
+        )
+        render = lambda title: template.render(Context({
+            'title': title, 'role': 'member', 'version': fragment_versions(2025, 3)['events']
+        }))
+
+        self.assertEqual(render('Oficina de Solda'), 'Oficina de Solda')
+        self.assertEqual(render('Alterado'), 'Oficina de Solda')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+            # Antes do commit, uma leitura concorrente ainda usa a versão anterior
+            self.assertEqual(render('Alterado'), 'Oficina de Solda')
+        self.assertEqual(render('Alterado'), 'Alterado')
+
+
+class PendingEventsBulkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create_user(
+            id='20231004', password='senha', first_name='Davi', last_name='Souza', email='davi@example.com',
+            is_staff=True
+        )
+        self.client.force_login(self.staff)
+        self.url = reverse('logs:pending_events_bulk')
+        patcher = mock.patch('logs.views.log_user_action')
+        self.log_user_action = patcher.start()
+        self.addCleanup(patcher.stop)
+        start = timezone.make_aware(datetime(2025, 3, 10, 9, 0))
+        self.events = [
+            Event.objects.create(
+                title=f'Visita {i}', start_time=start + timedelta(days=i), end_time=start + timedelta(days=i, hours=1),
+                event_type=Event.EventType.VISIT, created_by=self.staff
+            )
+            for i in range(3)
+        ]
+
+
+    def test_bulk_approve(self):
+        previous = Event.objects.get(pk=self.events[0].pk).updated_at
+        versions = fragment_versions(2025, 3)
+        ids = [self.events[0].id, self.events[1].id]
+
+        with mock.patch('logs.views.enviar_emails_solicitacoes_aprovadas') as enviar:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, {'eventos': ids, 'acao': 'aprovar'})
+
+        self.assertRedirects(response, reverse('logs:pending_events'), fetch_redirect_response=False)
+        self.assertEqual(set(Event.objects.filter(approved=True).values_list('id', flat=True)), set(ids))
+        self.assertGreater(Event.objects.get(pk=ids[0]).updated_at, previous)
+        self.assertNotEqual(fragment_versions(2025, 3)['events'], versions['events'])
+        enviar.assert_called_once()
+        self.assertEqual([event.id for event in enviar.call_args.args[0]], ids)
+        self.assertEqual(self.log_user_action.call_count, 2)
+
+    def test_logs_written_only_after_commit(self):
+        with mock.patch('logs.views.enviar_emails_solicitacoes_aprovadas'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(self.url, {'eventos': [self.events[0].id], 'acao': 'aprovar'})
+            self.log_user_action.assert_not_called()
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.log_user_action.call_count, 1)
+
+    def test_events_decided_concurrently_are_skipped(self):
+        is_valid = PendingEventsBulkForm.is_valid
+
+        def approved_by_another_admin(form):
+            # Outro administrador aprova a solicitação depois da validação do formulário
+            valid = is_valid(form)
+            Event.objects.filter(pk=self.events[1].pk).update(approved=True)
+            return valid
+
+        ids = [event.id for event in self.events]
+        with mock.patch.object(PendingEventsBulkForm, 'is_valid', approved_by_another_admin), \
+                mock.patch('logs.views.enviar_emails_solicitacoes_recusadas') as enviar:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, {'eventos': ids, 'acao': 'recusar', 'motivo': 'Sem vagas'})
+
+        self.assertEqual(list(Event.objects.values_list('id', flat=True)), [self.events[1].id])
+        self.assertEqual([event.id for event, _ in enviar.call_args.args[0]], [ids[0], ids[2]])
+        self.assertEqual(self.log_user_action.call_count, 2)
+
+    def test_bulk_reject_with_shared_and_specific_reasons(self):
+        data = {
+            'eventos': [event.id for event in self.events],
+            'acao': 'recusar',
+            'motivo': 'Laboratório em manutenção',
+            f'motivo_{self.events[2].id}': 'Turma acima da capacidade',
+        }
+        with mock.patch('logs.views.enviar_emails_solicitacoes_recusadas') as enviar:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, data)
+
+        self.assertFalse(Event.objects.exists())
+        motivos = [motivo for _, motivo in enviar.call_args.args[0]]
+        self.assertEqual(motivos, ['Laboratório em manutenção'] * 2 + ['Turma acima da capacidade'])
+
+    def test_reject_requires_reason(self):
+        with mock.patch('logs.views.enviar_emails_solicitacoes_recusadas') as enviar:
+            self.client.post(self.url, {'eventos': [self.events[0].id], 'acao': 'recusar'})
+        self.assertEqual(Event.objects.count(), 3)
+        enviar.assert_not_called()
+
+
+class RecurringEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        occurrence_cache.clear()
+        # Aula semanal às terças e quintas durante um semestre, com um feriado
+        start = timezone.make_aware(datetime(2025, 3, 4, 14, 0))
+        self.course = Event.objects.create(
+            title='Aula de Eletrônica', start_time=start, end_time=start + timedelta(hours=2), approved=True,
+            recurrence_rule='FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20250701', recurrence_exceptions='2025-04-17'
+        )
+
+    def window(self, start, end):
+        return timezone.make_aware(datetime(*start)), timezone.make_aware(datetime(*end))
+
+    def test_rule_parsing(self):
+        rule = RecurrenceRule.parse('FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;COUNT=4')
+        self.assertEqual((rule.freq, rule.interval, rule.byday, rule.count), ('WEEKLY', 2, [0, 2], 4))
+        starts = list(rule.iter_starts(datetime(2025, 3, 3, 9, 0)))
+        self.assertEqual([start.day for start in starts], [3, 5, 17, 19])
+        # Meses sem o dia 31 não têm ocorrência
+        starts = RecurrenceRule.parse('FREQ=MONTHLY;COUNT=3').iter_starts(datetime(2025, 1, 31, 9, 0))
+        self.assertEqual([start.month for start in starts], [1, 3, 5])
+        for invalid in ('FREQ=YEARLY', 'FREQ=DAILY;COUNT=2;UNTIL=20250101', 'FREQ=MONTHLY;BYDAY=MO', 'FREQ=DAILY;BYHOUR=9'):
+            with self.assertRaises(ValueError):
+                RecurrenceRule.parse(invalid)
+
+    def test_occurrences_expanded_within_window(self):
+        self.assertEqual(self.course.recurrence_end, timezone.make_aware(datetime(2025, 7, 1, 16, 0)))
+
+        april = self.course.occurrences(*self.window((2025, 4, 1), (2025, 5, 1)))
+        self.assertEqual(len(april), 8)  # 9 terças e quintas menos o feriado de 17/04
+        self.assertNotIn(17, [start.day for start, _ in april])
+        self.assertEqual({timezone.localtime(start).hour for start, _ in april}, {14})
+        self.assertEqual(self.course.occurrences(*self.window((2025, 7, 2), (2025, 8, 1))), [])
+
+        # A mesma janela é atendida pelo cache; alterar a série gera uma nova expansão
+        self.course.occurrences(*self.window((2025, 4, 1), (2025, 5, 1)))
+        self.assertEqual(occurrence_cache.stats['hits'], 1)
+
+    def test_api_and_feed(self):
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231005', password='senha', first_name='Eva', last_name='Cruz', email='eva@example.com'
+        ))
+        data = self.client.get(reverse('logs:agenda_events_api'), {'start': '2025-04-01', 'end': '2025-05-01'}).json()
+        self.assertEqual(len(data['events']), 8)
+        self.assertEqual({event['id'] for event in data['events']}, {self.course.id})
+
+        with mock.patch('logs.calendar_feed.timezone.now', return_value=timezone.make_aware(datetime(2025, 3, 1))):
+            user = get_user_model().objects.get(id='20231005')
+            feed = self.client.get(reverse('logs:agenda_feed', args=[CalendarFeedToken.for_user(user).token]))
+        content = feed.content.decode()
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=', content)
+        self.assertIn('EXDATE:', content)
+
+    def test_conflicts_with_occurrences(self):
+        start, end = self.window((2025, 5, 6, 15, 0), (2025, 5, 6, 17, 0))
+        self.assertEqual(find_conflict(start, end), self.course)
+        holiday_start, holiday_end = self.window((2025, 4, 17, 14, 0), (2025, 4, 17, 16, 0))
+        self.assertIsNone(find_conflict(holiday_start, holiday_end))
+
+        pending = Event.objects.create(title='Visita', start_time=start, end_time=end)
+        events = flag_conflicts(annotate_conflicts(Event.objects.filter(pk=pending.pk)))
+        self.assertEqual(events[0].conflict_reasons[0][0], 'data_indisponivel')
+
+
+    def test_series_without_occurrences_is_rejected(self):
+        start = timezone.make_aware(datetime(2030, 3, 4, 14, 0))
+        data = {'title': 'Aula', 'start_time': start, 'end_time': start + timedelta(hours=2), 'event_type': Event.EventType.INTERNAL}
+        for rule in ('FREQ=WEEKLY;UNTIL=20300101', 'FREQ=WEEKLY;BYDAY=FR;UNTIL=20300307', 'FREQ=DAILY;UNTIL=20350101'):
+            form = EventForm(dict(data, recurrence_rule=rule))
+            self.assertFalse(form.is_valid(), rule)
+            self.assertIn('recurrence_rule', form.errors)
+
+        with self.assertRaises(ValueError):
+            series_end(start, start + timedelta(hours=2), 'FREQ=WEEKLY;UNTIL=20300101')
+        self.assertTrue(EventForm(dict(data, recurrence_rule='FREQ=DAILY;UNTIL=20300310')).is_valid())
+
+
+class FreeSlotTests(TestCase):
+    def setUp(self):
+        occurrence_cache.clear()
+        for day in range(5):
+            LabSchedule.objects.create(day_of_week=day, opening_time=time(8, 0), closing_time=time(18, 0))
+        LabSchedule.objects.create(day_of_week=5, opening_time=time(8, 0), closing_time=time(12, 0), is_closed=True)
+        # Segunda-feira 03/03/2025: reunião das 9h às 10h; às terças e quintas, aula das 14h às 16h
+        self.at = lambda *args: timezone.make_aware(datetime(2025, 3, *args))
+        Event.objects.create(title='Reunião', start_time=self.at(3, 9), end_time=self.at(3, 10), approved=True)
+        Event.objects.create(title='Pendente', start_time=self.at(3, 12), end_time=self.at(3, 13))
+        Event.objects.create(
+            title='Aula', start_time=self.at(4, 14), end_time=self.at(4, 16), approved=True,
+            recurrence_rule='FREQ=WEEKLY;BYDAY=TU,TH'
+        )
+
+    def test_sweep_line(self):
+        opening = [(self.at(3, 8), self.at(3, 18))]
+        busy = [(self.at(3, 7), self.at(3, 9)), (self.at(3, 11), self.at(3, 12)), (self.at(3, 11, 30), self.at(3, 13))]
+        self.assertEqual(free_intervals(opening, busy), [
+            (self.at(3, 9), self.at(3, 11)), (self.at(3, 13), self.at(3, 18))
+        ])
+
+    def test_free_slots_over_range(self):
+        with mock.patch('logs.availability.timezone.now', return_value=self.at(1)):
+            with self.assertNumQueries(3):
+                slots = free_slots(datetime(2025, 3, 3).date(), datetime(2025, 3, 8).date(), timedelta(hours=2))
+        # Segunda das 8h às 9h não comporta 2h; o pendente não ocupa horário; sábado fechado
+        self.assertEqual(slots[:3], [
+            (self.at(3, 10), self.at(3, 18)), (self.at(4, 8), self.at(4, 14)), (self.at(4, 16), self.at(4, 18))
+        ])
+        self.assertEqual(len(slots), 7)  # 1 + 2 + 1 + 2 + 1 de segunda a sexta
+
+    def test_api(self):
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231006', password='senha', first_name='Ivo', last_name='Reis', email='ivo@example.com'
+        ))
+        url = reverse('logs:agenda_free_slots_api')
+        with mock.patch('logs.availability.timezone.now', return_value=self.at(1)):
+            data = self.client.get(url, {'start': '2025-03-03', 'end': '2025-03-03', 'duration': '90'}).json()
+        self.assertEqual(data['duration'], 90)
+        self.assertEqual([slot['start'][11:16] for slot in data['slots']], ['10:00'])
+        self.assertEqual(self.client.get(url, {'start': '2025-03-03', 'end': '2025-12-31'}).status_code, 400)
+
+
+class BadgeCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        start = timezone.now() + timedelta(days=1)
+        self.event = Event.objects.create(title='Visita', start_time=start, end_time=start + timedelta(hours=1))
+
+    def test_counts_cached_and_invalidated_by_signals(self):
+        from users.models import RegistrationRequest
+
+        with self.assertNumQueries(2):
+            counts = get_counts('pending_events', 'pending_registrations')
+        self.assertEqual(counts, {'pending_events': 1, 'pending_registrations': 0})
+        with self.assertNumQueries(0):
+            get_counts('pending_events', 'pending_registrations')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.approved = True
+            self.event.save()
+            RegistrationRequest.objects.create(
+                first_name='Rui', last_name='Melo', email='rui@example.com', id_number='20231007', password='x'
+            )
+        self.assertEqual(get_counts('pending_events', 'pending_registrations'), {
+            'pending_events': 0, 'pending_registrations': 1
+        })
+
+    def read_in_other_process(self, name):
+        """Contador visto por outro processo (outro worker do servidor) com o mesmo backend de cache"""
+        config = settings.CACHES['default']
+        code = (
+            'import sys; from django.conf import settings; settings.configure(); '
+            'from django.utils.module_loading import import_string; '
+            'print(import_string(sys.argv[1])(sys.argv[2], {}).get(sys.argv[3]))'
+        )
+        return subprocess.run(
+            [sys.executable, '-c', code, config['BACKEND'], str(config.get('LOCATION', '')), COUNTER_KEY.format(name=name)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    def test_invalidation_reaches_other_processes(self):
+        get_counts('pending_events')
+        self.assertEqual(self.read_in_other_process('pending_events'), '1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.approved = True
+            self.event.save()
+        self.assertEqual(self.read_in_other_process('pending_events'), 'None')
+
+
+class DailyActionSummaryTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        self.day = date(2025, 3, 10)
+
+    def log(self, severity='info', day=None):
+        return Action.objects.create(
+            type='Login', description='Teste', date=day or self.day, time=time(9, 0), severity=severity
+        )
+
+    def test_register_keeps_counts_and_max_severity(self):
+        self.log('warning')
+        self.log('info')
+        DailyActionSummary.register(self.day, 'error', amount=3)
+
+        summary = DailyActionSummary.objects.get(date=self.day)
+        self.assertEqual(
+            (summary.total, summary.info_count, summary.warning_count, summary.error_count),
+            (5, 1, 1, 3)
+        )
+        self.assertEqual(summary.max_severity, 'error')
+        # Uma severidade menos grave não rebaixa o nível máximo do dia
+        self.log('security')
+        self.assertEqual(DailyActionSummary.objects.get(date=self.day).max_severity, 'error')
+
+    def test_rebuild_recalculates_only_requested_days(self):
+        other_day = date(2025, 3, 11)
+        self.log('critical')
+        self.log('info', day=other_day)
+        DailyActionSummary.objects.update(total=99, max_severity='info')
+
+        self.assertEqual(DailyActionSummary.rebuild(dates=[self.day]), 1)
+        summary = DailyActionSummary.objects.get(date=self.day)
+        self.assertEqual((summary.total, summary.critical_count, summary.max_severity), (1, 1, 'critical'))
+        self.assertEqual(DailyActionSummary.objects.get(date=other_day).total, 99)
+
+        self.assertEqual(DailyActionSummary.rebuild(), 2)
+        self.assertEqual(DailyActionSummary.objects.get(date=other_day).total, 1)
+
+    def test_rebuild_preserves_archived_days(self):
+        archived_day = date(2024, 1, 5)
+        DailyActionSummary.objects.create(date=archived_day, total=40, info_count=40, archived=True)
+        # Ação gravada depois do arquivamento não altera o resumo arquivado
+        self.log('error', day=archived_day)
+        self.log('info')
+        DailyActionSummary.objects.filter(date=archived_day).update(total=40, error_count=0)
+
+        self.assertEqual(DailyActionSummary.rebuild(), 1)
+        archived = DailyActionSummary.objects.get(date=archived_day)
+        self.assertEqual((archived.total, archived.error_count, archived.archived), (40, 0, True))
+        self.assertEqual(DailyActionSummary.objects.get(date=self.day).total, 1)
+
+
+class ActionBufferTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.spill_file = os.path.join(self.directory.name, 'spill.ndjson')
+        # Sem thread de gravação: os testes chamam flush() explicitamente
+        patcher = mock.patch.object(ActionBuffer, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = ActionBuffer()
+
+    def config(self, **config):
+        return override_settings(LOGS_ACTION_BUFFER={'SYNC': False, 'SPILL_FILE': self.spill_file, **config})
+
+    def fields(self, description='Teste', severity='info'):
+        return {
+            'author': 'ana', 'type': 'Login', 'description': description,
+            'date': date(2025, 3, 10), 'time': time(9, 0), 'severity': severity,
+        }
+
+    def test_flush_writes_batches_and_summaries(self):
+        with self.config(BATCH_SIZE=2):
+            for index in range(3):
+                self.buffer.add(**self.fields(f'Ação {index}'))
+            self.assertFalse(Action.objects.exists())
+            self.buffer.flush()
+
+        self.assertEqual(Action.objects.count(), 3)
+        self.assertEqual(DailyActionSummary.objects.get(date=date(2025, 3, 10)).total, 3)
+        self.assertEqual(self.buffer.stats['written'], 3)
+
+    def test_drop_info_overflow_keeps_errors(self):
+        with self.config(MAX_SIZE=2, OVERFLOW_POLICY='drop_info'):
+            self.buffer.add(**self.fields('Informativo'))
+            self.buffer.add(**self.fields('Erro 1', 'error'))
+            # O informativo enfileirado dá lugar ao erro; um novo informativo é descartado
+            self.assertTrue(self.buffer.add(**self.fields('Erro 2', 'error')))
+            self.assertFalse(self.buffer.add(**self.fields('Outro informativo')))
+            self.buffer.flush()
+
+        self.assertEqual(sorted(Action.objects.values_list('description', flat=True)), ['Erro 1', 'Erro 2'])
+        self.assertEqual(self.buffer.stats['dropped'], 2)
+
+    def test_block_overflow_times_out(self):
+        with self.config(MAX_SIZE=1, OVERFLOW_POLICY='block', BLOCK_TIMEOUT=0.01):
+            self.buffer.add(**self.fields())
+            self.assertFalse(self.buffer.add(**self.fields()))
+        self.assertEqual(self.buffer.stats['dropped'], 1)
+
+    def test_spill_overflow_is_recovered_on_flush(self):
+        with self.config(MAX_SIZE=1, OVERFLOW_POLICY='spill'):
+            self.buffer.add(**self.fields('Na fila'))
+            self.assertFalse(self.buffer.add(**self.fields('Transbordo', 'warning')))
+            self.assertTrue(os.path.exists(self.spill_file))
+            self.buffer.flush()
+
+        self.assertEqual(sorted(Action.objects.values_list('description', flat=True)), ['Na fila', 'Transbordo'])
+        self.assertEqual(DailyActionSummary.objects.get().warning_count, 1)
+        self.assertFalse(os.path.exists(self.spill_file))
+
+    def test_recovery_skips_corrupt_lines_and_keeps_interrupted_file(self):
+        valid = lambda description: json.dumps(self.fields(description), default=str) + '\n'
+        # Recuperação anterior interrompida e um novo transbordo com uma linha truncada
+        with open(f'{self.spill_file}.recovering', 'w', encoding='utf-8') as f:
+            f.write(valid('Interrompido'))
+        with open(self.spill_file, 'w', encoding='utf-8') as f:
+            f.write(valid('Novo') + '{"author": "ana", "descr\n' + valid('Depois da linha ruim'))
+
+        with self.config(), mock.patch('builtins.print'):
+            self.buffer.flush()
+
+        self.assertEqual(
+            sorted(Action.objects.values_list('description', flat=True)),
+            ['Depois da linha ruim', 'Interrompido', 'Novo']
+        )
+        self.assertEqual(self.buffer.stats['corrupt'], 1)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_failed_summary_rolls_back_batch_without_duplicates(self):
+        with self.config():
+            self.buffer.add(**self.fields('Primeira'))
+            self.buffer.add(**self.fields('Segunda'))
+            with mock.patch.object(DailyActionSummary, 'register', side_effect=RuntimeError('falha')):
+                with mock.patch('builtins.print'):
+                    self.buffer.flush()
+            # O INSERT foi desfeito e o lote inteiro foi para o arquivo de transbordo
+            self.assertFalse(Action.objects.exists())
+            with open(self.spill_file, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+            self.buffer.flush()
+
+        self.assertEqual(Action.objects.count(), 2)
+        self.assertEqual(DailyActionSummary.objects.get().total, 2)
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        get_user_model().objects.create_user(
+            id=benchmark.BENCHMARK_USER_ID, password='senha', first_name='Benchmark', last_name='Admin',
+            email='admin@benchmark.local', is_staff=True
+        )
+
+    def test_failing_route_does_not_abort_run(self):
+        cases = [('inexistente', '/logs/nao-existe/'), ('logs_list', reverse('logs:index'))]
+        results = benchmark.run_benchmark(cases=cases, repeat=2, warmup=0)['results']
+
+        self.assertEqual((results[0]['status'], results[0]['error']), (404, 'HTTP 404'))
+        self.assertNotIn('time_ms', results[0])
+        self.assertEqual((results[1]['status'], results[1]['error']), (200, None))
+        self.assertGreater(results[1]['time_ms']['median'], 0)
+        # Falhas não entram na comparação entre execuções
+        rows = benchmark.compare_results({'results': results}, {'results': results})
+        self.assertEqual([row['name'] for row in rows], ['logs_list'])
+
+    def test_command_end_to_end_on_tiny_dataset(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'resultado.json')
+            # Processo separado: o comando cria e passa a usar o seu próprio banco SQLite
+            process = subprocess.run(
+                [
+                    sys.executable, '-W', 'ignore', 'manage.py', 'benchmark_logs',
+                    '--database', os.path.join(directory, 'benchmark.sqlite3'),
+                    '--actions', '500', '--events', '20', '--users', '5', '--days', '7',
+                    '--repeat', '1', '--output', output,
+                ],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=300
+            )
+            self.assertEqual(process.returncode, 0, process.stderr)
+            with open(output, encoding='utf-8') as f:
+                results = json.load(f)
+
+        self.assertEqual(results['meta']['dataset']['actions'], 500)
+        self.assertEqual(
+            [(result['name'], result['status'], result['error']) for result in results['results']],
+            [(name, 200, None) for name in ('logs_list', 'logs_datepage', 'agenda_home', 'pending_events')]
+        )
+
+
+@mock.patch('logs.views.LOGS_PAGE_SIZE', 2)
+class LogsCursorPaginationTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231008', password='senha', first_name='Lia', last_name='Dias', email='lia@example.com',
+            is_staff=True
+        ))
+        self.day = date(2025, 3, 10)
+        # Três ações no mesmo segundo: o desempate é feito pelo id
+        times = [time(9, 0), time(10, 0), time(10, 0), time(10, 0), time(11, 0)]
+        self.actions = [
+            Action.objects.create(type='Acesso', description=f'Ação {index}', date=self.day, time=moment)
+            for index, moment in enumerate(times)
+        ]
+        self.url = reverse('logs:datepage', args=[10, 3, 2025])
+
+    def page(self, **params):
+        response = self.client.get(self.url, params)
+        return [action.description for action in response.context['actions']], response.context
+
+    def test_forward_pages_break_ties_on_id(self):
+        descriptions, context = self.page()
+        self.assertEqual(descriptions, ['Ação 0', 'Ação 1'])
+        self.assertIsNone(context['previous_cursor'])
+        self.assertEqual(context['next_cursor'], f'10:00:00_{self.actions[1].id}')
+
+        descriptions, context = self.page(after=context['next_cursor'])
+        self.assertEqual(descriptions, ['Ação 2', 'Ação 3'])
+        descriptions, context = self.page(after=context['next_cursor'])
+        self.assertEqual(descriptions, ['Ação 4'])
+        self.assertIsNone(context['next_cursor'])
+        self.assertEqual(context['previous_cursor'], f'11:00:00_{self.actions[4].id}')
+
+    def test_backward_pages(self):
+        descriptions, context = self.page(before=f'11:00:00_{self.actions[4].id}')
+        self.assertEqual(descriptions, ['Ação 2', 'Ação 3'])
+        self.assertEqual(context['next_cursor'], f'10:00:00_{self.actions[3].id}')
+
+        descriptions, context = self.page(before=context['previous_cursor'])
+        self.assertEqual(descriptions, ['Ação 0', 'Ação 1'])
+        self.assertIsNone(context['previous_cursor'])
+
+    def test_invalid_cursor_starts_from_beginning(self):
+        descriptions, context = self.page(after='ontem')
+        self.assertEqual(descriptions, ['Ação 0', 'Ação 1'])
+        self.assertEqual(context['stats']['total'], 5)
+
+
+class LogsExportTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231009', password='senha', first_name='Noé', last_name='Paz', email='noe@example.com',
+            is_staff=True
+        ))
+        Action.objects.create(
+            type='Login', author='ana', description='Entrou, pelo "portal"', date=date(2025, 3, 10),
+            time=time(9, 0), url='/users/login/', user_agent='Firefox'
+        )
+        Action.objects.create(
+            type='Erro do Sistema', author='rui', description='Falha', date=date(2025, 3, 11),
+            time=time(10, 30), severity='error'
+        )
+        Action.objects.create(type='Login', author='ana', description='Fora do período', date=date(2025, 4, 1), time=time(8, 0))
+        self.url = reverse('logs:export')
+
+    def export(self, **params):
+        response = self.client.get(self.url, {'start_date': '2025-03-01', 'end_date': '2025-03-31', **params})
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('logs_2025-03-01_2025-03-31.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual([row[EXPORT_FIELDS.index('description')] for row in rows[1:]], ['Entrou, pelo "portal"', 'Falha'])
+        first = dict(zip(EXPORT_FIELDS, rows[1]))
+        self.assertEqual((first['type'], first['url'], first['user_agent']), ('Login', '/users/login/', 'Firefox'))
+        # A exportação fica registrada na trilha de auditoria
+        self.assertTrue(Action.objects.filter(type_ref__name='Exportação de Logs', severity='security').exists())
+
+    def test_ndjson_with_filters_and_gzip(self):
+        response, content = self.export(format='ndjson', severity='error', gzip='on')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual((record['type'], record['author'], record['date'], record['time']),
+                         ('Erro do Sistema', 'rui', '2025-03-11', '10:30:00'))
+
+    def test_invalid_filters(self):
+        response = self.client.get(self.url, {'start_date': '2025-03-31', 'end_date': '2025-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class InterningTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+
+    def test_values_stored_once_and_resolved(self):
+        first = Action.objects.create(
+            type='Login', description='a', date=date(2025, 3, 10), time=time(9, 0),
+            url='/logs/', user_agent='Firefox'
+        )
+        second = Action.objects.create(
+            type='Login', description='b', date=date(2025, 3, 10), time=time(9, 1),
+            url='/logs/', user_agent='Firefox', ip_address='10.0.0.1'
+        )
+        self.assertEqual((ActionType.objects.count(), ActionUrl.objects.count(), UserAgent.objects.count()), (1, 1, 1))
+        self.assertEqual(first.type_ref_id, second.type_ref_id)
+        self.assertEqual(UserAgent.objects.get().digest, UserAgent.make_digest('Firefox'))
+
+        action = Action.objects.get(pk=second.pk)
+        self.assertEqual((action.type, action.url, action.user_agent), ('Login', '/logs/', 'Firefox'))
+        self.assertEqual(Action(type='Login', url='').url, None)
+
+    def test_cache_avoids_queries_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pk = ActionType.intern('Logout')
+        with self.assertNumQueries(0):
+            self.assertEqual(ActionType.intern('Logout'), pk)
+            self.assertEqual(ActionType.resolve(pk), 'Logout')
+
+    def test_rolled_back_value_is_not_cached(self):
+        try:
+            with transaction.atomic():
+                ActionType.intern('Desfeito')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNone(ActionType.cache().get_id('Desfeito'))
+        self.assertTrue(ActionType.objects.filter(pk=ActionType.intern('Desfeito')).exists())
+
+
+class InternedDimensionsMigrationTests(TransactionTestCase):
+    before = [('logs', '0008_action_date_time_id_index')]
+    after = [('logs', '0009_action_interned_dimensions')]
+
+    def tearDown(self):
+        # Volta o banco de testes para a última migração
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        clear_intern_caches()
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_forward_and_backward(self):
+        apps = self.migrate(self.before)
+        OldAction = apps.get_model('logs', 'Action')
+        rows = [
+            ('Login', '/logs/', 'Firefox'), ('Login', '/logs/', 'Chrome'),
+            ('Logout', '', None), ('Erro do Sistema', None, 'Firefox'),
+        ]
+        OldAction.objects.bulk_create([
+            OldAction(type=type, url=url, user_agent=user_agent, description='x',
+                      date=date(2025, 3, 10), time=time(9, 0))
+            for type, url, user_agent in rows
+        ])
+
+        apps = self.migrate(self.after)
+        Action = apps.get_model('logs', 'Action')
+        self.assertEqual(apps.get_model('logs', 'ActionType').objects.count(), 3)
+        self.assertEqual(apps.get_model('logs', 'ActionUrl').objects.count(), 1)
+        self.assertEqual(apps.get_model('logs', 'UserAgent').objects.count(), 2)
+        self.assertEqual(
+            list(Action.objects.order_by('id').values_list('type_ref__name', 'url_ref__path', 'user_agent_ref__value')),
+            [('Login', '/logs/', 'Firefox'), ('Login', '/logs/', 'Chrome'),
+             ('Logout', None, None), ('Erro do Sistema', None, 'Firefox')]
+        )
+
+        apps = self.migrate(self.before)
+        OldAction = apps.get_model('logs', 'Action')
+        self.assertEqual(
+            list(OldAction.objects.order_by('id').values_list('type', 'url', 'user_agent')),
+            [('Login', '/logs/', 'Firefox'), ('Login', '/logs/', 'Chrome'),
+             ('Logout', None, None), ('Erro do Sistema', None, 'Firefox')]
+        )
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_override = override_settings(LOGS_ARCHIVE_DIR=directory.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.log = lambda day, description, severity='info': Action.objects.create(
+            type='Acesso', description=description, date=day, time=time(9, 0), severity=severity
+        )
+        self.log(date(2024, 1, 5), 'Menciona "date": "2024-01-06" no texto')
+        self.log(date(2024, 1, 5), 'Segunda do dia 5', 'error')
+        self.log(date(2024, 1, 6), 'Dia 6')
+        self.log(date(2024, 2, 10), 'Fevereiro')
+        self.log(date(2025, 3, 10), 'Recente')
+
+    def archived_ids(self, year, month):
+        with gzip.open(archive_path(year, month), 'rt', encoding='utf-8') as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def test_archive_read_back_and_delete(self):
+        self.assertEqual(archive_actions(date(2025, 1, 1), log=lambda message: None), 4)
+
+        self.assertEqual(list(Action.objects.values_list('description', flat=True)), ['Recente'])
+        summary = DailyActionSummary.objects.get(date=date(2024, 1, 5))
+        self.assertEqual((summary.archived, summary.total, summary.error_count), (True, 2, 1))
+        self.assertFalse(DailyActionSummary.objects.get(date=date(2025, 3, 10)).archived)
+
+        day_5 = load_archived_day(date(2024, 1, 5))
+        self.assertEqual(
+            [action.description for action in day_5],
+            ['Menciona "date": "2024-01-06" no texto', 'Segunda do dia 5']
+        )
+        self.assertEqual([action.description for action in load_archived_day(date(2024, 1, 6))], ['Dia 6'])
+        self.assertEqual(len(self.archived_ids(2024, 2)), 1)
+
+        # A página do dia arquivado é lida do arquivo
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231010', password='senha', first_name='Teo', last_name='Luz', email='teo@example.com',
+            is_staff=True
+        ))
+        response = self.client.get(reverse('logs:datepage', args=[5, 1, 2024]), {'severity': 'error'})
+        self.assertTrue(response.context['archived'])
+        self.assertEqual([action.description for action in response.context['actions']], ['Segunda do dia 5'])
+
+    def test_rows_written_after_archiving_are_shown_and_archived_later(self):
+        archive_actions(date(2025, 1, 1), log=lambda message: None)
+        # Ex.: recuperação do arquivo de spill com a data original
+        Action.objects.create(type='Acesso', description='Recuperada', date=date(2024, 1, 5), time=time(8, 0))
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231012', password='senha', first_name='Lia', last_name='Paz', email='lia@example.com',
+            is_staff=True
+        ))
+        url = reverse('logs:datepage', args=[5, 1, 2024])
+
+        response = self.client.get(url)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(response.context['stats']['total'], 3)
+        self.assertEqual([action.description for action in response.context['actions']][0], 'Recuperada')
+
+        # A próxima execução leva a ação para o arquivo, sem duplicar as demais
+        self.assertEqual(archive_actions(date(2025, 1, 1), log=lambda message: None), 1)
+        self.assertEqual(len(self.archived_ids(2024, 1)), 4)
+        response = self.client.get(url)
+        self.assertEqual(
+            [action.description for action in response.context['actions']],
+            ['Recuperada', 'Menciona "date": "2024-01-06" no texto', 'Segunda do dia 5']
+        )
+
+    def test_rerun_after_interrupted_delete_does_not_duplicate(self):
+        with mock.patch('logs.archive._delete_actions', side_effect=RuntimeError('interrompido')):
+            with self.assertRaises(RuntimeError):
+                archive_actions(date(2024, 2, 1), log=lambda message: None)
+        self.assertEqual(Action.objects.count(), 5)
+
+        self.log(date(2024, 1, 20), 'Gravada depois')
+        self.assertEqual(archive_actions(date(2024, 2, 1), log=lambda message: None), 4)
+        ids = self.archived_ids(2024, 1)
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(len(set(ids)), 4)
+        self.assertFalse(os.path.exists(archive_path(2024, 1) + '.tmp'))
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        if not search.fts5_supported():
+            self.skipTest('SQLite sem FTS5')
+        clear_intern_caches()
+        self.log = lambda description, **fields: Action.objects.create(
+            type=fields.pop('type', 'Acesso'), description=description, date=date(2025, 3, 10), time=time(9, 0), **fields
+        )
+
+    def found(self, text):
+        return [action.description for action, _ in search.search_actions(text)]
+
+    def test_triggers_keep_index_in_sync(self):
+        self.assertTrue(search.is_available())
+        action = self.log('Acesso ao laboratório de eletrônica', url='/logs/agenda/')
+        # Sem acentos e por prefixo; a URL e o tipo também são indexados
+        self.assertEqual(self.found('laboratorio eletr'), [action.description])
+        self.assertEqual(self.found('agenda'), [action.description])
+
+        action.description = 'Reserva da impressora 3D'
+        action.save()
+        self.assertEqual(self.found('laboratorio'), [])
+        self.assertEqual(self.found('impressora'), ['Reserva da impressora 3D'])
+
+        action.delete()
+        self.assertEqual(self.found('impressora'), [])
+
+    def test_occurrence_updates_skip_index(self):
+        action = self.log('Sensor desconectado', severity='error')
+
+        def total_changes():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT total_changes()')
+                return cursor.fetchone()[0]
+
+        # Repetições de um erro só alteram contadores: nenhuma linha da tabela FTS é reescrita
+        before = total_changes()
+        Action.objects.filter(pk=action.pk).update(occurrences=F('occurrences') + 3, last_seen=timezone.now())
+        self.assertEqual(total_changes() - before, 1)
+        self.assertEqual(self.found('desconectado'), ['Sensor desconectado'])
+
+    def test_logs_search_view(self):
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231011', password='senha', first_name='Bia', last_name='Mar', email='bia@example.com',
+            is_staff=True
+        ))
+        self.log('Sensor <b>temperatura</b> desconectado', type='Erro do Sistema')
+        self.log('Leitura normal', author='temperatura')
+
+        response = self.client.get(reverse('logs:search'), {'q': 'temperatura'})
+        results = response.context['results']
+        # A descrição tem peso maior que o autor no ranking
+        self.assertEqual([result['action'].description for result in results],
+                         ['Sensor <b>temperatura</b> desconectado', 'Leitura normal'])
+        self.assertEqual(results[0]['snippet'], 'Sensor &lt;b&gt;<mark>temperatura</mark>&lt;/b&gt; desconectado')
+        self.assertEqual(self.client.get(reverse('logs:search'), {'q': '"*'}).context['results'], [])
+
+
+@override_settings(ROOT_URLCONF='logs.tests', LOGS_ERROR_COALESCING={'WINDOW': 300, 'MAX_FINGERPRINTS': 2})
+class ErrorCoalescingTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        error_coalescer.clear()
+        self.addCleanup(error_coalescer.clear)
+        self.client.raise_request_exception = False
+
+    def test_window_and_day(self):
+        today, tomorrow = date(2025, 3, 10), date(2025, 3, 11)
+        self.assertFalse(error_coalescer.is_repeat('a', today))
+        self.assertTrue(error_coalescer.is_repeat('a', today))
+        # Outro dia começa um novo registro
+        self.assertFalse(error_coalescer.is_repeat('a', tomorrow))
+        # Janela vencida
+        with mock.patch('logs.coalescing.time.monotonic', return_value=time_module.monotonic() + 301):
+            self.assertFalse(error_coalescer.is_repeat('a', tomorrow))
+        # Acima de MAX_FINGERPRINTS os mais antigos são esquecidos
+        error_coalescer.is_repeat('b', tomorrow)
+        error_coalescer.is_repeat('c', tomorrow)
+        self.assertFalse(error_coalescer.is_repeat('a', tomorrow))
+
+    def test_view_exceptions_are_logged_once_and_coalesced(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/falha/').status_code, 500)
+
+        action = Action.objects.get()
+        self.assertEqual(action.type, 'Erro do Sistema')
+        self.assertEqual(action.description, 'Exceção: ValueError - falha simulada')
+        self.assertEqual((action.url, action.occurrences), ('/falha/', 3))
+        self.assertIsNotNone(action.last_seen)
+
+    def test_permission_denied_is_logged(self):
+        self.assertEqual(self.client.get('/negado/').status_code, 403)
+        self.assertEqual(Action.objects.get().type, 'Acesso Negado')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        clear_intern_caches()
+        error_coalescer.clear()
+        request_metrics.reset()
+        self.addCleanup(request_metrics.reset)
+        self.client.raise_request_exception = False
+
+    def test_percentiles_and_ordering(self):
+        metrics = RequestMetrics()
+        for milliseconds in range(1, 101):
+            metrics.record('lenta', milliseconds / 1000, 3, 0.001)
+        metrics.record('rapida', 0.002, 1, 0.0005, failed=True)
+
+        slowest, fastest = metrics.summaries(order_by='p95')
+        self.assertEqual(slowest['route'], 'lenta')
+        self.assertEqual((slowest['p50'], slowest['p95'], slowest['p99'], slowest['max']), (50, 95, 99, 100))
+        self.assertEqual((slowest['total'], slowest['avg_queries'], slowest['errors']), (100, 3, 0))
+        self.assertEqual((fastest['route'], fastest['errors']), ('rapida', 1))
+
+    def test_concurrent_record_and_summary(self):
+        metrics = RequestMetrics()
+        errors = []
+
+        def record():
+            for _ in range(5000):
+                metrics.record('rota', 0.01, 2, 0.001)
+
+        def summarize():
+            try:
+                while any(thread.is_alive() for thread in writers):
+                    metrics.summaries()
+            except RuntimeError as e:
+                errors.append(e)
+
+        writers = [threading.Thread(target=record) for _ in range(4)]
+        reader = threading.Thread(target=summarize)
+        for thread in writers + [reader]:
+            thread.start()
+        for thread in writers + [reader]:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(metrics.summaries()[0]['total'], 20000)
+
+    @override_settings(ROOT_URLCONF='logs.tests')
+    def test_routes_and_failed_requests_are_recorded(self):
+        self.client.get('/ok/')
+        self.client.get('/falha/')
+        self.client.get('/falha/')
+        self.client.get('/inexistente/')
+
+        summaries = {row['route']: row for row in request_metrics.summaries()}
+        self.assertEqual((summaries['ok']['total'], summaries['ok']['errors']), (1, 0))
+        self.assertEqual((summaries['falha']['total'], summaries['falha']['errors']), (2, 2))
+        self.assertEqual(summaries[UNRESOLVED_ROUTE]['total'], 1)
+        self.assertEqual(summaries['ok']['slow'], 0)
+
+    @override_settings(ROOT_URLCONF='logs.tests', LOGS_REQUEST_METRICS={'SLOW_THRESHOLD_MS': 0})
+    def test_slow_requests_are_flagged_and_coalesced(self):
+        self.client.get('/ok/')
+        self.client.get('/ok/')
+
+        self.assertEqual(request_metrics.summaries()[0]['slow'], 2)
+        action = Action.objects.get()
+        self.assertEqual((action.type, action.severity, action.occurrences), ('Requisição Lenta', 'warning', 2))
+        self.assertTrue(action.description.startswith('A rota ok levou'))
+
+    def test_metrics_page(self):
+        request_metrics.record('logs:index', 0.25, 4, 0.01, failed=True)
+        self.client.force_login(get_user_model().objects.create_user(
+            id='20231012', password='senha', first_name='Gil', last_name='Rosa', email='gil@example.com',
+            is_staff=True
+        ))
+        response = self.client.get(reverse('logs:metrics'), {'ordem': 'max'})
+        self.assertEqual(response.context['order_by'], 'max')
+        self.assertContains(response, '<code>logs:index</code>', html=True)
+
+
+class AgendaDayIndexTests(SimpleTestCase):
+    def event(self, title, start, end):
+        return {'title': title, 'start_time': timezone.make_aware(start), 'end_time': timezone.make_aware(end)}
+
+    def test_multi_day_events_cover_each_day(self):
+        events = [
+            # Começa no mês anterior e termina no dia 2
+            self.event('Feira', datetime(2025, 2, 27, 9), datetime(2025, 3, 2, 18)),
+            self.event('Oficina', datetime(2025, 3, 2, 14), datetime(2025, 3, 2, 16)),
+            # Termina à meia-noite: não ocupa o dia 11
+            self.event('Maratona', datetime(2025, 3, 9, 20), datetime(2025, 3, 11, 0)),
+            # Continua no mês seguinte
+            self.event('Imersão', datetime(2025, 3, 30, 9), datetime(2025, 4, 2, 18)),
+            self.event('Abril', datetime(2025, 4, 5, 9), datetime(2025, 4, 5, 10)),
+        ]
+        by_day = index_events_by_day(events, 2025, 3)
+        titles = {day: [event['title'] for event in day_events] for day, day_events in by_day.items()}
+
+        self.assertEqual(titles, {
+            1: ['Feira'], 2: ['Feira', 'Oficina'],
+            9: ['Maratona'], 10: ['Maratona'],
+            30: ['Imersão'], 31: ['Imersão'],
+        })
+        # O mesmo dicionário do evento é compartilhado entre os dias
+        self.assertIs(by_day[1][0], by_day[2][0])
+
+    def test_zero_length_event_and_grid(self):
+        moment = datetime(2025, 3, 15, 10)
+        events = [self.event('Marco', moment, moment)]
+        self.assertEqual(list(index_events_by_day(events, 2025, 3)), [15])
+
+        grid = month_grid(events, 2025, 3)
+        cells = [cell for week in grid for cell in week]
+        self.assertEqual(cells[0], (0, []))  # Semana começa no domingo; março de 2025 começa no sábado
+        self.assertEqual([event['title'] for day, day_events in cells if day == 15 for event in day_events], ['Marco'])
@@ -6,6 +6,9 @@ app_name = 'logs'
 urlpatterns = [
     path('', views.logs_list, name='index'),
     path('log/<int:day>/<int:month>/<int:year>/', views.logs_datepage, name='datepage'),
+    path('exportar/', views.logs_export, name='export'),
+    path('busca/', views.logs_search, name='search'),
+    path('desempenho/', views.logs_metrics, name='metrics'),
     
     # URLs para a agenda
     path('agenda/', views.agenda_home, name='agenda_home'),
@@ -18,4 +21,9 @@ urlpatterns = [
     path('agenda/excluir/<int:event_id>/', views.agenda_delete_event, name='delete_event'),  # Alias para URLs antigas
     path('agenda/rejeitar/<int:event_id>/', views.agenda_reject_event, name='agenda_reject_event'),
     path('agenda/pendentes/', views.pending_events, name='pending_events'),
+    path('agenda/pendentes/lote/', views.pending_events_bulk, name='pending_events_bulk'),
+    path('agenda/feed/<str:token>.ics', views.agenda_feed, name='agenda_feed'),
+    path('agenda/assinar/', views.agenda_feed_info, name='agenda_feed_info'),
+    path('agenda/api/eventos/', views.agenda_events_api, name='agenda_events_api'),
+    path('agenda/api/horarios-livres/', views.agenda_free_slots_api, name='agenda_free_slots_api'),
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.utils import timezone
-from .models import Action
+from .buffer import enqueue_action
 
 def log_user_action(user, action_type, description, severity='info', url=None, request=None):
     """
@@ -43,8 +43,8 @@ def log_user_action(user, action_type, description, severity='info', url=None, r
         if not url:
             url = request.path
     
-    # Criar registro
-    Action.objects.create(
+    # Enfileirar registro (gravado em lote pelo buffer de logs)
+    enqueue_action(
         author=username,
         type=action_type,
         description=description,
@@ -98,8 +98,8 @@ def log_error(description, severity='error', user=None, url=None, request=None):
             if not url and hasattr(request, 'path'):
                 url = request.path
         
-        # Criar registro
-        Action.objects.create(
+        # Enfileirar registro (gravado em lote pelo buffer de logs)
+        enqueue_action(
             author=username,
             type='Erro do Sistema',
             description=description,
@@ -3,16 +3,35 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.urls import reverse
-from django.db.models import Count
-from datetime import datetime, timedelta, date
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_POST, require_safe
+from django.utils.functional import SimpleLazyObject
+from django.utils.safestring import mark_safe
+from django.db import transaction
+from django.db.models import Count, Q
+from functools import partial
+from datetime import datetime, timedelta, date, time
 import calendar
-from .models import Action, Event, LabSchedule
+from .models import Action, CalendarFeedToken, DailyActionSummary, Event, ExternalEvent, LabSchedule
 from .scripts import FormattedAction
-from .forms import EventForm, VisitRequestForm, EventRejectForm
+from .forms import EventForm, VisitRequestForm, EventRejectForm, PendingEventsBulkForm, ActionExportForm
+from .export import filter_actions, iter_export, iter_encoded, CONTENT_TYPES
+from .archive import load_day_actions, paginate_archived
+from .search import search_actions
+from .conflicts import annotate_conflicts, flag_conflicts
+from .recurrence import recurring_in_window
+from .calendar_feed import FeedState, render_feed
+from .agenda_api import parse_fields, parse_range, range_etag, render_range
+from .availability import free_slots, parse_request as parse_availability_request, render_slots, suggested_slots
+from .counters import get_counts, invalidate as invalidate_counters
+from .agenda_cache import fragment_versions, invalidate_events, user_role, get_config as get_agenda_cache_config
+from .metrics import request_metrics, get_config as get_metrics_config
 from .utils import log_user_action
 from Email_notificacoes.models import enviar_email_solicitacao_enviada, enviar_email_solicitacao_aprovada, enviar_email_solicitacao_recusada
-# Importe a função do seu arquivo google_calendar.py
-from .google_calendar import get_google_calendar_events
+from Email_notificacoes.models import enviar_emails_solicitacoes_aprovadas, enviar_emails_solicitacoes_recusadas
+from .google_calendar import get_config as get_google_calendar_config
 
 def staff_check(user):
     return user.is_staff
@@ -20,91 +39,247 @@ def staff_check(user):
 # Views para logs (acesso apenas para staff)
 @user_passes_test(staff_check)
 def logs_list(request):
-    # Obter datas distintas com ações, ordenadas por data decrescente
-    # Também contamos o número de ações por data e o nível mais alto de severidade
-    dates_with_stats = Action.objects.values('date')\
-        .annotate(count=Count('id'))\
-        .order_by('-date')
-    
-    # Para cada data, verificamos o nível máximo de severidade
-    for date_stat in dates_with_stats:
-        # Verificar se há erros críticos
-        if Action.objects.filter(date=date_stat['date'], severity='critical').exists():
-            date_stat['max_severity'] = 'critical'
-        # Verificar se há erros
-        elif Action.objects.filter(date=date_stat['date'], severity='error').exists():
-            date_stat['max_severity'] = 'error'
-        # Verificar se há alertas de segurança
-        elif Action.objects.filter(date=date_stat['date'], severity='security').exists():
-            date_stat['max_severity'] = 'security'
-        # Verificar se há avisos
-        elif Action.objects.filter(date=date_stat['date'], severity='warning').exists():
-            date_stat['max_severity'] = 'warning'
-        # Se não, é informativo
-        else:
-            date_stat['max_severity'] = 'info'
+    # Os totais e o nível máximo de severidade de cada dia vêm da tabela de resumos,
+    # mantida atualizada pelos signals de Action (uma única consulta indexada por data)
+    dates_with_stats = DailyActionSummary.objects.order_by('-date')
     
-    return render(request, 'logs/logs_list.html', {'dates_with_stats': dates_with_stats})
+    return render(request, 'logs/logs_list.html', {
+        'dates_with_stats': dates_with_stats,
+        'export_form': ActionExportForm(),
+    })
+
+# Número de ações exibidas por página em logs_datepage
+LOGS_PAGE_SIZE = 100
+
+def _parse_cursor(value):
+    """Converte um cursor no formato 'HH:MM:SS.ffffff_id' em (hora, id)"""
+    try:
+        time_str, id_str = value.rsplit('_', 1)
+        return time.fromisoformat(time_str), int(id_str)
+    except (AttributeError, ValueError):
+        return None
+
+def _make_cursor(action):
+    return f"{action.time.isoformat()}_{action.id}"
 
 @user_passes_test(staff_check)
 def logs_datepage(request, day, month, year):
     # Filtrar por severidade se fornecido
     severity = request.GET.get('severity')
+    current_date = date(year, month, day)
     
-    actions_query = Action.objects.filter(date=date(year, month, day))
+    # Paginação por cursor sobre (time, id), usando o índice (date, time, id).
+    # O custo de cada página não depende da quantidade de ações do dia.
+    after = _parse_cursor(request.GET.get('after'))
+    before = _parse_cursor(request.GET.get('before'))
     
-    if (severity):
-        actions_query = actions_query.filter(severity=severity)
+    archived = DailyActionSummary.objects.filter(date=current_date, archived=True).exists()
     
-    # Ordenar por hora e formatar
-    actions = [FormattedAction(action) for action in actions_query.order_by('time')]
-    current_date = date(year, month, day)
+    if archived:
+        # Dia arquivado: as ações são lidas (somente leitura) do arquivo compactado do mês,
+        # junto com as que chegaram ao banco depois do arquivamento
+        archived_actions = load_day_actions(current_date, severity)
+        page, has_previous, has_next = paginate_archived(archived_actions, after, before, LOGS_PAGE_SIZE)
+        
+        stats = {
+            'total': len(archived_actions),
+            'errors': sum(1 for action in archived_actions if action.severity in ['error', 'critical']),
+            'warnings': sum(1 for action in archived_actions if action.severity == 'warning'),
+            'security': sum(1 for action in archived_actions if action.severity == 'security'),
+        }
+    else:
+        actions_query = Action.objects.filter(date=current_date)
+        
+        if (severity):
+            actions_query = actions_query.filter(severity=severity)
+        
+        if before:
+            before_time, before_id = before
+            page = list(
+                actions_query
+                .filter(time__lte=before_time)
+                .exclude(time=before_time, id__gte=before_id)
+                .select_related('type_ref', 'url_ref', 'user_agent_ref')
+                .order_by('-time', '-id')[:LOGS_PAGE_SIZE + 1]
+            )
+            has_previous = len(page) > LOGS_PAGE_SIZE
+            page = page[:LOGS_PAGE_SIZE][::-1]
+            has_next = True
+        else:
+            if after:
+                after_time, after_id = after
+                actions_query_page = actions_query.filter(time__gte=after_time).exclude(time=after_time, id__lte=after_id)
+            else:
+                actions_query_page = actions_query
+            page = list(
+                actions_query_page
+                .select_related('type_ref', 'url_ref', 'user_agent_ref')
+                .order_by('time', 'id')[:LOGS_PAGE_SIZE + 1]
+            )
+            has_next = len(page) > LOGS_PAGE_SIZE
+            page = page[:LOGS_PAGE_SIZE]
+            has_previous = after is not None
+        
+        # Estatísticas para este dia em uma única consulta de agregação condicional
+        stats = actions_query.aggregate(
+            total=Count('id'),
+            errors=Count('id', filter=Q(severity__in=['error', 'critical'])),
+            warnings=Count('id', filter=Q(severity='warning')),
+            security=Count('id', filter=Q(severity='security')),
+        )
     
-    # Estatísticas para este dia
-    stats = {
-        'total': actions_query.count(),
-        'errors': actions_query.filter(severity__in=['error', 'critical']).count(),
-        'warnings': actions_query.filter(severity='warning').count(),
-        'security': actions_query.filter(severity='security').count(),
-    }
+    actions = [FormattedAction(action) for action in page]
     
     return render(request, 'logs/logs_datepage.html', {
         'actions': actions, 
         'date': current_date,
         'stats': stats,
         'active_severity': severity,
+        'archived': archived,
+        'next_cursor': _make_cursor(page[-1]) if page and has_next else None,
+        'previous_cursor': _make_cursor(page[0]) if page and has_previous else None,
     })
 
+# Número de resultados por página na busca de logs
+LOGS_SEARCH_PAGE_SIZE = 50
+
+@user_passes_test(staff_check)
+def logs_search(request):
+    """Busca textual nos logs, com resultados ordenados por relevância e termos destacados"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    
+    offset = (page - 1) * LOGS_SEARCH_PAGE_SIZE
+    # Busca um resultado a mais para saber se existe próxima página
+    found = search_actions(query, limit=LOGS_SEARCH_PAGE_SIZE + 1, offset=offset) if query else []
+    
+    results = [
+        {'action': FormattedAction(action), 'snippet': mark_safe(snippet)}
+        for action, snippet in found[:LOGS_SEARCH_PAGE_SIZE]
+    ]
+    
+    return render(request, 'logs/logs_search.html', {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': len(found) > LOGS_SEARCH_PAGE_SIZE,
+    })
+
+@user_passes_test(staff_check)
+def logs_metrics(request):
+    """Painel de desempenho: latência (p50/p95/p99) e consultas por rota, das mais lentas às mais rápidas"""
+    order_by = request.GET.get('ordem', 'p95')
+    if order_by not in ('p50', 'p95', 'p99', 'max', 'avg_queries', 'total'):
+        order_by = 'p95'
+    
+    return render(request, 'logs/logs_metrics.html', {
+        'routes': request_metrics.summaries(order_by=order_by),
+        'order_by': order_by,
+        'config': get_metrics_config(),
+    })
+
+@user_passes_test(staff_check)
+def logs_export(request):
+    """Exporta os logs filtrados em CSV ou NDJSON, transmitindo as linhas sob demanda"""
+    form = ActionExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(
+            '\n'.join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()),
+            content_type='text/plain; charset=utf-8'
+        )
+    
+    data = form.cleaned_data
+    queryset = filter_actions(
+        start_date=data['start_date'],
+        end_date=data['end_date'],
+        severity=data['severity'],
+        action_type=data['type'],
+        author=data['author'],
+    )
+    export_format = data['format']
+    compress = data['gzip']
+    
+    # Registrar a exportação na própria trilha de auditoria
+    log_user_action(
+        user=request.user,
+        action_type='Exportação de Logs',
+        description=f"Exportou logs em {export_format.upper()} com os filtros: "
+                    + ', '.join(f"{key}={value}" for key, value in data.items() if value not in (None, '', False)),
+        severity='security',
+        request=request
+    )
+    
+    filename = f"logs_{data['start_date'] or 'inicio'}_{data['end_date'] or 'fim'}.{export_format}"
+    if compress:
+        filename += '.gz'
+    
+    response = StreamingHttpResponse(
+        iter_encoded(iter_export(queryset, export_format), compress=compress),
+        content_type='application/gzip' if compress else CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 # Views para Agenda (acesso apenas para usuários logados)
-@login_required
-def agenda_home(request):
-    # Mês e ano atual ou conforme parâmetros
-    today = timezone.now()
-    year = int(request.GET.get('year', today.year))
-    month = int(request.GET.get('month', today.month))
-    
-    # Validar mês e ano
-    if month < 1:
-        month = 12
-        year -= 1
-    elif month > 12:
-        month = 1
-        year += 1
+def index_events_by_day(events, year, month):
+    """
+    Agrupa os eventos (já ordenados por início) pelos dias do mês em que
+    acontecem. Eventos de vários dias aparecem em todos os dias que cobrem.
+    Retorna um dicionário {dia do mês: [eventos]}.
+    """
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    events_by_day = {}
+    
+    for event in events:
+        start = timezone.localtime(event['start_time']).date()
+        # O término é exclusivo: um evento que acaba à meia-noite não ocupa o dia seguinte
+        end_time = max(event['end_time'] - timedelta(microseconds=1), event['start_time'])
+        end = timezone.localtime(end_time).date()
         
+        current = max(start, first_day)
+        end = min(end, last_day)
+        while current <= end:
+            events_by_day.setdefault(current.day, []).append(event)
+            current += timedelta(days=1)
+    
+    return events_by_day
+
+def month_events(year, month, include_google=False):
+    """
+    Eventos aprovados (e, para superusuários, os do Google) que acontecem no mês,
+    ordenados pelo início, no formato usado pelo template de agenda_home.
+    """
     # Obter primeiro e último dia do mês
-    first_day = datetime(year, month, 1)
-    last_day = datetime(year, month, calendar.monthrange(year, month)[1], 23, 59, 59)
+    first_day = timezone.make_aware(datetime(year, month, 1))
+    last_day = timezone.make_aware(datetime(year, month, calendar.monthrange(year, month)[1], 23, 59, 59))
     
     # 1. Buscar eventos locais (aprovados) do banco de dados
+    # Inclui eventos de vários dias que começaram antes do mês e terminam nele
     local_events = Event.objects.filter(
         approved=True,
-        start_time__gte=first_day,
-        start_time__lte=last_day + timedelta(days=1)
+        recurrence_rule='',
+        start_time__lte=last_day,
+        end_time__gte=first_day
     ).order_by('start_time')
     
-    # 2. Buscar eventos do Google Calendar
+    # Séries recorrentes: cada uma é expandida apenas dentro do mês exibido
+    month_end = last_day + timedelta(seconds=1)
+    recurring_events = recurring_in_window(Event.objects.filter(approved=True), first_day, month_end)
+    
+    # 2. Buscar eventos do Google Calendar no espelho local (ver sync_external_events)
     # Somente superusuários podem ver itens do Google
-    google_events_raw = get_google_calendar_events(first_day, last_day) if request.user.is_superuser else []
+    google_events = []
+    if include_google:
+        google_events = ExternalEvent.objects.filter(
+            calendar_id=get_google_calendar_config()['CALENDAR_ID'],
+            start_time__lte=last_day,
+            end_time__gte=first_day
+        )
 
     # 3. Processar e combinar todos os eventos
     all_events = []
@@ -121,38 +296,71 @@ def agenda_home(request):
             'description': event.description,
             'is_google': False # Flag para identificar no template
         })
-
-    # Adicionar eventos do Google à lista combinada
-    for event in google_events_raw:
-        start_str = event.get('start', {}).get('dateTime', event.get('start', {}).get('date'))
-        end_str = event.get('end', {}).get('dateTime', event.get('end', {}).get('date'))
-        
-        if start_str:
-            # Lida com eventos de dia inteiro (formato 'YYYY-MM-DD')
-            if 'T' not in start_str:
-                start_time = timezone.make_aware(datetime.strptime(start_str, '%Y-%m-%d'))
-                end_time = timezone.make_aware(datetime.strptime(end_str, '%Y-%m-%d')) if end_str else start_time
-            else:
-                start_time = timezone.make_aware(datetime.fromisoformat(start_str.replace('Z', '+00:00')))
-                end_time = timezone.make_aware(datetime.fromisoformat(end_str.replace('Z', '+00:00'))) if end_str else start_time
-
+    
+    for event in recurring_events:
+        for start_time, end_time in event.occurrences(first_day, month_end):
             all_events.append({
-                'id': event.get('id'),
-                'title': event.get('summary', 'Evento do Google'),
+                'id': event.id,
+                'title': event.title,
                 'start_time': start_time,
                 'end_time': end_time,
-                'event_type': 'google', # Tipo customizado
-                'get_event_type_display': 'Google Calendar',
-                'description': event.get('description', ''),
-                'is_google': True # Flag para identificar no template
+                'event_type': event.event_type,
+                'get_event_type_display': event.get_event_type_display,
+                'description': event.description,
+                'is_google': False
             })
 
+    # Adicionar eventos do Google à lista combinada
+    for event in google_events:
+        all_events.append({
+            'id': event.google_id,
+            'title': event.title,
+            'start_time': event.start_time,
+            'end_time': event.end_time,
+            'event_type': 'google', # Tipo customizado
+            'get_event_type_display': 'Google Calendar',
+            'description': event.description,
+            'is_google': True # Flag para identificar no template
+        })
+
     # Ordenar a lista combinada por data de início
     all_events.sort(key=lambda x: x['start_time'])
     
-    # Estruturar o calendário
+    return all_events
+
+def month_grid(events, year, month):
+    """
+    Estrutura o calendário: cada célula é (dia, eventos do dia), com os eventos
+    distribuídos em uma única passagem em vez de filtrados no template por dia.
+    """
+    events_by_day = index_events_by_day(events, year, month)
     cal_obj = calendar.Calendar(firstweekday=6)
-    cal = cal_obj.monthdayscalendar(year, month)
+    return [
+        [(day, events_by_day.get(day, [])) for day in week]
+        for week in cal_obj.monthdayscalendar(year, month)
+    ]
+
+@login_required
+def agenda_home(request):
+    # Mês e ano atual ou conforme parâmetros
+    today = timezone.now()
+    year = int(request.GET.get('year', today.year))
+    month = int(request.GET.get('month', today.month))
+    
+    # Validar mês e ano
+    if month < 1:
+        month = 12
+        year -= 1
+    elif month > 12:
+        month = 1
+        year += 1
+        
+    # Os fragmentos da página (grade, próximos eventos e horários) ficam em cache por
+    # (ano, mês, papel); os eventos só são consultados quando algum deles não está em cache
+    include_google = request.user.is_superuser
+    all_events = SimpleLazyObject(lambda: month_events(year, month, include_google))
+    cal = SimpleLazyObject(lambda: month_grid(all_events, year, month))
+    versions = fragment_versions(year, month, include_google)
     
     # Horários de funcionamento
     lab_schedule = LabSchedule.objects.all().order_by('day_of_week')
@@ -174,7 +382,7 @@ def agenda_home(request):
     # Adicionar contagem de eventos pendentes para administradores
     pending_count = 0
     if request.user.is_staff:
-        pending_count = Event.objects.filter(approved=False).count()
+        pending_count = get_counts('pending_events')['pending_events']
     
     context = {
         'events': all_events, # Passa a lista combinada para o template
@@ -189,10 +397,110 @@ def agenda_home(request):
         'today': today,
         'lab_schedule': lab_schedule,
         'pending_count': pending_count,
+        'agenda_cache': {
+            'timeout': get_agenda_cache_config()['TIMEOUT'],
+            'role': user_role(request.user),
+            'events': versions['events'],
+            # A grade destaca o dia de hoje; muda de versão na virada do dia
+            'grid': f"{versions['events']}:{today.day if (year, month) == (today.year, today.month) else ''}",
+            'schedule': versions['schedule'],
+        },
     }
     
     return render(request, 'logs/agenda_home.html', context)
 
+@require_safe
+def agenda_feed(request, token):
+    """
+    Feed iCalendar (ICS) dos eventos aprovados, para assinatura em aplicativos de
+    calendário. Não exige login: o token secreto identifica o usuário. Responde
+    304 enquanto a versão do feed (ETag/Last-Modified) não mudar.
+    """
+    if not CalendarFeedToken.objects.filter(token=token).exists():
+        raise Http404
+    
+    event_type = request.GET.get('tipo') or None
+    if event_type and event_type not in Event.EventType.values:
+        return HttpResponseBadRequest('Tipo de evento inválido.')
+    
+    state = FeedState(event_type)
+    etag = quote_etag(state.etag)
+    last_modified = int(state.last_modified.timestamp()) if state.last_modified else None
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(render_feed(state), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="agenda.ics"'
+    
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Os clientes devem revalidar a cada consulta (normalmente recebendo 304)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+def agenda_feed_info(request):
+    """Mostra o endereço do feed ICS do usuário e permite gerar um novo"""
+    feed_token = CalendarFeedToken.for_user(request.user)
+    
+    if request.method == 'POST':
+        feed_token.regenerate()
+        messages.success(request, 'Um novo endereço foi gerado. O endereço anterior deixou de funcionar.')
+        return redirect('logs:agenda_feed_info')
+    
+    feed_url = request.build_absolute_uri(reverse('logs:agenda_feed', args=[feed_token.token]))
+    return render(request, 'logs/agenda_feed_info.html', {
+        'feed_url': feed_url,
+        'event_types': Event.EventType.choices,
+    })
+
+@login_required
+@require_safe
+def agenda_events_api(request):
+    """
+    Eventos aprovados no intervalo [start, end) em JSON, usados pela grade do
+    calendário para trocar de mês sem recarregar a página. `fields` limita os
+    campos retornados; a ETag (ver range_etag) permite respostas 304.
+    """
+    try:
+        start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+        fields = parse_fields(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    include_google = request.user.is_superuser
+    # A versão vem de consultas agregadas: uma resposta 304 não monta o corpo
+    etag = quote_etag(range_etag(start, end, fields, include_google))
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            render_range(start, end, fields, include_google), content_type='application/json; charset=utf-8'
+        )
+    
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+@require_safe
+def agenda_free_slots_api(request):
+    """
+    Horários livres para reservas de `duration` minutos entre as datas start e end:
+    horários de funcionamento menos os eventos aprovados, calculados sem consultas por dia.
+    """
+    try:
+        start_date, end_date, duration = parse_availability_request(
+            request.GET.get('start'), request.GET.get('end'), request.GET.get('duration')
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    response = JsonResponse(render_slots(free_slots(start_date, end_date, duration), duration))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 @login_required
 def agenda_event_detail(request, event_id):
     # Se for um administrador, pode ver qualquer evento
@@ -278,7 +586,11 @@ def agenda_request_visit(request):
             }
         form = VisitRequestForm(initial=initial_data)
     
-    return render(request, 'logs/agenda_request_visit.html', {'form': form})
+    # Sugestões de horários livres para a duração padrão de uma visita
+    return render(request, 'logs/agenda_request_visit.html', {
+        'form': form,
+        'suggested_slots': suggested_slots(),
+    })
 
 @user_passes_test(staff_check)
 def agenda_approve_event(request, event_id):
@@ -370,7 +682,8 @@ def agenda_reject_event(request, event_id):
             else:
                 return redirect('logs:agenda_home')
     else:
-        form = EventRejectForm()
+        # O motivo pode vir pré-selecionado da lista de pendentes (conflitos detectados)
+        form = EventRejectForm(initial={'motivo_comum': request.GET.get('motivo', '')})
     
     return render(request, 'logs/agenda_reject_event.html', {
         'form': form,
@@ -381,15 +694,92 @@ def agenda_reject_event(request, event_id):
 @user_passes_test(staff_check)
 def pending_events(request):
     """View para exibir todos os eventos pendentes de aprovação"""
-    pending = Event.objects.filter(approved=False).order_by('start_time')
+    pending = annotate_conflicts(
+        Event.objects.filter(approved=False).select_related('created_by').order_by('start_time')
+    )
+    # Sinaliza conflitos com eventos aprovados e visitas fora do horário de funcionamento
+    pending = flag_conflicts(pending)
     
     # Separe os eventos por tipo para facilitar a visualização
-    visit_requests = pending.filter(event_type=Event.EventType.VISIT)
-    other_events = pending.exclude(event_type=Event.EventType.VISIT)
+    visit_requests = [event for event in pending if event.event_type == Event.EventType.VISIT]
+    other_events = [event for event in pending if event.event_type != Event.EventType.VISIT]
     
     context = {
         'visit_requests': visit_requests,
-        'other_events': other_events
+        'other_events': other_events,
+        'bulk_form': PendingEventsBulkForm(),
     }
     
-    return render(request, 'logs/pending_events.html', context)
\ No newline at end of file
+    return render(request, 'logs/pending_events.html', context)
+
+@user_passes_test(staff_check)
+@require_POST
+def pending_events_bulk(request):
+    """
+    Aprova ou recusa várias solicitações pendentes de uma vez: uma única instrução
+    UPDATE/DELETE na mesma transação e um único envio de emails após o commit.
+    """
+    form = PendingEventsBulkForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('logs:pending_events')
+    
+    approve = form.cleaned_data['acao'] == 'aprovar'
+    
+    with transaction.atomic():
+        # Outro administrador pode ter decidido alguma solicitação depois da validação:
+        # somente as que continuam pendentes são alteradas, registradas e notificadas
+        events = list(
+            form.cleaned_data['eventos'].filter(approved=False).select_for_update(of=('self',))
+        )
+        ids = [event.id for event in events]
+        pending = Event.objects.filter(id__in=ids, approved=False)
+        if approve:
+            # update() não dispara os sinais de Event: updated_at (feed ICS), a
+            # agenda em cache e o contador de pendentes são atualizados aqui
+            pending.update(approved=True, updated_at=timezone.now())
+            periods = [(event.start_time, event.end_time, event.is_recurring) for event in events]
+            transaction.on_commit(lambda: invalidate_events(periods))
+            invalidate_counters('pending_events')
+        else:
+            pending.delete()
+        
+        # Os registros só vão para o buffer de logs se a transação for confirmada
+        for event in events:
+            if approve:
+                action_type = 'Aprovação de Solicitação'
+                action_desc = f"Aprovou a solicitação '{event.title}' do usuário {event.created_by.first_name} {event.created_by.last_name}"
+            else:
+                action_type = 'Recusa de Solicitação'
+                action_desc = f"Rejeitou a solicitação '{event.title}' do usuário {event.created_by.first_name} {event.created_by.last_name}"
+            transaction.on_commit(partial(
+                log_user_action,
+                user=request.user,
+                action_type=action_type,
+                description=action_desc,
+                severity='info',
+                request=request
+            ))
+        
+        # Emails enviados de uma vez, somente se a transação for confirmada
+        def send_emails():
+            try:
+                if approve:
+                    for event in events:
+                        event.approved = True
+                    enviar_emails_solicitacoes_aprovadas(events)
+                else:
+                    motivos = form.cleaned_data['motivos']
+                    enviar_emails_solicitacoes_recusadas([(event, motivos[event.id]) for event in events])
+            except Exception as e:
+                # Registrar erro mas não impedir o fluxo
+                print(f"Erro ao enviar emails em lote: {e}")
+        transaction.on_commit(send_emails)
+    
+    if approve:
+        messages.success(request, f'{len(events)} solicitação(ões) aprovada(s) com sucesso!')
+    else:
+        messages.success(request, f'{len(events)} solicitação(ões) recusada(s). Os solicitantes foram notificados.')
+    return redirect('logs:pending_events')
\ No newline at end of file
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'users',
     'logs',
     'ar_condicionado',
+    'Email_notificacoes',
 ]
 
 MIDDLEWARE = [
@@ -48,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'logs.middleware.LogMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,6 +67,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'logs.context_processors.pending_events_count',
+                'users.context_processors.registration_requests_count',
             ],
         },
     },
@@ -82,6 +87,19 @@ DATABASES = {
     }
 }
 
+# Cache compartilhado entre os processos do servidor (vários workers do gunicorn,
+# comandos de manutenção). As versões dos fragmentos da agenda (logs.agenda_cache),
+# os contadores de pendências (logs.counters) e o feed iCalendar são invalidados
+# por sinais no processo que alterou os dados: com o LocMemCache padrão, cada
+# processo teria sua própria cópia e os demais continuariam servindo valores
+# antigos até o TIMEOUT. Para mais de um servidor, use Redis ou Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,3 +144,109 @@ STATICFILES_DIRS = ['projeto/static']
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.CustomUser'
+
+# Buffer de gravação dos logs (logs.buffer.ActionBuffer)
+# OVERFLOW_POLICY: 'block', 'drop_info' ou 'spill'. Use SYNC = True em testes.
+LOGS_ACTION_BUFFER = {
+    'MAX_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    'OVERFLOW_POLICY': 'drop_info',
+    'SPILL_FILE': BASE_DIR / 'logs_buffer_spill.ndjson',
+    'SYNC': False,
+}
+# Nos testes a gravação é imediata: a thread gravaria fora da transação de cada teste
+if sys.argv[1:2] == ['test']:
+    LOGS_ACTION_BUFFER['SYNC'] = True
+    # Os testes limpam o cache; um diretório próprio preserva o do servidor
+    CACHES['default']['LOCATION'] = BASE_DIR / 'cache' / 'test'
+
+# Arquivamento de logs antigos (comando archive_actions)
+LOGS_ARCHIVE_DIR = BASE_DIR / 'logs_archive'
+LOGS_ARCHIVE_AFTER_DAYS = 365
+
+# Agrupamento de erros repetidos no LogMiddleware (logs.coalescing)
+LOGS_ERROR_COALESCING = {
+    'WINDOW': 300,
+    'MAX_FINGERPRINTS': 1000,
+}
+
+# Métricas de latência por rota coletadas pelo LogMiddleware (logs.metrics)
+LOGS_REQUEST_METRICS = {
+    'ENABLED': True,
+    'SLOW_THRESHOLD_MS': 1000,
+    'WINDOW_SIZE': 1000,
+}
+
+# Google Calendar exibido na agenda (logs.google_calendar)
+GOOGLE_CALENDAR = {
+    # Espelho local atualizado por: python manage.py sync_external_events
+    'SYNC_INTERVAL': 60,
+    'FULL_SYNC_INTERVAL': 86400,
+}
+
+# Feed iCalendar da agenda (logs.calendar_feed)
+LOGS_ICS_FEED = {
+    'PAST_DAYS': 90,
+    'CACHE_TIMEOUT': 3600,
+}
+
+# Fragmentos de agenda_home em cache, invalidados pelos sinais de Event/LabSchedule (logs.agenda_cache)
+LOGS_AGENDA_CACHE = {
+    'TIMEOUT': 3600,
+}
+
+# Eventos recorrentes expandidos sob demanda (logs.recurrence)
+LOGS_RECURRENCE = {
+    'MAX_OCCURRENCES': 1000,
+    'MAX_CACHED_WINDOWS': 512,
+}
+
+# Busca de horários livres (funcionamento menos eventos aprovados) (logs.availability)
+LOGS_AVAILABILITY = {
+    'MAX_RANGE_DAYS': 180,
+    'SLOT_STEP_MINUTES': 30,
+    'DEFAULT_DURATION_MINUTES': 120,
+    'SUGGESTION_DAYS': 30,
+    'MAX_SUGGESTIONS': 6,
+}
+
+# Contadores do menu (eventos e registros pendentes) em cache, invalidados por sinais (logs.counters)
+LOGS_COUNTERS = {
+    'TIMEOUT': 300,
+}
+
+# Fila persistente de emails, entregue por: python manage.py process_email_outbox (Email_notificacoes.outbox)
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 50,
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 6,
+    'BACKOFF_SECONDS': 60,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'POLL_INTERVAL': 5,
+    'SENT_RETENTION_DAYS': 30,
+    'PURGE_INTERVAL': 3600,
+}
+
+# Conexão SMTP compartilhada usada pelo processo de entrega de emails (Email_notificacoes.transport)
+EMAIL_TRANSPORT = {
+    'BATCH_SIZE': 50,
+    'IDLE_TIMEOUT': 60,
+    'MAX_MESSAGES_PER_CONNECTION': 500,
+}
+
+# Pool de envio de emails com fila limitada (Email_notificacoes.pool), usado pelo
+# process_email_outbox. IN_PROCESS=True também inicia WORKERS threads em cada processo
+# web para entregar logo após o commit: a latência cai de até POLL_INTERVAL segundos
+# para quase zero, mas no SQLite essas threads disputam o bloqueio de escrita com as
+# requisições ("database is locked"). Habilite apenas com um banco que aceite escritas
+# concorrentes (PostgreSQL, MySQL).
+EMAIL_WORKER_POOL = {
+    'IN_PROCESS': False,
+    'WORKERS': 2,
+    'QUEUE_SIZE': 200,
+    'FULL_POLICY': 'defer',
+    'BLOCK_TIMEOUT': 5,
+    'SHUTDOWN_TIMEOUT': 10,
+    'LATENCY_WINDOW': 1000,
+}
@@ -1,11 +1,11 @@
 
-from .models import RegistrationRequest
+from logs.counters import get_counts
 
 def registration_requests_count(request):
-    """Context processor para adicionar contador de solicitações pendentes ao contexto global"""
+    """Context processor para adicionar contador de solicitações pendentes ao contexto global (em cache, ver logs.counters)"""
     pending_count = 0
     if request.user.is_authenticated and request.user.is_superuser:
-        pending_count = RegistrationRequest.objects.filter(status='pending').count()
+        pending_count = get_counts('pending_registrations')['pending_registrations']
     
     return {
         'registration_pending_count': pending_count
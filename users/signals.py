@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from logs.counters import invalidate, register
+from .models import RegistrationRequest
+
+
+def _pending_registrations():
+    return RegistrationRequest.objects.filter(status='pending').count()
+
+
+register('pending_registrations', _pending_registrations)
+
+
+# Contador de solicitações de registro pendentes exibido no menu (ver logs.counters)
+@receiver(post_save, sender=RegistrationRequest)
+@receiver(post_delete, sender=RegistrationRequest)
+def invalidar_contador_de_registros(sender, instance, **kwargs):
+    invalidate('pending_registrations')